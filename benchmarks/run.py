@@ -0,0 +1,308 @@
+"""性能基准测试
+
+在临时目录中生成指定规模的合成账户库，测量各热点路径的耗时，
+把结果写入JSON文件，并与保存的基线比较，超过阈值时以非零状态退出。
+
+用法:
+    python -m benchmarks.run --accounts 10000
+    python -m benchmarks.run --accounts 1000 --update-baseline
+
+基线中的数值只在生成它的机器和Python版本上有意义（meta中记录了环境信息）。
+在其他环境中比较前，应先在该环境中用当前代码以 --update-baseline 重新生成基线。
+并行指标只在CPU核数与基线相同时比较，单核机器上生成的基线不能反映并行效果。
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+DEFAULT_BASELINE = Path(__file__).resolve().parent / "baseline.json"
+
+
+def _timed(func, repeat):
+    """执行func共repeat次，返回每次耗时（秒）列表"""
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - started)
+    return samples
+
+
+def _latency(samples):
+    """把耗时样本汇总为毫秒级的p50/p95"""
+    samples = sorted(samples)
+    return {
+        "p50_ms": statistics.median(samples) * 1000,
+        "p95_ms": samples[int(len(samples) * 0.95) - 1 if len(samples) > 1 else 0]
+        * 1000,
+    }
+
+
+def build_vault(accounts):
+    """生成合成账户库：svc-00000001@corp 形式的账户名和随机密钥"""
+    from src.core.data.database import init_db
+    from src.core.data.operation.totp_account_manager import TotpAccountManager
+    from src.core.utils.totp_utils import TOTPUtils
+
+    init_db()
+    records = (
+        {
+            "account_name": f"svc-{i:08d}@corp",
+            "secret": TOTPUtils.generate_random_secret(32),
+            "digits": 6,
+            "period": 30,
+            "algorithm": "SHA1",
+        }
+        for i in range(accounts)
+    )
+    started = time.perf_counter()
+    TotpAccountManager.bulk_add(records, batch_size=5000)
+    return time.perf_counter() - started
+
+
+def bench_generation(iterations):
+    """TOTPUtils.generate_totp 和 generate_many（含预先准备HMAC对象）的吞吐量"""
+    from src.core.utils.totp_utils import TOTPUtils
+
+    secrets = [TOTPUtils.generate_random_secret(32) for _ in range(iterations)]
+    entries = [(secret, 6, 30) for secret in secrets]
+    # 多轮取最快的一轮，减少机器负载带来的抖动
+    single = min(
+        _timed(lambda: [TOTPUtils.generate_totp(secret) for secret in secrets], 5)
+    )
+    batch = min(_timed(lambda: TOTPUtils.generate_many(entries), 5))
+    prepared_entries = [(TOTPUtils.prepare(secret), 6, 30) for secret in secrets]
+    prepared = min(_timed(lambda: TOTPUtils.generate_many(prepared_entries), 5))
+    return {
+        "generate_totp_ops_per_s": iterations / single,
+        "generate_many_ops_per_s": iterations / batch,
+        "generate_prepared_ops_per_s": iterations / prepared,
+    }
+
+
+def bench_crypto(iterations):
+    """encrypt_secret / decrypt_secret 的单次耗时"""
+    from src.core.utils.encryption_utils import decrypt_secret, encrypt_secret
+
+    secret = b"JBSWY3DPEHPK3PXPJBSWY3DPEHPK3PXP"
+    encrypt_secret(secret)  # 预热：加载密钥
+    encrypt_samples = _timed(lambda: encrypt_secret(secret), iterations)
+    token = encrypt_secret(secret)
+    decrypt_samples = _timed(lambda: decrypt_secret(token), iterations)
+    return {
+        "encrypt_secret_us": statistics.median(encrypt_samples) * 1e6,
+        "decrypt_secret_us": statistics.median(decrypt_samples) * 1e6,
+    }
+
+
+def bench_storage(accounts, iterations):
+    """TotpAccountManager.list_accounts / get_account 的延迟
+
+    get_account_* 在关闭进程内账户缓存时测量，每次都查询数据库；
+    get_account_cached_* 重复查询少量账户，测量缓存命中的延迟。
+    """
+    from src.core.config.config import reload_settings
+    from src.core.data.operation import totp_account_manager
+    from src.core.data.operation.totp_account_manager import TotpAccountManager
+
+    def set_cache_size(size):
+        if size is None:
+            os.environ.pop("ACCOUNT_CACHE_SIZE", None)
+        else:
+            os.environ["ACCOUNT_CACHE_SIZE"] = str(size)
+        reload_settings()
+        totp_account_manager._account_cache = None
+
+    def get_samples(names):
+        names_iter = iter(names)
+        return _timed(
+            lambda: TotpAccountManager.get_account(account_name=next(names_iter)),
+            len(names),
+        )
+
+    list_samples = _timed(TotpAccountManager.list_accounts, 3)
+    names = [f"svc-{random.randrange(accounts):08d}@corp" for _ in range(iterations)]
+    previous = os.environ.get("ACCOUNT_CACHE_SIZE")
+    set_cache_size(0)
+    try:
+        uncached = _latency(get_samples(names))
+    finally:
+        set_cache_size(previous)
+    hot_names = names[:100]
+    get_samples(hot_names)  # 预热：读入缓存
+    cached = _latency(get_samples(hot_names * (iterations // len(hot_names))))
+    return {
+        "list_accounts_ms": min(list_samples) * 1000,
+        "get_account_p50_ms": uncached["p50_ms"],
+        "get_account_p95_ms": uncached["p95_ms"],
+        "get_account_cached_p50_ms": cached["p50_ms"],
+    }
+
+
+def bench_cli_cold_start(home, repeat):
+    """totp get 冷启动耗时（独立进程，不使用守护进程）"""
+    env = dict(os.environ, HOME=str(home), PYTHONPATH=str(PROJECT_ROOT))
+    samples = _timed(
+        lambda: subprocess.run(
+            [sys.executable, "-m", "src.cli.main", "get", "svc-00000000@corp"],
+            cwd=PROJECT_ROOT,
+            env=env,
+            check=True,
+            capture_output=True,
+        ),
+        repeat,
+    )
+    return {"cli_get_cold_start_ms": min(samples) * 1000}
+
+
+def bench_gui_load():
+    """AccountListFrame.load_accounts 到账户列表可显示的耗时（需要图形环境）"""
+    try:
+        import tkinter as tk
+
+        root = tk.Tk()
+    except Exception as e:
+        return {}, f"跳过GUI测试: {e}"
+
+    from src.gui.widgets import AccountListFrame
+
+    try:
+        frame = AccountListFrame(root)
+        frame.pack(fill=tk.BOTH, expand=True)
+        root.update()
+        samples = []
+        for _ in range(3):
+            started = time.perf_counter()
+            frame.load_accounts()
+            while frame.loading:
+                root.update()
+            samples.append(time.perf_counter() - started)
+        return {"gui_load_accounts_ms": min(samples) * 1000}, None
+    finally:
+        root.destroy()
+
+
+# 指标方向：True表示越大越好（吞吐量），False表示越小越好（耗时）
+HIGHER_IS_BETTER = {
+    "generate_totp_ops_per_s": True,
+    "generate_many_ops_per_s": True,
+    "generate_prepared_ops_per_s": True,
+}
+# 使用线程池或进程池并行执行的指标，只在CPU核数相同时比较
+PARALLEL_METRICS = {"build_vault_s"}
+
+
+def compare(results, baseline, threshold, skip=()):
+    """与基线比较，返回退化的指标列表 [(指标, 当前值, 基线值, 变化比例)]"""
+    regressions = []
+    for name, value in results.items():
+        base = baseline.get(name)
+        if not base or name in skip:
+            continue
+        change = (value - base) / base
+        if HIGHER_IS_BETTER.get(name, False):
+            change = -change
+        if change > threshold:
+            regressions.append((name, value, base, change))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="TOTP性能基准测试")
+    parser.add_argument("--accounts", type=int, default=1000, help="合成账户数量")
+    parser.add_argument("--iterations", type=int, default=2000, help="微基准的迭代次数")
+    parser.add_argument(
+        "--output", type=Path, default=Path("bench_output.json"), help="结果输出文件"
+    )
+    parser.add_argument(
+        "--baseline", type=Path, default=DEFAULT_BASELINE, help="基线文件"
+    )
+    parser.add_argument(
+        "--threshold", type=float, default=0.2, help="允许的退化比例（默认20%%）"
+    )
+    parser.add_argument(
+        "--update-baseline", action="store_true", help="用本次结果更新基线"
+    )
+    parser.add_argument("--no-gui", action="store_true", help="跳过GUI测试")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory(prefix="totp-bench-") as home:
+        # 必须在首次访问数据库之前设置，使测试库与真实数据隔离
+        os.environ["HOME"] = home
+
+        results = {"build_vault_s": build_vault(args.accounts)}
+        results.update(bench_generation(args.iterations))
+        results.update(bench_crypto(args.iterations))
+        results.update(bench_storage(args.accounts, args.iterations))
+        results.update(bench_cli_cold_start(home, 3))
+        notes = []
+        if (os.cpu_count() or 1) < 2:
+            notes.append(
+                "单核机器：并行指标（"
+                + "、".join(sorted(PARALLEL_METRICS))
+                + "）不能反映多核性能"
+            )
+        if not args.no_gui:
+            gui_results, note = bench_gui_load()
+            results.update(gui_results)
+            if note:
+                notes.append(note)
+
+    report = {
+        "meta": {
+            "accounts": args.accounts,
+            "iterations": args.iterations,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "notes": notes,
+        },
+        "results": results,
+    }
+    args.output.write_text(json.dumps(report, indent=2, ensure_ascii=False))
+    for name, value in results.items():
+        print(f"{name:32s} {value:14.3f}")
+    for note in notes:
+        print(note)
+
+    if args.update_baseline:
+        args.baseline.write_text(json.dumps(report, indent=2, ensure_ascii=False))
+        print(f"基线已更新: {args.baseline}")
+        return 0
+
+    if not args.baseline.exists():
+        print(f"未找到基线文件 {args.baseline}，跳过比较")
+        return 0
+    baseline = json.loads(args.baseline.read_text())
+    if baseline["meta"]["accounts"] != args.accounts:
+        print(
+            f"基线账户数量为 {baseline['meta']['accounts']}，与本次不同，比较结果仅供参考"
+        )
+    environment = ("python", "platform", "cpu_count")
+    if any(baseline["meta"].get(key) != report["meta"][key] for key in environment):
+        print(
+            "基线在不同的环境中生成，比较结果仅供参考（可用 --update-baseline 重新生成）"
+        )
+    skip = ()
+    if baseline["meta"].get("cpu_count") != report["meta"]["cpu_count"]:
+        print("基线的CPU核数不同，跳过并行指标的比较")
+        skip = PARALLEL_METRICS
+    regressions = compare(results, baseline["results"], args.threshold, skip)
+    for name, value, base, change in regressions:
+        print(f"性能退化: {name} {value:.3f}（基线 {base:.3f}，变化 {change:+.0%}）")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,31 +1,26 @@
-from pathlib import Path
-
 import click
 
-from src.core.config import get_db_path
-from src.core.data.database import init_db
-from src.core.data.operation.totp_account_manager import TotpAccountManager
-from src.core.utils.totp_utils import TOTPUtils
-from src.core.utils.encryption_utils import (
-    encrypt_secret,
-    decrypt_secret,
-)
+from src.core.daemon.client import DaemonClient, DaemonError
 
-DATA_DIR = Path.home() / get_db_path()
-DATA_DIR.mkdir(parents=True, exist_ok=True)
-DATA_PATH = DATA_DIR / "totp_db.sqlite"
+# 各子命令在函数内按需导入依赖（peewee、cryptography、loguru等），
+# 使 --help 和只读命令不必为用不到的模块付出启动开销
 
 
 @click.group()
 def totp_cli():
     """TOTP CLI"""
-    pass
+    from src.core.utils.metrics import configure_metrics
+
+    configure_metrics()
 
 
 @totp_cli.command("init")
 def totp_init():
     """初始化数据库"""
-    if DATA_PATH.exists():
+    from src.core.data.connection import get_database_path
+    from src.core.data.database import init_db
+
+    if get_database_path().exists():
         click.echo(click.style("数据库已存在，请勿重复初始化", fg="red"))
     else:
         init_db()
@@ -36,6 +31,9 @@ def totp_init():
 @click.argument("account_name")
 @click.argument("secret")
 def totp_add(account_name, secret):
+    from src.core.data.operation.totp_account_manager import TotpAccountManager
+    from src.core.utils.encryption_utils import encrypt_secret
+
     encrypted_secret = encrypt_secret(secret.encode())
     if TotpAccountManager.add_account(
         account_name=account_name,
@@ -47,26 +45,116 @@ def totp_add(account_name, secret):
 
 
 @totp_cli.command("list")
-def totp_list():
-    """列出所有TOTP账户"""
-    accounts = TotpAccountManager.list_accounts()
-    if not accounts:
+@click.option(
+    "--limit", default=None, type=click.IntRange(min=1), help="最多显示的账户数"
+)
+@click.option("--after", default=None, help="从此账户名之后开始（用于分页）")
+def totp_list(limit, after):
+    """列出所有TOTP账户（按账户名排序）"""
+    # 多取一个账户，用于判断是否还有下一页
+    fetch = None if limit is None else limit + 1
+    # 守护进程运行时直接从其内存中获取
+    try:
+        account_names = DaemonClient().request(
+            "LIST", after or "", "" if fetch is None else str(fetch)
+        )
+    except DaemonError as e:
+        click.echo(
+            click.style(f"⚠️ 守护进程返回错误: {e}，改为本地读取", fg="yellow"), err=True
+        )
+        account_names = None
+    if account_names is None:
+        from src.core.data.operation.totp_account_manager import TotpAccountManager
+
+        # 逐页读取并输出，不读取加密数据
+        account_names = (
+            row[0]
+            for row in TotpAccountManager.paginate_accounts(after=after, limit=fetch)
+        )
+
+    count = 0
+    last_name = None
+    has_more = False
+    for count, account_name in enumerate(account_names, 1):
+        if limit is not None and count > limit:
+            has_more = True
+            break
+        if count == 1:
+            click.echo(click.style("📋 已保存的账户:", fg="green"))
+        click.echo(f"{count}. {account_name}")
+        last_name = account_name
+    if count == 0:
         click.echo(click.style("没有保存的账户", fg="red"))
+    elif has_more:
+        click.echo(
+            click.style(
+                f"下一页: totp list --limit {limit} --after '{last_name}'", fg="cyan"
+            ),
+            err=True,
+        )
+
+
+@totp_cli.command("search")
+@click.argument("query")
+@click.option(
+    "--mode",
+    type=click.Choice(["auto", "prefix", "substring", "fuzzy"]),
+    default="auto",
+    show_default=True,
+    help="搜索方式",
+)
+@click.option("--limit", default=50, show_default=True, help="最多显示的账户数")
+@click.option("--plain", is_flag=True, help="每行只输出账户名（便于脚本使用）")
+def totp_search(query, mode, limit, plain):
+    """按账户名搜索账户（前缀、子串或模糊匹配）"""
+    from src.core.data.operation.totp_account_manager import TotpAccountManager
+
+    account_names = [
+        account[1] for account in TotpAccountManager.search_accounts(query, mode, limit)
+    ]
+    if plain:
+        for account_name in account_names:
+            click.echo(account_name)
+        return
+    if not account_names:
+        click.echo(click.style(f"没有匹配 {query} 的账户", fg="red"))
         return
 
-    click.echo(click.style("📋 已保存的账户:", fg="green"))
-    for idx, account in enumerate(accounts, 1):
-        click.echo(f"{idx}. {account.account_name}")
+    click.echo(click.style("🔍 匹配的账户:", fg="green"))
+    for idx, account_name in enumerate(account_names, 1):
+        click.echo(f"{idx}. {account_name}")
 
 
 @totp_cli.command("get")
 @click.argument("account_name")
 def totp_get(account_name):
+    # 守护进程运行时直接从其内存中获取
+    # 守护进程未运行或无法连接时返回None，继续从本地数据库获取
+    try:
+        response = DaemonClient().request("GET", account_name)
+    except DaemonError as e:
+        click.echo(click.style(f"❌ 获取账户失败: {e}", fg="red"))
+        return
+    if response is not None:
+        click.echo(click.style(f"✅ 获取账户成功: {account_name}", fg="green"))
+        click.echo(response[0])
+        return
+
+    from src.core.data.operation.totp_account_manager import TotpAccountManager
+    from src.core.utils.totp_utils import TOTPUtils
+
     account = TotpAccountManager.get_account(account_name=account_name)
     if account:
-        secret = decrypt_secret(account.encrypted_secret)
+        try:
+            key = TOTPUtils.decode_plaintext(TotpAccountManager.account_secret(account))
+            code = TOTPUtils.generate_totp(
+                key, account.digits, account.period, account.algorithm
+            )
+        except ValueError as e:
+            click.echo(click.style(f"❌ 获取账户失败: {account_name}: {e}", fg="red"))
+            return
         click.echo(click.style(f"✅ 获取账户成功: {account_name}", fg="green"))
-        click.echo(TOTPUtils.generate_totp(secret.decode()))
+        click.echo(code)
     else:
         click.echo(click.style(f"❌ 获取账户失败: {account_name}", fg="red"))
 
@@ -75,6 +163,8 @@ def totp_get(account_name):
 @click.argument("account_name")
 def totp_delete(account_name):
     """删除TOTP账户"""
+    from src.core.data.operation.totp_account_manager import TotpAccountManager
+
     if TotpAccountManager.delete_account(account_name=account_name):
         click.echo(click.style(f"✅ 删除账户成功: {account_name}", fg="green"))
     else:
@@ -85,6 +175,9 @@ def totp_delete(account_name):
 @click.argument("account_name")
 @click.argument("new_secret")
 def totp_update(account_name, new_secret):
+    from src.core.data.operation.totp_account_manager import TotpAccountManager
+    from src.core.utils.encryption_utils import encrypt_secret
+
     if TotpAccountManager.update_account(
         account_name=account_name,
         encrypted_secret=(encrypt_secret(new_secret.encode())),
@@ -92,3 +185,533 @@ def totp_update(account_name, new_secret):
         click.echo(click.style(f"✅ 更新账户成功: {account_name}", fg="green"))
     else:
         click.echo(click.style(f"❌ 更新账户失败: {account_name}", fg="red"))
+
+
+@totp_cli.command("serve")
+@click.option(
+    "--metrics",
+    "enable_metrics",
+    is_flag=True,
+    help="记录耗时统计（可用 totp stats 查看）",
+)
+def totp_serve(enable_metrics):
+    """启动守护进程，通过Unix套接字提供验证码服务"""
+    import socket
+
+    if enable_metrics:
+        from src.core.utils.metrics import configure_metrics
+
+        configure_metrics(enabled=True)
+
+    if not hasattr(socket, "AF_UNIX"):
+        click.echo(click.style("❌ 当前系统不支持Unix套接字", fg="red"))
+        return
+
+    from src.core.daemon.server import run_daemon
+
+    click.echo(click.style("🚀 守护进程已启动，按 Ctrl+C 停止", fg="green"))
+    try:
+        run_daemon()
+    except ValueError as e:
+        click.echo(click.style(f"❌ {e}", fg="red"))
+
+
+@totp_cli.command("import")
+@click.argument("file_path", type=click.Path(exists=True, dir_okay=False))
+@click.option(
+    "--format",
+    "file_format",
+    type=click.Choice(["uri", "csv"]),
+    default=None,
+    help="文件格式（默认按扩展名判断：.csv为CSV，其余为每行一个otpauth URI）",
+)
+@click.option("--update", is_flag=True, help="覆盖已存在的同名账户（默认跳过）")
+@click.option(
+    "--batch-size", default=1000, show_default=True, help="每个事务写入的账户数"
+)
+@click.option("--workers", default=None, type=int, help="并行加密的线程数")
+def totp_import(file_path, file_format, update, batch_size, workers):
+    """从otpauth URI文件或CSV批量导入账户"""
+    from src.core.data.operation.totp_account_manager import TotpAccountManager
+    from src.core.utils.otpauth import iter_import_file
+
+    invalid_lines = []
+
+    def valid_records():
+        for line_no, record, error in iter_import_file(file_path, file_format):
+            if record is None:
+                invalid_lines.append((line_no, error))
+            else:
+                yield record
+
+    def show_progress(stats):
+        click.echo(
+            "⏳ 已处理: 新增 {added}，更新 {updated}，跳过 {skipped}，失败 {failed}".format(
+                **stats
+            ),
+            err=True,
+        )
+
+    stats = TotpAccountManager.bulk_add(
+        valid_records(),
+        batch_size=batch_size,
+        workers=workers,
+        on_duplicate="update" if update else "skip",
+        progress=show_progress,
+    )
+    for line_no, error in invalid_lines:
+        click.echo(
+            click.style(f"⚠️ 第 {line_no} 行无效: {error}", fg="yellow"), err=True
+        )
+    click.echo(
+        click.style(
+            "✅ 导入完成: 新增 {added}，更新 {updated}，跳过 {skipped}，失败 {failed}".format(
+                **stats
+            ),
+            fg="green",
+        )
+        + f"，无效 {len(invalid_lines)}"
+    )
+
+
+@totp_cli.command("export")
+@click.option(
+    "--format",
+    "export_format",
+    type=click.Choice(["json", "otpauth"]),
+    default="json",
+    show_default=True,
+    help="json为每行一个JSON对象，otpauth为每行一个URI（需要--plaintext）",
+)
+@click.option("--plaintext", is_flag=True, help="导出解密后的密钥（默认导出加密数据）")
+@click.option(
+    "-o",
+    "--output",
+    type=click.File("w", encoding="utf-8"),
+    default="-",
+    help="输出文件（默认标准输出）",
+)
+@click.option(
+    "--workers",
+    default=None,
+    type=click.IntRange(min=1),
+    help="并行解密的进程数（仅用于--plaintext，默认在当前进程中解密）",
+)
+def totp_export(export_format, plaintext, output, workers):
+    """流式导出所有账户"""
+    import base64
+    import json
+
+    from src.core.data.operation.totp_account_manager import TotpAccountManager
+
+    if export_format == "otpauth" and not plaintext:
+        raise click.UsageError("otpauth格式包含明文密钥，请同时指定 --plaintext")
+
+    def decrypted_accounts():
+        """(账户元组, 密钥或None, 错误信息)"""
+        if workers is not None:
+            from src.core.data.operation.sharded_reader import iter_decrypted_accounts
+
+            for account, secret, _ in iter_decrypted_accounts(workers):
+                yield account, secret, "无法解密" if secret is None else None
+            return
+
+        for account, error in TotpAccountManager.iter_decrypted_accounts():
+            yield account, None if error else account[2].decode(), error
+
+    if plaintext:
+        from src.core.utils.otpauth import build_otpauth_uri
+
+        accounts = decrypted_accounts()
+    else:
+        accounts = (
+            (account, None, None) for account in TotpAccountManager.iter_accounts()
+        )
+
+    count = 0
+    failed = 0
+    for account, secret, error in accounts:
+        _, name, encrypted_secret, digits, period, algorithm = account
+        record = {
+            "account_name": name,
+            "digits": digits,
+            "period": period,
+            "algorithm": algorithm,
+        }
+        if plaintext:
+            if secret is None:
+                click.echo(
+                    click.style(f"❌ 解密失败: {name}: {error}", fg="red"), err=True
+                )
+                failed += 1
+                continue
+            if export_format == "otpauth":
+                output.write(build_otpauth_uri(name, secret, digits, period, algorithm))
+                output.write("\n")
+                count += 1
+                continue
+            record["secret"] = secret
+        else:
+            record["encrypted_secret"] = base64.b64encode(encrypted_secret).decode()
+        output.write(json.dumps(record, ensure_ascii=False) + "\n")
+        count += 1
+
+    click.echo(
+        click.style(f"✅ 已导出 {count} 个账户", fg="green")
+        + (f"，失败 {failed}" if failed else ""),
+        err=True,
+    )
+
+
+@totp_cli.command("codes")
+@click.argument("account_names", nargs=-1)
+@click.option("--all", "all_accounts", is_flag=True, help="输出所有账户的验证码")
+@click.option("--json", "as_json", is_flag=True, help="每行输出一个JSON对象")
+@click.option(
+    "--workers",
+    default=None,
+    type=click.IntRange(min=1),
+    help="并行生成的进程数（仅用于--all，默认在当前进程中生成）",
+)
+def totp_codes(account_names, all_accounts, as_json, workers):
+    """一次输出多个账户的当前验证码"""
+    import json
+    import time
+
+    from src.core.data.operation.totp_account_manager import TotpAccountManager
+
+    if not account_names and not all_accounts:
+        raise click.UsageError("请指定账户名或使用 --all")
+
+    now = time.time()
+    if all_accounts and workers is not None:
+        from src.core.data.operation.sharded_reader import iter_decrypted_accounts
+
+        results = (
+            (account, code)
+            for account, _, code in iter_decrypted_accounts(workers, for_time=now)
+        )
+    else:
+        results = TotpAccountManager.iter_account_codes(
+            None if all_accounts else account_names, for_time=now
+        )
+    for account, code in results:
+        name, period = account[1], account[4]
+        if as_json:
+            record = {"account_name": name, "code": code}
+            if code is not None:
+                record["remaining"] = period - int(now % period)
+            click.echo(json.dumps(record, ensure_ascii=False))
+        elif code is None:
+            click.echo(click.style(f"❌ {name}: 获取验证码失败", fg="red"))
+        else:
+            click.echo(f"{name}: {code}")
+
+
+@totp_cli.command("schedule")
+@click.option(
+    "-o",
+    "--output",
+    type=click.Path(dir_okay=False),
+    required=True,
+    help="输出文件",
+)
+@click.option(
+    "--windows",
+    default=2880,
+    show_default=True,
+    type=click.IntRange(min=1),
+    help="每个账户预计算的时间窗口数（30秒有效期时2880为一天）",
+)
+@click.option("--start", default=None, type=int, help="起始时间戳（默认当前时间）")
+def totp_schedule(output, windows, start):
+    """预计算所有账户接下来若干时间窗口的验证码，写入供离线验证的二进制文件（不含密钥）"""
+    from src.core.data.operation.totp_account_manager import TotpAccountManager
+    from src.core.utils.totp_schedule import write_schedule
+
+    failed = []
+
+    def decrypted_accounts():
+        for account, error in TotpAccountManager.iter_decrypted_accounts():
+            account_id, name, secret, digits, period, algorithm = account
+            if error:
+                click.echo(
+                    click.style(f"❌ 解密失败: {name}: {error}", fg="red"), err=True
+                )
+                failed.append(name)
+                continue
+            yield account_id, secret.decode(), digits, period, algorithm
+
+    count = write_schedule(output, decrypted_accounts(), windows, start)
+    click.echo(
+        click.style(
+            f"✅ 已写入 {count} 个账户的 {windows} 个时间窗口: {output}", fg="green"
+        )
+        + (f"，失败 {len(failed)}" if failed else "")
+    )
+
+
+@totp_cli.command("rotate-key")
+@click.option(
+    "--batch-size", default=500, show_default=True, help="每个事务重新加密的账户数"
+)
+@click.option("--workers", default=None, type=int, help="进程数（默认按CPU核数）")
+@click.option(
+    "--drop-failed",
+    is_flag=True,
+    help="删除无法解密的账户并删除旧密钥（否则保留旧密钥，轮换不会结束）",
+)
+def totp_rotate_key(batch_size, workers, drop_failed):
+    """轮换主密钥并重新加密所有账户（中断后再次运行会继续）"""
+    from src.core.data.operation.key_rotation import rotate_master_key
+
+    def show_progress(done, remaining):
+        click.echo(f"⏳ 已重新加密 {done}，剩余 {remaining}", err=True)
+
+    stats = rotate_master_key(batch_size, workers, show_progress, drop_failed)
+    action = "继续" if stats["resumed"] else "完成"
+    click.echo(
+        click.style(
+            f"✅ 密钥轮换{action}: {stats['key_id']}，重新加密 {stats['reencrypted']} 个账户",
+            fg="green",
+        )
+    )
+    if stats["dropped"]:
+        click.echo(
+            click.style(
+                f"⚠️ 已删除 {stats['dropped']} 个无法解密的账户，旧密钥已删除",
+                fg="yellow",
+            )
+        )
+    elif stats["failed_ids"]:
+        ids = ", ".join(map(str, stats["failed_ids"]))
+        click.echo(
+            click.style(
+                f"⚠️ {stats['failed']} 个账户解密失败（ID: {ids}），已保留旧密钥；"
+                "修复或删除这些账户后重新运行，或使用 --drop-failed 删除它们并完成轮换",
+                fg="yellow",
+            )
+        )
+
+
+def _start_agent(unlock_key, timeout):
+    """在后台启动解锁代理，通过标准输入传入解锁密钥，等待其开始监听"""
+    import subprocess
+    import sys
+    import time
+    from pathlib import Path
+
+    from src.core.daemon.agent import AgentClient
+
+    client = AgentClient()
+    client.request("LOCK")  # 替换已运行的代理
+    if getattr(sys, "frozen", False):
+        command = [sys.executable, "agent"]
+    else:
+        command = [sys.executable, "-m", "src.cli.main", "agent"]
+    process = subprocess.Popen(
+        command + ["--timeout", str(timeout)],
+        stdin=subprocess.PIPE,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+        cwd=Path(__file__).resolve().parents[2],  # 使 -m src.cli.main 可以被找到
+        start_new_session=True,
+    )
+    process.stdin.write(unlock_key + b"\n")
+    process.stdin.close()
+    deadline = time.monotonic() + 5
+    while time.monotonic() < deadline and process.poll() is None:
+        if client.request("PING"):
+            return True
+        time.sleep(0.05)
+    return False
+
+
+@totp_cli.command("unlock")
+@click.option(
+    "--timeout",
+    default=None,
+    type=float,
+    help="无操作多久后自动锁定（秒，默认读取UNLOCK_TIMEOUT）",
+)
+def totp_unlock(timeout):
+    """输入密码解锁保险库，解锁代理在内存中保存密钥供后续命令使用"""
+    from src.core.config.config import get_settings
+    from src.core.utils.encryption_utils import EncryptionUtils
+
+    if not EncryptionUtils.is_protected():
+        click.echo(click.style("保险库未设置密码，无需解锁", fg="yellow"))
+        return
+    passphrase = click.prompt("密码", hide_input=True)
+    try:
+        unlock_key = EncryptionUtils.derive_unlock_key(passphrase)
+    except ValueError as e:
+        click.echo(click.style(f"❌ {e}", fg="red"))
+        return
+    timeout = timeout or get_settings().unlock_timeout
+    if _start_agent(unlock_key, timeout):
+        click.echo(
+            click.style(f"🔓 已解锁，{int(timeout)} 秒无操作后自动锁定", fg="green")
+        )
+    else:
+        click.echo(click.style("❌ 解锁代理启动失败", fg="red"))
+
+
+@totp_cli.command("lock")
+def totp_lock():
+    """立即锁定保险库（停止解锁代理并丢弃内存中的密钥）"""
+    from src.core.daemon.agent import AgentClient
+
+    if AgentClient().request("LOCK") is None:
+        click.echo(click.style("保险库未解锁", fg="yellow"))
+    else:
+        click.echo(click.style("🔒 已锁定", fg="green"))
+
+
+@totp_cli.command("set-passphrase")
+@click.option(
+    "--kdf",
+    "algorithm",
+    type=click.Choice(["scrypt", "pbkdf2"]),
+    default=None,
+    help="密钥派生算法（默认读取KDF_ALGORITHM）",
+)
+@click.option(
+    "--cost",
+    default=None,
+    type=click.IntRange(min=1),
+    help="派生成本（scrypt的N或pbkdf2的迭代次数）",
+)
+def totp_set_passphrase(algorithm, cost):
+    """设置或修改保护主密钥的密码"""
+    from src.core.config.config import get_settings
+    from src.core.utils.encryption_utils import CipherSession, EncryptionUtils
+
+    if EncryptionUtils.is_protected():
+        try:
+            CipherSession.get_unlock_key()
+        except ValueError:
+            current = click.prompt("当前密码", hide_input=True)
+            try:
+                CipherSession.set_unlock_key(EncryptionUtils.derive_unlock_key(current))
+            except ValueError as e:
+                click.echo(click.style(f"❌ {e}", fg="red"))
+                return
+    passphrase = click.prompt(
+        "新密码", hide_input=True, confirmation_prompt="确认新密码"
+    )
+    try:
+        unlock_key = EncryptionUtils.protect(passphrase, algorithm, cost)
+    except ValueError as e:
+        click.echo(click.style(f"❌ {e}", fg="red"))
+        return
+    click.echo(click.style("✅ 密码已设置", fg="green"))
+    if _start_agent(unlock_key, get_settings().unlock_timeout):
+        click.echo(click.style("🔓 已解锁，使用 totp lock 立即锁定", fg="green"))
+
+
+@totp_cli.command("remove-passphrase")
+def totp_remove_passphrase():
+    """取消主密钥的密码保护"""
+    from src.core.daemon.agent import AgentClient
+    from src.core.utils.encryption_utils import CipherSession, EncryptionUtils
+
+    if not EncryptionUtils.is_protected():
+        click.echo(click.style("保险库未设置密码", fg="yellow"))
+        return
+    passphrase = click.prompt("密码", hide_input=True)
+    try:
+        CipherSession.set_unlock_key(EncryptionUtils.derive_unlock_key(passphrase))
+        EncryptionUtils.unprotect()
+    except ValueError as e:
+        click.echo(click.style(f"❌ {e}", fg="red"))
+        return
+    AgentClient().request("LOCK")
+    click.echo(click.style("✅ 已取消密码保护", fg="green"))
+
+
+@totp_cli.command("agent", hidden=True)
+@click.option("--timeout", required=True, type=float)
+def totp_agent(timeout):
+    """解锁代理进程（由 totp unlock 启动，从标准输入读取解锁密钥）"""
+    import sys
+
+    from src.core.daemon.agent import run_agent
+
+    unlock_key = sys.stdin.buffer.readline().strip()
+    sys.stdin.close()
+    if unlock_key:
+        run_agent(unlock_key, timeout)
+
+
+@totp_cli.command("vault-import")
+def totp_vault_import():
+    """把SQLite数据库中的所有账户写入单文件保险库（替换其原有内容）"""
+    from src.core.data.vault_file import get_vault_store
+
+    store = get_vault_store()
+    count, failed = store.import_from_sqlite()
+    click.echo(click.style(f"✅ 已写入 {count} 个账户: {store.path}", fg="green"))
+    if failed:
+        click.echo(click.style(f"⚠️ {failed} 个账户解密失败，未写入", fg="yellow"))
+    click.echo("设置 STORAGE_BACKEND=vault 后账户操作将使用该文件")
+
+
+@totp_cli.command("vault-export")
+@click.option("--update", is_flag=True, help="覆盖已存在的同名账户（默认跳过）")
+def totp_vault_export(update):
+    """把单文件保险库中的所有账户写回SQLite数据库"""
+    from src.core.data.vault_file import get_vault_store
+
+    store = get_vault_store()
+    if not store.path.exists():
+        click.echo(click.style(f"❌ 保险库文件不存在: {store.path}", fg="red"))
+        return
+    stats = store.export_to_sqlite("update" if update else "skip")
+    click.echo(
+        click.style(
+            "✅ 导出完成: 新增 {added}，更新 {updated}，跳过 {skipped}，失败 {failed}".format(
+                **stats
+            ),
+            fg="green",
+        )
+    )
+
+
+@totp_cli.command("stats")
+@click.option("--json", "as_json", is_flag=True, help="输出原始JSON")
+@click.option(
+    "--prometheus",
+    "prometheus_file",
+    type=click.Path(dir_okay=False),
+    default=None,
+    help="以Prometheus文本格式写入文件",
+)
+def totp_stats(as_json, prometheus_file):
+    """查看守护进程的热点路径耗时统计"""
+    import json
+    from pathlib import Path
+
+    from src.core.utils.metrics import format_prometheus, format_summary
+
+    response = DaemonClient().request("STATS")
+    if response is None:
+        click.echo(
+            click.style("❌ 守护进程未运行，请先执行 totp serve --metrics", fg="red")
+        )
+        return
+    snapshot = json.loads(response[0])
+    if not snapshot["timings"] and not snapshot["counters"]:
+        click.echo(
+            click.style("暂无统计数据（守护进程需以 --metrics 启动）", fg="yellow")
+        )
+        return
+
+    if prometheus_file:
+        path = Path(prometheus_file)
+        path.write_text(format_prometheus(snapshot), encoding="utf-8")
+        click.echo(click.style(f"✅ 已写入: {path}", fg="green"))
+    elif as_json:
+        click.echo(json.dumps(snapshot, ensure_ascii=False, indent=2))
+    else:
+        click.echo(format_summary(snapshot))
@@ -1,8 +1,9 @@
 import os
 import sys
+import threading
+from dataclasses import dataclass, field
 from pathlib import Path
-
-from dotenv import load_dotenv
+from typing import Optional
 
 
 def _get_env_file_path():
@@ -11,27 +12,131 @@ def _get_env_file_path():
     if getattr(sys, "frozen", False):
         # 打包后：读取嵌入的 resources/config.env
         base_path = Path(sys.executable).parent
-        config_path = base_path / "resources" / "config.env"
     else:
-        # 开发时：读取项目根目录的 resources/config-dev.env
+        # 开发时：读取项目根目录的 resources/config.env
         base_path = Path(__file__).parent.parent.parent.parent  # 从 src 回溯到项目根
-        config_path = base_path / "resources" / "config.env"
-        load_dotenv(config_path)  # 开发时用 python-dotenv 加载
-    return config_path
+    return base_path / "resources" / "config.env"
+
+
+def _read_env_file(config_path: Path) -> dict[str, str]:
+    """解析 KEY=VALUE 格式的配置文件（忽略空行和#开头的注释）"""
+    values = {}
+    if not config_path.exists():
+        return values
+    with open(config_path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith("#") or "=" not in line:
+                continue
+            key, value = line.split("=", 1)
+            values[key.strip()] = value.strip().strip("\"'")
+    return values
+
+
+def _parse_pragmas(value: str) -> dict[str, str]:
+    """解析 "name=value,name=value" 格式的SQLite pragma配置"""
+    pragmas = {}
+    for item in value.split(","):
+        if "=" in item:
+            name, pragma_value = item.split("=", 1)
+            pragmas[name.strip()] = pragma_value.strip()
+    return pragmas
+
+
+def _parse_bool(value: str) -> bool:
+    """解析布尔配置（1/true/yes/on 为真）"""
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+
+@dataclass(frozen=True)
+class Settings:
+    """应用配置，由 config.env 和环境变量（优先）解析得到"""
+
+    data_path: Optional[str] = None  # 数据目录（相对用户主目录）
+    log_path: Optional[str] = None  # 日志目录（相对用户主目录）
+    encrypt_key: Optional[str] = None  # 加密密钥
+    log_level: str = "INFO"  # 日志级别
+    log_sink: str = "file"  # 日志输出：file、stderr 或 none
+    log_format: str = "{time:YYYY-MM-DD HH:mm:ss} | {level} | {module} | {message}"
+    log_enqueue: bool = True  # 在后台线程中写日志，不阻塞调用方
+    log_diagnose: bool = False  # 异常日志中输出变量值（可能泄露敏感数据，仅用于调试）
+    log_rate_limit: int = 20  # 同一位置每秒最多记录的日志条数（0为不限制）
+    refresh_interval: float = 1.0  # 检查账户变化的最小间隔（秒）
+    code_reveal_seconds: float = 5.0  # GUI中点击后显示验证码的时长（秒）
+    sqlite_profile: str = "durable"  # SQLite性能配置：durable（持久优先）或 fast
+    sqlite_busy_timeout: float = 5.0  # 数据库被锁时的等待时间（秒）
+    sqlite_pragmas: dict[str, str] = field(default_factory=dict)  # 额外的SQLite pragma
+    metrics_enabled: bool = False  # 是否记录热点路径的耗时统计
+    metrics_file: Optional[str] = None  # 进程退出时导出Prometheus文本的文件
+    kdf_algorithm: str = "scrypt"  # 由密码派生密钥的算法：scrypt 或 pbkdf2
+    kdf_cost: Optional[int] = None  # 派生成本（scrypt的N或pbkdf2迭代次数）
+    unlock_timeout: float = 900.0  # 解锁代理无请求多久后自动锁定（秒）
+    storage_backend: str = "sqlite"  # 账户存储：sqlite 或 vault（单文件保险库）
+    account_cache_size: int = 1024  # 进程内缓存的账户数量上限（0为不缓存）
+
+    @classmethod
+    def load(cls) -> "Settings":
+        """解析配置文件和环境变量"""
+        values = _read_env_file(_get_env_file_path())
+        values.update(os.environ)
+
+        def get(key, default=None):
+            return values.get(key) or default
+
+        return cls(
+            data_path=get("DATA_PATH"),
+            log_path=get("LOG_PATH"),
+            encrypt_key=get("ENCRYPT_KEY"),
+            log_level=get("LOG_LEVEL", cls.log_level).upper(),
+            log_sink=get("LOG_SINK", cls.log_sink).lower(),
+            log_format=get("LOG_FORMAT", cls.log_format),
+            log_enqueue=_parse_bool(get("LOG_ENQUEUE", str(cls.log_enqueue))),
+            log_diagnose=_parse_bool(get("LOG_DIAGNOSE", "")),
+            log_rate_limit=int(get("LOG_RATE_LIMIT", cls.log_rate_limit)),
+            refresh_interval=float(get("REFRESH_INTERVAL", cls.refresh_interval)),
+            code_reveal_seconds=float(
+                get("CODE_REVEAL_SECONDS", cls.code_reveal_seconds)
+            ),
+            sqlite_profile=get("SQLITE_PROFILE", cls.sqlite_profile).lower(),
+            sqlite_busy_timeout=float(
+                get("SQLITE_BUSY_TIMEOUT", cls.sqlite_busy_timeout)
+            ),
+            sqlite_pragmas=_parse_pragmas(get("SQLITE_PRAGMAS", "")),
+            metrics_enabled=_parse_bool(get("METRICS_ENABLED", "")),
+            metrics_file=get("METRICS_FILE"),
+            kdf_algorithm=get("KDF_ALGORITHM", cls.kdf_algorithm).lower(),
+            kdf_cost=int(get("KDF_COST")) if get("KDF_COST") else None,
+            unlock_timeout=float(get("UNLOCK_TIMEOUT", cls.unlock_timeout)),
+            storage_backend=get("STORAGE_BACKEND", cls.storage_backend).lower(),
+            account_cache_size=int(get("ACCOUNT_CACHE_SIZE", cls.account_cache_size)),
+        )
+
+
+_settings: Optional[Settings] = None
+_settings_lock = threading.Lock()
+
+
+def get_settings() -> Settings:
+    """获取应用配置（进程内只解析一次）"""
+    global _settings
+    if _settings is None:
+        with _settings_lock:
+            if _settings is None:
+                _settings = Settings.load()
+    return _settings
+
+
+def reload_settings() -> Settings:
+    """重新解析配置文件和环境变量"""
+    global _settings
+    with _settings_lock:
+        _settings = Settings.load()
+    return _settings
 
 
 def get_encrypt_key():
     """获取加密密钥（兼容开发和打包后环境）"""
-    config_path = _get_env_file_path()
-    # 读取密钥（优先从环境变量，其次从文件）
-    encrypt_key = os.getenv("ENCRYPT_KEY")
-    if not encrypt_key and config_path.exists():
-        with open(config_path, "r") as f:
-            for line in f:
-                if line.startswith("ENCRYPT_KEY="):
-                    encrypt_key = line.split("=", 1)[1].strip()
-                    break
-
+    encrypt_key = get_settings().encrypt_key
     if not encrypt_key:
         raise ValueError("未找到加密密钥，请检查 config.env 文件")
     return encrypt_key
@@ -39,31 +144,15 @@ def get_encrypt_key():
 
 def get_db_path():
     """获取数据库文件路径（兼容开发和打包后环境）"""
-    config_path = _get_env_file_path()
-    # 读取密钥（优先从环境变量，其次从文件）
-    db_path = os.getenv("DATA_PATH")
-    if not db_path and config_path.exists():
-        with open(config_path, "r") as f:
-            for line in f:
-                if line.startswith("DATA_PATH="):
-                    db_path = line.split("=", 1)[1].strip()
-                    break
+    db_path = get_settings().data_path
     if not db_path:
         raise ValueError("未找到数据库文件路径，请检查 config.env 文件")
-
     return db_path
 
 
 def get_log_path():
     """获取日志文件路径（兼容开发和打包后环境）"""
-    config_path = _get_env_file_path()
-    log_path = os.getenv("LOG_PATH")
-    if not log_path and config_path.exists():
-        with open(config_path, "r") as f:
-            for line in f:
-                if line.startswith("LOG_PATH="):
-                    log_path = line.split("=", 1)[1].strip()
-                    break
+    log_path = get_settings().log_path
     if not log_path:
         raise ValueError("未找到日志文件路径，请检查 config.env 文件")
     return log_path
@@ -1,37 +1,99 @@
 import os
+import sys
+import threading
+import time
 from pathlib import Path
 
-from loguru import logger
+from src.core.config.config import get_log_path, get_settings
 
-from src.core.config.config import get_log_path
 
-
-# 硬编码日志配置
+# 日志配置（级别、输出、格式等来自应用配置）
 def load_logging_config():
     """加载日志配置信息"""
+    settings = get_settings()
     return {
         "logger": {
-            "level": "DEBUG",
+            "level": settings.log_level,
+            "sink": settings.log_sink,
             "log_file": "app.log",
             "rotation": "00:00",
             "retention": 7,
             "file_permission": "600",
-            "format": "{time:YYYY-MM-DD HH:mm:ss} | {level} | {module} | {message}",
+            "format": settings.log_format,
+            "enqueue": settings.log_enqueue,
+            "diagnose": settings.log_diagnose,
+            "rate_limit": settings.log_rate_limit,
         }
     }
 
 
+class RateLimitFilter:
+    """按日志调用位置限流，避免热点路径上重复的日志拖慢调用方
+
+    同一位置（模块、函数、行号）每秒最多记录 limit 条，超出的日志被丢弃，
+    下一条被记录的日志会附带被丢弃的条数。
+    """
+
+    def __init__(self, limit: int, interval: float = 1.0):
+        self.limit = limit
+        self.interval = interval
+        self._lock = threading.Lock()
+        # 调用位置 -> [窗口开始时间, 窗口内已记录条数, 被丢弃条数]
+        self._windows: dict[tuple, list] = {}
+
+    def __call__(self, record) -> bool:
+        key = (record["name"], record["function"], record["line"])
+        now = time.monotonic()
+        with self._lock:
+            window = self._windows.get(key)
+            if window is None or now - window[0] >= self.interval:
+                suppressed = window[2] if window is not None else 0
+                self._windows[key] = [now, 1, 0]
+            elif window[1] < self.limit:
+                window[1] += 1
+                suppressed = 0
+            else:
+                window[2] += 1
+                return False
+        if suppressed:
+            record["message"] += f" (已忽略 {suppressed} 条重复日志)"
+        return True
+
+
 def setup_logger():
     """配置日志记录器"""
+    from loguru import logger
+
     config = load_logging_config()
     logger_config = config["logger"]
 
     log_level = logger_config["level"]
+    log_sink = logger_config["sink"]
     log_file = logger_config["log_file"]
     rotation = logger_config["rotation"]
     retention = logger_config["retention"]
     file_permission = logger_config["file_permission"]
     log_format = logger_config["format"]
+    rate_limit = logger_config["rate_limit"]
+
+    options = {
+        "level": log_level,
+        "format": log_format,
+        # 后台线程写入，调用方只需把日志放入队列
+        "enqueue": logger_config["enqueue"],
+        # diagnose会在异常日志中输出变量值（可能包含密钥），默认关闭
+        "backtrace": logger_config["diagnose"],
+        "diagnose": logger_config["diagnose"],
+        "filter": RateLimitFilter(rate_limit) if rate_limit > 0 else None,
+    }
+
+    # 配置日志记录器
+    logger.remove()
+    if log_sink == "none":
+        return logger
+    if log_sink == "stderr":
+        logger.add(sys.stderr, **options)
+        return logger
 
     # 创建日志目录
     log_dir = Path.home() / get_log_path()
@@ -44,17 +106,12 @@ def setup_logger():
     if log_path.exists():
         os.chmod(log_path, int(file_permission, 8))
 
-    # 配置日志记录器
-    logger.remove()
     logger.add(
         log_path,
         rotation=rotation,
         retention=retention,
-        level=log_level,
-        format=log_format,
         encoding="utf-8",
-        backtrace=True,
-        diagnose=True,
+        **options,
     )
 
     return logger
@@ -63,10 +120,23 @@ def setup_logger():
 _logger = None
 
 
+class _LazyLogger:
+    """日志记录器代理，首次记录日志时才导入loguru并配置日志
+
+    模块导入时执行 log = get_logger() 不会产生任何副作用。
+    """
+
+    def __getattr__(self, name):
+        global _logger
+        if _logger is None:
+            # 配置日志记录器
+            _logger = setup_logger()
+        return getattr(_logger, name)
+
+
+_lazy_logger = _LazyLogger()
+
+
 def get_logger():
     """获取日志记录器"""
-    global _logger
-    if _logger is None:
-        # 配置日志记录器
-        _logger = setup_logger()
-    return _logger
+    return _lazy_logger
@@ -0,0 +1,132 @@
+import asyncio
+import os
+import signal
+import time
+from pathlib import Path
+from typing import Optional
+
+from src.core.config.config import get_db_path
+from src.core.daemon.client import DaemonClient, decode_message, encode_message
+
+# 解锁代理只依赖标准库：CLI通过它获取密钥时不需要加载数据库和加密模块
+
+
+def get_agent_socket_path() -> Path:
+    """获取解锁代理Unix套接字路径（位于数据目录下）"""
+    return Path.home() / get_db_path() / "agent.sock"
+
+
+class AgentClient(DaemonClient):
+    """解锁代理客户端，代理未运行时request返回None"""
+
+    def __init__(self, socket_path: Optional[Path] = None, timeout: float = 2.0):
+        super().__init__(socket_path or get_agent_socket_path(), timeout)
+
+    def get_unlock_key(self) -> Optional[bytes]:
+        """获取代理保存的解锁密钥，代理未运行时返回None"""
+        response = self.request("KEY")
+        return response[0].encode() if response else None
+
+
+class UnlockAgent:
+    """解锁代理：在内存中保存由密码派生的解锁密钥，通过Unix套接字提供给本机其他进程
+
+    密钥派生只在解锁时执行一次；超过idle_timeout秒没有请求时自动退出（锁定）。
+
+    支持的命令：
+        PING   -> OK\tpong
+        KEY    -> OK\t解锁密钥
+        STATUS -> OK\t剩余秒数
+        LOCK   -> OK（随后退出）
+    """
+
+    def __init__(
+        self, unlock_key: bytes, idle_timeout: float, socket_path: Optional[Path] = None
+    ):
+        """
+        Args:
+            unlock_key: 解锁密钥（urlsafe base64编码的Fernet密钥）
+            idle_timeout: 无请求多久后自动锁定（秒）
+            socket_path: Unix套接字路径（None则使用默认路径）
+        """
+        self.socket_path = Path(socket_path or get_agent_socket_path())
+        self.idle_timeout = idle_timeout
+        self._unlock_key: Optional[bytes] = unlock_key
+        self._deadline = time.monotonic() + idle_timeout
+        self._stopped: Optional[asyncio.Event] = None
+
+    def dispatch(self, command: str, args: list[str]) -> list[str]:
+        """执行一条命令，返回响应字段"""
+        if command == "PING":
+            return ["pong"]
+        if command == "STATUS":
+            return [str(int(self._deadline - time.monotonic()))]
+        if command == "KEY" and not args:
+            self._deadline = time.monotonic() + self.idle_timeout
+            return [self._unlock_key.decode()]
+        if command == "LOCK":
+            self.stop()
+            return []
+        raise ValueError(f"无效的命令: {command}")
+
+    def stop(self) -> None:
+        """丢弃密钥并停止服务"""
+        self._unlock_key = None
+        if self._stopped is not None:
+            self._stopped.set()
+
+    async def handle_client(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        """处理一个客户端连接"""
+        try:
+            while self._unlock_key is not None and (line := await reader.readline()):
+                command, *args = decode_message(line)
+                try:
+                    response = encode_message("OK", *self.dispatch(command, args))
+                except Exception as e:
+                    response = encode_message("ERR", str(e).replace("\n", " "))
+                writer.write(response)
+                await writer.drain()
+        except (ConnectionError, UnicodeDecodeError):
+            pass
+        finally:
+            writer.close()
+
+    async def serve_forever(self) -> None:
+        """启动服务，直到空闲超时、收到LOCK或SIGINT/SIGTERM"""
+        self._stopped = asyncio.Event()
+        if self.socket_path.exists():
+            self.socket_path.unlink()
+        # 套接字创建时即只允许当前用户访问
+        old_umask = os.umask(0o177)
+        try:
+            server = await asyncio.start_unix_server(
+                self.handle_client, path=str(self.socket_path)
+            )
+        finally:
+            os.umask(old_umask)
+
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(sig, self.stop)
+        try:
+            while not self._stopped.is_set():
+                remaining = self._deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    await asyncio.wait_for(self._stopped.wait(), timeout=remaining)
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            self._unlock_key = None
+            server.close()
+            await server.wait_closed()
+            if self.socket_path.exists():
+                self.socket_path.unlink()
+
+
+def run_agent(unlock_key: bytes, idle_timeout: float) -> None:
+    """运行解锁代理（阻塞直到锁定）"""
+    asyncio.run(UnlockAgent(unlock_key, idle_timeout).serve_forever())
@@ -0,0 +1,90 @@
+import re
+import socket
+from pathlib import Path
+from typing import Optional
+
+from src.core.config.config import get_db_path
+
+# 协议：请求和响应均为一行，字段以制表符分隔
+# 请求：命令\t参数1\t参数2...\n
+# 响应：OK\t字段1\t字段2...\n 或 ERR\t错误信息\n
+# 字段中的反斜杠、制表符和换行符分别转义为 \\、\t 和 \n
+FIELD_SEPARATOR = "\t"
+LINE_END = "\n"
+_ESCAPES = {"\\": "\\\\", "\t": "\\t", "\n": "\\n"}
+_UNESCAPES = {"\\": "\\", "t": "\t", "n": "\n"}
+_ESCAPE_PATTERN = re.compile(r"[\\\t\n]")
+_UNESCAPE_PATTERN = re.compile(r"\\(.)")
+
+
+def get_socket_path() -> Path:
+    """获取守护进程Unix套接字路径（位于数据目录下）"""
+    return Path.home() / get_db_path() / "totp.sock"
+
+
+def encode_message(*fields: str) -> bytes:
+    """把字段编码为一行协议消息（转义字段中的特殊字符）"""
+    escaped = (
+        _ESCAPE_PATTERN.sub(lambda match: _ESCAPES[match.group()], field)
+        for field in fields
+    )
+    return (FIELD_SEPARATOR.join(escaped) + LINE_END).encode("utf-8")
+
+
+def decode_message(line: bytes) -> list[str]:
+    """把一行协议消息解码为字段列表"""
+    return [
+        _UNESCAPE_PATTERN.sub(
+            lambda match: _UNESCAPES.get(match.group(1), match.group(1)), field
+        )
+        for field in line.decode("utf-8").rstrip(LINE_END).split(FIELD_SEPARATOR)
+    ]
+
+
+class DaemonError(Exception):
+    """守护进程返回的错误"""
+
+
+class DaemonClient:
+    """守护进程客户端（只依赖标准库，避免CLI加载数据库和加密模块）"""
+
+    def __init__(self, socket_path: Optional[Path] = None, timeout: float = 2.0):
+        """
+        Args:
+            socket_path: Unix套接字路径（None则使用默认路径）
+            timeout: 连接和读写超时时间（秒）
+        """
+        self.socket_path = socket_path or get_socket_path()
+        self.timeout = timeout
+
+    def request(self, command: str, *args: str) -> Optional[list[str]]:
+        """发送一条请求
+
+        Args:
+            command: 命令名（GET、LIST、VERIFY等）
+            *args: 命令参数
+
+        Returns:
+            Optional[list[str]]: 响应字段（不含OK），守护进程未运行时返回None
+
+        Raises:
+            DaemonError: 守护进程返回错误
+        """
+        if not hasattr(socket, "AF_UNIX") or not self.socket_path.exists():
+            return None
+        try:
+            with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+                sock.settimeout(self.timeout)
+                sock.connect(str(self.socket_path))
+                sock.sendall(encode_message(command, *args))
+                with sock.makefile("rb") as reader:
+                    line = reader.readline()
+        except OSError:
+            return None
+        if not line:
+            return None
+
+        status, *fields = decode_message(line)
+        if status != "OK":
+            raise DaemonError(fields[0] if fields else "未知错误")
+        return fields
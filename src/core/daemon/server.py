@@ -0,0 +1,223 @@
+import asyncio
+import json
+import os
+import signal
+import socket
+import time
+from bisect import bisect_right
+from pathlib import Path
+from typing import Optional
+
+from src.core.config.config import get_settings
+from src.core.config.logging import get_logger
+from src.core.daemon.client import decode_message, encode_message, get_socket_path
+from src.core.data.operation.totp_account_manager import TotpAccountManager
+from src.core.data.operation.vault_snapshot import VaultEntry, VaultSnapshot
+from src.core.utils.metrics import metrics
+from src.core.utils.totp_cache import TOTPCodeCache
+from src.core.utils.totp_utils import TOTPUtils
+from src.core.utils.totp_verifier import TOTPVerifier
+
+log = get_logger()
+
+
+class TotpDaemon:
+    """常驻守护进程：在内存中保存解密后的账户和验证码缓存，通过Unix套接字提供服务
+
+    支持的命令：
+        PING                  -> OK\tpong
+        GET\t账户名           -> OK\t验证码\t剩余秒数
+        LIST[\t起始[\t数量]]  -> OK\t账户名1\t账户名2...（账户名大于起始值，最多数量个）
+        VERIFY\t账户名\t验证码 -> OK\t1 或 OK\t0（允许前后1个时间窗口，不可重放）
+        RELOAD                -> OK\t账户数量
+        STATS                 -> OK\t统计数据(JSON)
+    """
+
+    def __init__(
+        self, socket_path: Optional[Path] = None, check_interval: Optional[float] = None
+    ):
+        """
+        Args:
+            socket_path: Unix套接字路径（None则使用默认路径）
+            check_interval: 检查账户是否变化的最小间隔（秒，None则使用配置）
+        """
+        self.socket_path = Path(socket_path or get_socket_path())
+        if check_interval is None:
+            check_interval = get_settings().refresh_interval
+        self.check_interval = check_interval
+        self.snapshot = VaultSnapshot()  # 已解密账户的内存快照
+        self.code_cache = TOTPCodeCache()
+        self.verifier = TOTPVerifier()
+        self._signature = None
+        self._checked_at = 0.0
+        self._reload_lock: Optional[asyncio.Lock] = None
+
+    def load_vault(self, signature=None, full: bool = False) -> None:
+        """从数据库增量加载账户到内存快照（在线程池中执行）
+
+        Args:
+            signature: 加载时的账户集合签名
+            full: 是否丢弃快照重新加载所有账户
+        """
+        if full:
+            self.snapshot.reload()
+            self.code_cache.clear()
+        else:
+            self.snapshot.refresh()
+        self._signature = signature
+        log.info(f"守护进程已加载 {len(self.snapshot)} 个账户")
+
+    async def ensure_fresh(self, force: bool = False) -> None:
+        """账户发生增删改时重新加载（最多每check_interval秒检查一次）"""
+        if not force and time.monotonic() - self._checked_at < self.check_interval:
+            return
+        async with self._reload_lock:
+            if not force and time.monotonic() - self._checked_at < self.check_interval:
+                return
+            signature = await asyncio.to_thread(
+                TotpAccountManager.get_accounts_signature
+            )
+            if force or signature != self._signature:
+                await asyncio.to_thread(self.load_vault, signature, force)
+            self._checked_at = time.monotonic()
+
+    def current_code(self, account_name: str) -> tuple[str, int]:
+        """获取账户当前验证码及剩余有效秒数"""
+        entry = self.account(account_name)
+        now = time.time()
+        code = self.code_cache.get(
+            entry.id, entry.period, for_time=now, version=entry.version
+        )
+        if code is None:
+            code = TOTPUtils.generate_many(
+                [(entry.mac, entry.digits, entry.period)], for_time=now
+            )[0]
+            self.code_cache.put(
+                entry.id, entry.period, code, for_time=now, version=entry.version
+            )
+        return code, entry.period - int(now % entry.period)
+
+    def account(self, account_name: str) -> VaultEntry:
+        """获取可用的账户记录，不存在或无法解密时抛出KeyError"""
+        entry = self.snapshot.by_name(account_name)
+        if entry is None:
+            raise KeyError(f"账户不存在: {account_name}")
+        if entry.mac is None:
+            raise KeyError(f"账户无法解密: {account_name}")
+        return entry
+
+    def list_names(self, after: str = "", limit: str = "") -> list[str]:
+        """按账户名顺序返回账户名大于after的最多limit个账户名（空字符串表示不限制）"""
+        entries = self.snapshot.entries()
+        start = (
+            bisect_right(entries, after, key=lambda entry: entry.name) if after else 0
+        )
+        end = start + int(limit) if limit else len(entries)
+        return [entry.name for entry in entries[start:end]]
+
+    async def dispatch(self, command: str, args: list[str]) -> list[str]:
+        """执行一条命令，返回响应字段"""
+        if command == "PING":
+            return ["pong"]
+        if command == "STATS":
+            return [json.dumps(metrics.snapshot())]
+        if command == "RELOAD":
+            await self.ensure_fresh(force=True)
+            return [str(len(self.snapshot))]
+
+        await self.ensure_fresh()
+        if command == "GET" and len(args) == 1:
+            code, remaining = self.current_code(args[0])
+            return [code, str(remaining)]
+        if command == "LIST" and len(args) <= 2:
+            return self.list_names(*args)
+        if command == "VERIFY" and len(args) == 2:
+            entry = self.account(args[0])
+            verified = self.verifier.verify(
+                entry.id,
+                entry.mac,
+                args[1],
+                entry.digits,
+                entry.period,
+                version=entry.version,
+                algorithm=entry.algorithm,
+            )
+            return ["1" if verified else "0"]
+        raise ValueError(f"无效的命令: {command}")
+
+    async def handle_client(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        """处理一个客户端连接（同一连接可发送多条请求）"""
+        try:
+            while True:
+                try:
+                    line = await reader.readline()
+                except (ValueError, asyncio.LimitOverrunError) as e:
+                    # 请求超过读取缓冲区上限，无法定位下一条请求，回复错误后关闭连接
+                    log.warning(f"客户端请求过长: {str(e)}")
+                    writer.write(encode_message("ERR", "请求过长"))
+                    await writer.drain()
+                    break
+                if not line:
+                    break
+                command, *args = decode_message(line)
+                try:
+                    response = encode_message("OK", *await self.dispatch(command, args))
+                except KeyError as e:
+                    response = encode_message("ERR", str(e.args[0]))
+                except Exception as e:
+                    response = encode_message("ERR", str(e).replace("\n", " "))
+                writer.write(response)
+                await writer.drain()
+        except (ConnectionError, UnicodeDecodeError) as e:
+            log.warning(f"客户端连接异常: {str(e)}")
+        finally:
+            writer.close()
+
+    async def serve_forever(self) -> None:
+        """启动服务，直到收到SIGINT/SIGTERM"""
+        if self.socket_path.exists():
+            if _socket_in_use(self.socket_path):
+                raise ValueError(f"守护进程已在运行: {self.socket_path}")
+            # 清理上次异常退出遗留的套接字文件
+            self.socket_path.unlink()
+
+        self._reload_lock = asyncio.Lock()
+        await self.ensure_fresh(force=True)
+        # 套接字创建时即只允许当前用户访问
+        old_umask = os.umask(0o177)
+        try:
+            server = await asyncio.start_unix_server(
+                self.handle_client, path=str(self.socket_path)
+            )
+        finally:
+            os.umask(old_umask)
+        log.info(f"守护进程已启动: {self.socket_path}")
+
+        stop = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(sig, stop.set)
+        try:
+            async with server:
+                await stop.wait()
+        finally:
+            if self.socket_path.exists():
+                self.socket_path.unlink()
+            log.info("守护进程已停止")
+
+
+def _socket_in_use(socket_path: Path) -> bool:
+    """套接字文件是否有进程在监听"""
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        try:
+            sock.connect(str(socket_path))
+        except OSError:
+            return False
+    return True
+
+
+def run_daemon(socket_path: Optional[Path] = None) -> None:
+    """运行守护进程（阻塞直到退出）"""
+    asyncio.run(TotpDaemon(socket_path).serve_forever())
@@ -1,19 +1,11 @@
 from datetime import datetime
-from pathlib import Path
 
 from peewee import (
-    SqliteDatabase,
     Model,
     DateTimeField,
 )
 
-from src.core.config.config import get_db_path
-from src.core.config.logging import get_logger
-
-log = get_logger()
-
-DATA_DIR = Path.home() / get_db_path()
-db = SqliteDatabase(DATA_DIR / "totp_db.sqlite")
+from src.core.data.connection import db
 
 
 class BaseModel(Model):
@@ -0,0 +1,137 @@
+import threading
+from pathlib import Path
+
+from peewee import OperationalError, SqliteDatabase
+
+from src.core.config.config import get_db_path, get_settings
+
+# SQLite性能配置，两者都使用WAL，使读操作不阻塞写操作（GUI和CLI可同时使用）
+SQLITE_PROFILES = {
+    # 持久优先：每次提交都同步到磁盘，断电也不会丢失已提交的数据
+    "durable": {
+        "journal_mode": "wal",
+        "synchronous": "full",
+        "cache_size": -16000,  # 16MB页缓存
+        "mmap_size": 64 * 1024 * 1024,
+        "temp_store": "memory",
+    },
+    # 速度优先：只在检查点时同步，断电可能丢失最近的提交，但数据库不会损坏
+    "fast": {
+        "journal_mode": "wal",
+        "synchronous": "normal",
+        "cache_size": -64000,  # 64MB页缓存
+        "mmap_size": 256 * 1024 * 1024,
+        "temp_store": "memory",
+    },
+}
+
+
+# 已有数据库缺少的列：(表名, 列名, 列定义)，首次连接时自动补齐
+SCHEMA_UPGRADES = [
+    ("totpaccount", "algorithm", "VARCHAR(10) NOT NULL DEFAULT 'SHA1'"),
+]
+
+
+# 账户名搜索索引：trigram分词的FTS5外部内容表，由触发器与账户表保持同步
+SEARCH_TABLE = "totpaccount_search"
+SEARCH_SCHEMA = [
+    f"""CREATE VIRTUAL TABLE {SEARCH_TABLE} USING fts5(
+        account_name, content='totpaccount', content_rowid='id', tokenize='trigram'
+    )""",
+    f"""CREATE TRIGGER {SEARCH_TABLE}_ai AFTER INSERT ON totpaccount BEGIN
+        INSERT INTO {SEARCH_TABLE}(rowid, account_name) VALUES (new.id, new.account_name);
+    END""",
+    f"""CREATE TRIGGER {SEARCH_TABLE}_ad AFTER DELETE ON totpaccount BEGIN
+        INSERT INTO {SEARCH_TABLE}({SEARCH_TABLE}, rowid, account_name)
+        VALUES ('delete', old.id, old.account_name);
+    END""",
+    f"""CREATE TRIGGER {SEARCH_TABLE}_au AFTER UPDATE OF account_name ON totpaccount BEGIN
+        INSERT INTO {SEARCH_TABLE}({SEARCH_TABLE}, rowid, account_name)
+        VALUES ('delete', old.id, old.account_name);
+        INSERT INTO {SEARCH_TABLE}(rowid, account_name) VALUES (new.id, new.account_name);
+    END""",
+    # 为已有账户建立索引
+    f"INSERT INTO {SEARCH_TABLE}({SEARCH_TABLE}) VALUES ('rebuild')",
+]
+
+
+def get_database_path() -> Path:
+    """获取数据库文件路径"""
+    return Path.home() / get_db_path() / "totp_db.sqlite"
+
+
+def get_pragmas() -> dict:
+    """根据配置的性能配置和额外pragma生成连接参数"""
+    settings = get_settings()
+    if settings.sqlite_profile not in SQLITE_PROFILES:
+        raise ValueError(f"未知的SQLite配置: {settings.sqlite_profile}")
+    pragmas = dict(SQLITE_PROFILES[settings.sqlite_profile])
+    pragmas["busy_timeout"] = int(settings.sqlite_busy_timeout * 1000)
+    pragmas.update(settings.sqlite_pragmas)
+    return pragmas
+
+
+class LazySqliteDatabase(SqliteDatabase):
+    """全局共享的SQLite数据库，首次连接时才确定文件路径并创建数据目录
+
+    导入模型模块不会读取配置或访问文件系统。每个线程持有各自的连接，
+    连接打开后在该线程内复用，直到显式调用close。
+    """
+
+    def __init__(self):
+        super().__init__(None, thread_safe=True, autoconnect=True)
+        self.search_available = False  # SQLite是否支持trigram分词（3.34+）
+        self._schema_checked = False
+        self._schema_lock = threading.Lock()
+
+    def connect(self, reuse_if_open=False):
+        if self.deferred:
+            settings = get_settings()
+            database_path = get_database_path()
+            database_path.parent.mkdir(parents=True, exist_ok=True)
+            self.init(
+                str(database_path),
+                pragmas=get_pragmas(),
+                timeout=settings.sqlite_busy_timeout,
+            )
+        opened = super().connect(reuse_if_open=reuse_if_open)
+        if not self._schema_checked:
+            with self._schema_lock:
+                if not self._schema_checked:
+                    self.upgrade_schema()
+                    self._schema_checked = True
+        return opened
+
+    def upgrade_schema(self):
+        """为旧版本数据库补齐新增的列和搜索索引（表不存在时跳过，由init_db创建）"""
+        for table, column, definition in SCHEMA_UPGRADES:
+            columns = {
+                row[1] for row in self.execute_sql(f"PRAGMA table_info({table})")
+            }
+            if columns and column not in columns:
+                self.execute_sql(
+                    f"ALTER TABLE {table} ADD COLUMN {column} {definition}"
+                )
+        if self.table_exists("totpaccount"):
+            self.create_search_index()
+
+    def create_search_index(self):
+        """创建账户名搜索索引（已存在时跳过）
+
+        SQLite不支持FTS5 trigram分词时不创建索引，搜索退化为逐行匹配。
+        """
+        if self.table_exists(SEARCH_TABLE):
+            self.search_available = True
+            return
+        try:
+            with self.atomic():
+                for statement in SEARCH_SCHEMA:
+                    self.execute_sql(statement)
+        except OperationalError:
+            self.search_available = False
+            return
+        self.search_available = True
+
+
+# 全局共享的数据库对象，所有模型都使用它
+db = LazySqliteDatabase()
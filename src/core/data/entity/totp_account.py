@@ -10,6 +10,7 @@ class TotpAccount(BaseModel):
     encrypted_secret = BlobField()
     digits = IntegerField(default=6, verbose_name="验证码位数")
     period = IntegerField(default=30, verbose_name="有效期(秒)")
+    algorithm = CharField(max_length=10, default="SHA1", verbose_name="哈希算法")
 
     def __str__(self):
         return f"{self.account_name}"
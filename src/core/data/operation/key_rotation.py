@@ -0,0 +1,258 @@
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from peewee import fn
+
+from src.core.config.logging import get_logger
+from src.core.data.connection import db
+from src.core.data.entity.totp_account import TotpAccount
+from src.core.utils.encryption_utils import (
+    ACTIVE_KEY_CHECK_INTERVAL,
+    EncryptionUtils,
+    key_id_prefix,
+    split_key_id,
+)
+
+log = get_logger()
+
+
+def _reencrypt_batch(keys, active_key_id, rows):
+    """子进程任务：用当前密钥重新加密一批数据
+
+    Args:
+        keys: {密钥ID: 密钥}
+        active_key_id: 新密钥ID
+        rows: [(账户ID, 加密数据), ...]
+
+    Returns:
+        tuple: ([(账户ID, 原加密数据, 新加密数据), ...], [解密失败的账户ID])
+    """
+    from cryptography.fernet import Fernet
+
+    ciphers = {key_id: Fernet(key) for key_id, key in keys.items()}
+    new_cipher = ciphers[active_key_id]
+    prefix = key_id_prefix(active_key_id)
+    results = []
+    failed = []
+    for account_id, encrypted_secret in rows:
+        key_id, token = split_key_id(encrypted_secret)
+        try:
+            secret = ciphers[key_id].decrypt(token)
+        except Exception:
+            failed.append(account_id)
+            continue
+        results.append(
+            (account_id, encrypted_secret, prefix + new_cipher.encrypt(secret))
+        )
+    return results, failed
+
+
+class KeyRotation:
+    """主密钥轮换：生成新密钥，并把所有账户的密钥数据重新加密
+
+    轮换期间新旧密钥同时保存（每条加密数据带有密钥ID前缀），读写不受影响。
+    重新加密按批次在进程池中进行，每批在一个短事务中写入，不会长时间锁库。
+    已处理的账户以新密钥前缀标记，中断后再次运行会从剩余账户继续。
+    有账户无法解密时保留旧密钥，可以指定drop_failed删除这些账户后完成轮换。
+    """
+
+    def __init__(self, batch_size=500, workers=None, progress=None, drop_failed=False):
+        """
+        Args:
+            batch_size: 每个事务重新加密的账户数量
+            workers: 进程池大小（None则按CPU核数，1则在当前进程中执行）
+            progress: 进度回调，每批完成后以 (已处理数, 剩余数) 调用
+            drop_failed: 是否删除无法解密的账户并删除旧密钥
+        """
+        self.batch_size = batch_size
+        self.workers = workers or os.cpu_count() or 1
+        self.progress = progress
+        self.drop_failed = drop_failed
+
+    @staticmethod
+    def _pending_query(active_key_id):
+        """尚未使用指定密钥加密的账户"""
+        prefix = key_id_prefix(active_key_id)
+        return TotpAccount.select().where(
+            fn.SUBSTR(TotpAccount.encrypted_secret, 1, len(prefix)) != prefix
+        )
+
+    def start_or_resume(self):
+        """开始新的轮换，或继续上次中断的轮换
+
+        Returns:
+            tuple: (本次轮换的目标密钥ID, 是否为继续执行)
+        """
+        keys, active_key_id = EncryptionUtils.load_keys()
+        # 存在多个密钥说明上次轮换尚未完成（完成时会删除旧密钥）
+        if len(keys) > 1:
+            log.info(f"继续未完成的密钥轮换: {active_key_id}")
+            return active_key_id, True
+        return EncryptionUtils.add_key(EncryptionUtils.generate_fernet_key()), False
+
+    def run(self):
+        """执行轮换，直到所有账户都使用新密钥且旧密钥被删除
+
+        Returns:
+            dict: 统计信息，包含 key_id、resumed、reencrypted、failed、
+                  failed_ids（解密失败的账户ID）和 dropped（被删除的账户数）
+        """
+        started_at = time.monotonic()
+        active_key_id, resumed = self.start_or_resume()
+        keys, _ = EncryptionUtils.load_keys()
+        stats = {
+            "key_id": active_key_id,
+            "resumed": resumed,
+            "reencrypted": 0,
+            "failed": 0,
+            "failed_ids": [],
+            "dropped": 0,
+        }
+        failed_ids = set()
+
+        executor = ProcessPoolExecutor(self.workers) if self.workers > 1 else None
+        try:
+            while True:
+                self._reencrypt_pending(
+                    executor, keys, active_key_id, stats, failed_ids
+                )
+                # 等待其他进程的加密会话确认到新密钥，避免它们仍用旧密钥写入
+                grace = 2 * ACTIVE_KEY_CHECK_INTERVAL - (time.monotonic() - started_at)
+                if grace > 0:
+                    time.sleep(grace)
+                if self._finish(keys, active_key_id, failed_ids, stats):
+                    break
+        finally:
+            if executor is not None:
+                executor.shutdown()
+
+        stats["failed_ids"] = sorted(failed_ids)
+        log.info(
+            f"密钥轮换完成: {active_key_id}，重新加密 {stats['reencrypted']}，失败 {stats['failed']}"
+        )
+        return stats
+
+    def _reencrypt_pending(self, executor, keys, active_key_id, stats, failed_ids):
+        """按ID顺序分批重新加密所有未使用新密钥的账户"""
+        last_id = 0
+        while True:
+            # 一次读取可供所有进程并行处理的行数
+            rows = list(
+                self._pending_query(active_key_id)
+                .select(TotpAccount.id, TotpAccount.encrypted_secret)
+                .where(TotpAccount.id > last_id)
+                .order_by(TotpAccount.id)
+                .limit(self.batch_size * self.workers)
+                .tuples()
+            )
+            if not rows:
+                return
+            last_id = rows[-1][0]
+            batches = [
+                rows[i : i + self.batch_size]
+                for i in range(0, len(rows), self.batch_size)
+            ]
+            if executor is None:
+                results = [_reencrypt_batch(keys, active_key_id, b) for b in batches]
+            else:
+                results = executor.map(
+                    _reencrypt_batch,
+                    [keys] * len(batches),
+                    [active_key_id] * len(batches),
+                    batches,
+                )
+
+            for reencrypted, failed in results:
+                with db.atomic():
+                    for account_id, old_secret, new_secret in reencrypted:
+                        # 只在数据未被并发修改时写入，被修改的账户会在下一轮重新处理
+                        stats["reencrypted"] += (
+                            TotpAccount.update(encrypted_secret=new_secret)
+                            .where(
+                                (TotpAccount.id == account_id)
+                                & (TotpAccount.encrypted_secret == old_secret)
+                            )
+                            .execute()
+                        )
+                new_failures = set(failed) - failed_ids
+                stats["failed"] += len(new_failures)
+                failed_ids.update(new_failures)
+                for account_id in new_failures:
+                    log.error(f"账户 {account_id} 解密失败，无法重新加密")
+
+            if self.progress is not None:
+                remaining = (
+                    self._pending_query(active_key_id)
+                    .where(TotpAccount.id > last_id)
+                    .count()
+                )
+                self.progress(stats["reencrypted"], remaining)
+
+    @staticmethod
+    def _reencrypt_vault():
+        """用新密钥重写单文件保险库（文件不存在或已使用新密钥时跳过）"""
+        from src.core.data.vault_file import get_vault_store
+
+        count = get_vault_store().reencrypt()
+        if count:
+            log.info(f"保险库文件已用新密钥重新加密 {count} 个账户")
+
+    def _pending_ids(self, active_key_id):
+        """尚未使用新密钥加密的账户ID"""
+        return {
+            account_id
+            for (account_id,) in self._pending_query(active_key_id)
+            .select(TotpAccount.id)
+            .tuples()
+        }
+
+    def _finish(self, keys, active_key_id, failed_ids, stats):
+        """确认所有账户都已使用新密钥后删除旧密钥
+
+        Returns:
+            bool: 轮换是否已结束（仍有新写入的旧密钥数据时返回False）
+        """
+        # 全表扫描和重写保险库都在事务外进行，只在删除密钥前短暂持有写锁
+        if self._pending_ids(active_key_id) - failed_ids:
+            return False
+        if failed_ids and not self.drop_failed:
+            # 保留旧密钥，避免无法解密的数据彻底丢失
+            log.warning(
+                f"{len(failed_ids)} 个账户解密失败，保留旧密钥: {sorted(failed_ids)}"
+            )
+            return True
+        old_key_ids = [key_id for key_id in keys if key_id != active_key_id]
+        if not old_key_ids:
+            return True
+        # 单文件保险库同样由主密钥加密，删除旧密钥前先用新密钥重写
+        self._reencrypt_vault()
+
+        with db.atomic("IMMEDIATE"):
+            # 扫描后可能有其他进程写入旧密钥数据，持锁重新确认
+            pending = self._pending_ids(active_key_id)
+            if pending - failed_ids:
+                return False
+            if pending:
+                # 只删除仍然无法解密的账户，期间被重新写入的账户不受影响
+                stats["dropped"] = (
+                    TotpAccount.delete().where(TotpAccount.id.in_(pending)).execute()
+                )
+                log.warning(
+                    f"已删除 {stats['dropped']} 个无法解密的账户: {sorted(pending)}"
+                )
+            # 保险库已使用新密钥时直接跳过
+            self._reencrypt_vault()
+            EncryptionUtils.delete_keys(old_key_ids)
+        return True
+
+
+def rotate_master_key(batch_size=500, workers=None, progress=None, drop_failed=False):
+    """轮换主密钥（项目专用接口），参数见KeyRotation"""
+    from src.core.data.operation.totp_account_manager import TotpAccountManager
+
+    try:
+        return KeyRotation(batch_size, workers, progress, drop_failed).run()
+    finally:
+        # 账户已被重新加密，缓存的旧数据不再可用
+        TotpAccountManager.invalidate_cache()
@@ -0,0 +1,169 @@
+import os
+import sqlite3
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterator, Optional
+
+from src.core.data.connection import get_database_path
+from src.core.data.entity.totp_account import TotpAccount
+from src.core.utils.encryption_utils import EncryptionUtils, split_key_id
+
+# 每个分片至少包含的账户数量，账户较少时不值得启动更多进程
+MIN_SHARD_SIZE = 256
+# 每个进程分到的分片数量，分片越多负载越均衡
+SHARDS_PER_WORKER = 4
+
+
+def _read_shard(database_path, keys, low_id, high_id, for_time):
+    """子进程任务：用只读连接读取一个ID范围内的账户，解密并生成验证码
+
+    Args:
+        database_path: 数据库文件路径
+        keys: {密钥ID: 密钥}
+        low_id: 起始账户ID（包含）
+        high_id: 结束账户ID（不包含，None则到最后）
+        for_time: 生成验证码的时间戳（None则不生成）
+
+    Returns:
+        list: ((id, account_name, encrypted_secret, digits, period, algorithm), 密钥, 验证码)，
+              按ID排序，解密失败的账户密钥和验证码为None
+    """
+    from cryptography.fernet import Fernet
+
+    from src.core.utils.totp_utils import TOTPUtils
+
+    ciphers = {key_id: Fernet(key) for key_id, key in keys.items()}
+    sql = (
+        "SELECT id, account_name, encrypted_secret, digits, period, algorithm "
+        "FROM totpaccount WHERE id >= ?"
+    )
+    params = [low_id]
+    if high_id is not None:
+        sql += " AND id < ?"
+        params.append(high_id)
+    connection = sqlite3.connect(f"file:{database_path}?mode=ro", uri=True)
+    try:
+        accounts = connection.execute(sql + " ORDER BY id", params).fetchall()
+    finally:
+        connection.close()
+
+    secrets = []
+    macs = []
+    for account in accounts:
+        key_id, token = split_key_id(account[2])
+        try:
+            secret = ciphers[key_id].decrypt(token).decode()
+            mac = TOTPUtils.prepare(secret, account[5])
+        except Exception:
+            secret = mac = None
+        secrets.append(secret)
+        macs.append(mac)
+
+    codes = [None] * len(accounts)
+    if for_time is not None:
+        valid = [i for i, secret in enumerate(secrets) if secret is not None]
+        generated = TOTPUtils.generate_many(
+            [(macs[i], accounts[i][3], accounts[i][4]) for i in valid],
+            for_time=for_time,
+        )
+        for i, code in zip(valid, generated):
+            codes[i] = code
+    return list(zip(accounts, secrets, codes))
+
+
+class ShardedAccountReader:
+    """多进程并行解密账户并生成验证码
+
+    按账户ID范围把账户表分成多个分片，由进程池并行处理，每个进程使用自己的
+    只读数据库连接和解密器；结果按分片顺序合并，输出顺序与按ID遍历一致。
+    """
+
+    def __init__(self, workers=None):
+        """
+        Args:
+            workers: 进程池大小（None则按CPU核数，1则在当前进程中执行）
+        """
+        self.workers = workers or os.cpu_count() or 1
+
+    def shard_bounds(self) -> list[tuple[int, Optional[int]]]:
+        """按账户数量均匀划分ID范围
+
+        Returns:
+            list: [(起始ID, 结束ID), ...]，最后一个分片的结束ID为None
+        """
+        total = TotpAccount.select().count()
+        if total == 0:
+            return []
+        shards = max(1, min(self.workers * SHARDS_PER_WORKER, total // MIN_SHARD_SIZE))
+        starts = []
+        for shard in range(shards):
+            # 通过主键索引定位每个分片的第一个账户ID
+            start_id = (
+                TotpAccount.select(TotpAccount.id)
+                .order_by(TotpAccount.id)
+                .offset(shard * total // shards)
+                .limit(1)
+                .scalar()
+            )
+            if start_id is not None and (not starts or start_id > starts[-1]):
+                starts.append(start_id)
+        return list(zip(starts, starts[1:] + [None]))
+
+    def iter_accounts(self, for_time=None) -> Iterator[tuple]:
+        """按ID顺序返回所有账户的解密结果
+
+        Args:
+            for_time: 生成验证码的时间戳（None则不生成验证码）
+
+        Returns:
+            Iterator: ((id, account_name, encrypted_secret, digits, period, algorithm), 密钥, 验证码)，
+                      解密失败的账户密钥和验证码为None；使用单文件保险库时encrypted_secret为None
+        """
+        from src.core.data.operation.totp_account_manager import _vault_store
+
+        if _vault_store() is not None:
+            # 单文件保险库在读取时已经解密，没有可以分给子进程的工作
+            yield from self._iter_vault_accounts(for_time)
+            return
+        bounds = self.shard_bounds()
+        if not bounds:
+            return
+        keys, _ = EncryptionUtils.load_keys()
+        database_path = str(get_database_path())
+        args = (
+            [database_path] * len(bounds),
+            [keys] * len(bounds),
+            [low for low, _ in bounds],
+            [high for _, high in bounds],
+            [for_time] * len(bounds),
+        )
+
+        if self.workers == 1 or len(bounds) == 1:
+            for shard in map(_read_shard, *args):
+                yield from shard
+            return
+        with ProcessPoolExecutor(min(self.workers, len(bounds))) as executor:
+            # map按提交顺序返回结果，后面的分片在前面的输出时继续计算
+            for shard in executor.map(_read_shard, *args):
+                yield from shard
+
+    @staticmethod
+    def _iter_vault_accounts(for_time=None) -> Iterator[tuple]:
+        """在当前进程中遍历单文件保险库的账户（返回值同iter_accounts，encrypted_secret为None）"""
+        from src.core.data.operation.totp_account_manager import TotpAccountManager
+
+        codes = TotpAccountManager.iter_account_codes(
+            for_time=time.time() if for_time is None else for_time
+        )
+        for (account_id, name, secret, *params), code in codes:
+            # 无法生成验证码说明密钥无效，与分片读取一样视为解密失败
+            yield (
+                (account_id, name, None, *params),
+                None if code is None else secret.decode(),
+                code if for_time is not None else None,
+            )
+
+
+def iter_decrypted_accounts(workers=None, for_time=None):
+    """多进程解密所有账户（项目专用接口），参数见ShardedAccountReader"""
+    return ShardedAccountReader(workers).iter_accounts(for_time)
@@ -1,35 +1,441 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from itertools import islice
+
+from src.core.data.connection import SEARCH_TABLE, db
 from src.core.data.entity.totp_account import TotpAccount
 
-from peewee import DoesNotExist
+from peewee import SQL, DoesNotExist, EXCLUDED, fn
 
+from src.core.config.config import get_settings
 from src.core.config.logging import get_logger
+from src.core.utils.metrics import metrics, timed
 
 log = get_logger()
 
+# 批量导入覆盖已存在账户时更新的字段
+_UPSERT_FIELDS = (
+    TotpAccount.encrypted_secret,
+    TotpAccount.digits,
+    TotpAccount.period,
+    TotpAccount.algorithm,
+    TotpAccount.updated_at,
+)
+
+# 账户搜索方式
+SEARCH_MODES = ("auto", "prefix", "substring", "fuzzy")
+# trigram索引只能匹配至少3个字符的查询
+_MIN_INDEXED_QUERY = 3
+# 模糊搜索时查询与账户名共有的trigram比例下限
+_FUZZY_THRESHOLD = 0.5
+
+
+def _account_query():
+    """选择账户元组字段的查询 (id, account_name, encrypted_secret, digits, period, algorithm)"""
+    return TotpAccount.select(
+        TotpAccount.id,
+        TotpAccount.account_name,
+        TotpAccount.encrypted_secret,
+        TotpAccount.digits,
+        TotpAccount.period,
+        TotpAccount.algorithm,
+    )
+
+
+def _vault_store():
+    """配置为单文件保险库（STORAGE_BACKEND=vault）时返回其存储，否则返回None"""
+    if get_settings().storage_backend != "vault":
+        return None
+    from src.core.data.vault_file import get_vault_store
+
+    return get_vault_store()
+
+
+def _vault_records(store, account_names=None):
+    """保险库中的账户（VaultRecord），按ID排序
+
+    Args:
+        store: 保险库存储
+        account_names: 只读取这些账户（None则读取所有账户）
+    """
+    if account_names is None:
+        records = list(store.records())
+    else:
+        records = [
+            record
+            for record in map(store.get, dict.fromkeys(account_names))
+            if record is not None
+        ]
+    # 保险库按账户名排序存储，读取后按ID重新排序
+    records.sort(key=lambda record: record.id)
+    return records
+
+
+class AccountCache:
+    """账户的进程内LRU缓存（按账户名和ID），只用于SQLite存储
+
+    读取前检查当前线程连接的 PRAGMA data_version：其他连接（包括其他进程）提交修改后
+    该值变化，缓存整体失效；本进程通过管理器的修改直接使对应账户失效。
+    data_version只在同一连接上可比较，因此每个线程分别记录自己连接上的值。
+    账户集合签名也随缓存一起保存，数据未变化时不必重新聚合整张表。
+
+    未命中时的用法：先用version()取得版本，再查询数据库，最后把结果和该版本
+    交给put；查询期间数据发生变化时put不会写入，避免缓存旧数据。
+    """
+
+    def __init__(self, max_size):
+        """
+        Args:
+            max_size: 缓存的账户数量上限
+        """
+        self.max_size = max_size
+        self._accounts: OrderedDict[str, TotpAccount] = OrderedDict()
+        self._names: dict[int, str] = {}  # 账户ID -> 账户名
+        self._signature = None
+        # 每次清空或使账户失效时加1，查询期间缓存被修改时据此放弃写入
+        self._generation = 0
+        # 每个线程上次检查时的连接和data_version
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    def _data_version(self) -> int:
+        """当前线程连接的data_version，连接变化后首次检查时清空缓存（调用方需持有锁）"""
+        connection = db.connection()
+        (data_version,) = connection.execute("PRAGMA data_version").fetchone()
+        local = self._local
+        if getattr(local, "connection", None) is not connection:
+            # 新连接无法得知之前错过的修改，保守地清空一次
+            self._clear()
+            local.connection = connection
+        elif local.data_version != data_version:
+            self._clear()
+        local.data_version = data_version
+        return data_version
+
+    def _clear(self) -> None:
+        self._accounts.clear()
+        self._names.clear()
+        self._signature = None
+        self._generation += 1
+
+    def version(self):
+        """检查数据是否变化并返回当前版本，在查询数据库之前调用"""
+        with self._lock:
+            return self._generation, self._data_version()
+
+    def _unchanged(self, version) -> bool:
+        """自取得version以来缓存和数据库都没有变化（调用方需持有锁）"""
+        data_version = self._data_version()
+        return version == (self._generation, data_version)
+
+    def get(self, account_name=None, account_id=None):
+        """按账户名或ID查找缓存的账户，未命中时返回None"""
+        with self._lock:
+            self._data_version()
+            if account_name is None:
+                account_name = self._names.get(account_id)
+            account = self._accounts.get(account_name)
+            if account is None:
+                metrics.increment("cache.account_miss")
+                return None
+            self._accounts.move_to_end(account_name)
+            metrics.increment("cache.account_hit")
+            return account
+
+    def put(self, account, version) -> None:
+        """缓存查询到的账户，超过上限时淘汰最久未使用的账户
+
+        Args:
+            account: 查询到的账户
+            version: 查询之前由version()取得的版本，此后数据有变化时不写入
+        """
+        with self._lock:
+            if not self._unchanged(version):
+                return
+            self._accounts[account.account_name] = account
+            self._accounts.move_to_end(account.account_name)
+            self._names[account.id] = account.account_name
+            while len(self._accounts) > self.max_size:
+                _, evicted = self._accounts.popitem(last=False)
+                self._names.pop(evicted.id, None)
+
+    def get_signature(self):
+        """缓存的账户集合签名，数据变化后返回None"""
+        with self._lock:
+            self._data_version()
+            return self._signature
+
+    def put_signature(self, signature, version) -> None:
+        """缓存账户集合签名（version的含义同put）"""
+        with self._lock:
+            if self._unchanged(version):
+                self._signature = signature
+
+    def discard(self, account_name) -> None:
+        """使指定账户和账户集合签名失效（本进程修改账户后调用）"""
+        with self._lock:
+            account = self._accounts.pop(account_name, None)
+            if account is not None:
+                self._names.pop(account.id, None)
+            self._signature = None
+            self._generation += 1
+
+    def clear(self) -> None:
+        """清空缓存"""
+        with self._lock:
+            self._clear()
+
+
+_account_cache = None
+_account_cache_lock = threading.Lock()
+
+
+def _get_account_cache():
+    """进程内共享的账户缓存，ACCOUNT_CACHE_SIZE为0或使用单文件保险库时返回None"""
+    global _account_cache
+    if _vault_store() is not None:
+        return None
+    if _account_cache is None:
+        with _account_cache_lock:
+            if _account_cache is None:
+                _account_cache = AccountCache(get_settings().account_cache_size)
+    return _account_cache if _account_cache.max_size > 0 else None
+
+
+def _trigrams(text):
+    """文本（不区分大小写）的trigram集合"""
+    text = text.lower()
+    return {text[i : i + 3] for i in range(len(text) - 2)}
+
+
+def _fts_phrase(text):
+    """把文本转义为FTS5短语"""
+    return '"' + text.replace('"', '""') + '"'
+
 
 # 账户操作工具类
 class TotpAccountManager:
     @staticmethod
+    @timed("db.add_account")
     def add_account(account_name, encrypted_secret):
         """添加新账户"""
         try:
+            store = _vault_store()
+            if store is not None:
+                from src.core.utils.encryption_utils import decrypt_secret
+
+                account = store.add(account_name, decrypt_secret(encrypted_secret))
+                if account is None:
+                    log.error(f"添加账户失败: 账户 {account_name} 已存在")
+                return account
             account = TotpAccount.create(
                 account_name=account_name,
                 encrypted_secret=encrypted_secret,
             )
+            TotpAccountManager.invalidate_cache(account_name)
             return account
         except Exception as e:
             log.error(f"添加账户失败: {str(e)}")
             return None
 
     @staticmethod
-    def get_account(account_name=None):
-        """获取账户（通过ID或账户名）"""
+    @timed("db.bulk_add")
+    def bulk_add(
+        records,
+        batch_size=1000,
+        workers=None,
+        on_duplicate="skip",
+        progress=None,
+    ):
+        """批量添加账户（流式处理，适合大规模导入）
+
+        记录按批读取：每批在线程池中并行加密，然后在一个事务中批量写入。
+        已存在的账户按on_duplicate跳过或覆盖，单个批次失败不会中断整个导入。
+
+        Args:
+            records: 账户记录的可迭代对象，每条记录包含 account_name、
+                secret（Base32明文）、digits、period、algorithm
+            batch_size: 每个事务写入的账户数量
+            workers: 并行加密的线程数（None则按CPU核数）
+            on_duplicate: 账户名已存在时的处理方式：skip（跳过）或 update（覆盖）
+            progress: 进度回调，每批完成后以统计字典为参数调用
+
+        Returns:
+            dict: 统计信息，包含 added、updated、skipped、failed
+        """
+        if on_duplicate not in ("skip", "update"):
+            raise ValueError(f"无效的重复处理方式: {on_duplicate}")
+        store = _vault_store()
+        if store is not None:
+            return TotpAccountManager._bulk_add_vault(
+                store, records, on_duplicate, progress
+            )
+        return TotpAccountManager._bulk_add_sqlite(
+            records, batch_size, workers, on_duplicate, progress
+        )
+
+    @staticmethod
+    def _bulk_add_vault(store, records, on_duplicate, progress):
+        """批量添加账户到单文件保险库：每次修改都要重写整个文件，因此一次写入所有账户"""
+        stats = {"added": 0, "updated": 0, "skipped": 0, "failed": 0}
+        changes = {}
+        for record in records:
+            name = record["account_name"]
+            if on_duplicate == "skip" and name in changes:
+                stats["skipped"] += 1
+                continue
+            changes[name] = (
+                record["secret"].encode(),
+                record.get("digits", 6),
+                record.get("period", 30),
+                record.get("algorithm", "SHA1"),
+            )
         try:
+            existing = len(changes.keys() & set(store.names()))
+            written = store.add_many(changes, replace=on_duplicate == "update")
+            updated = existing if on_duplicate == "update" else 0
+            stats["skipped"] += len(changes) - len(written)
+            stats["updated"] += updated
+            stats["added"] += len(written) - updated
+        except Exception as e:
+            log.error(f"批量添加账户失败: {str(e)}")
+            stats["failed"] += len(changes)
+        if progress is not None:
+            progress(dict(stats))
+        log.info(
+            "批量添加账户完成: 新增 {added}，更新 {updated}，跳过 {skipped}，失败 {failed}".format(
+                **stats
+            )
+        )
+        return stats
+
+    @staticmethod
+    def _bulk_add_sqlite(
+        records, batch_size=1000, workers=None, on_duplicate="skip", progress=None
+    ):
+        """批量添加账户到SQLite数据库（参数见bulk_add）"""
+        from src.core.utils.encryption_utils import encrypt_secret
+
+        stats = {"added": 0, "updated": 0, "skipped": 0, "failed": 0}
+        records = iter(records)
+
+        with ThreadPoolExecutor(max_workers=workers or os.cpu_count()) as executor:
+            while batch := list(islice(records, batch_size)):
+                # 同一批次内的重复账户：跳过模式保留第一条，覆盖模式保留最后一条
+                unique = {}
+                for record in batch:
+                    if on_duplicate == "update" or record["account_name"] not in unique:
+                        unique[record["account_name"]] = record
+                stats["skipped"] += len(batch) - len(unique)
+
+                try:
+                    existing = {
+                        name
+                        for (name,) in TotpAccount.select(TotpAccount.account_name)
+                        .where(TotpAccount.account_name.in_(list(unique)))
+                        .tuples()
+                    }
+                    if on_duplicate == "skip":
+                        stats["skipped"] += len(existing)
+                        pending = [r for n, r in unique.items() if n not in existing]
+                    else:
+                        pending = list(unique.values())
+
+                    encrypted = list(
+                        executor.map(
+                            encrypt_secret, (r["secret"].encode() for r in pending)
+                        )
+                    )
+                    # 每批写入时取时间，使导入期间重新加载的GUI和守护进程
+                    # 能通过MAX(updated_at)发现后续批次（覆盖模式下账户数和ID不变）
+                    now = datetime.now()
+                    rows = [
+                        {
+                            "account_name": record["account_name"],
+                            "encrypted_secret": encrypted_secret,
+                            "digits": record.get("digits", 6),
+                            "period": record.get("period", 30),
+                            "algorithm": record.get("algorithm", "SHA1"),
+                            "created_at": now,
+                            "updated_at": now,
+                        }
+                        for record, encrypted_secret in zip(pending, encrypted)
+                    ]
+
+                    with db.atomic():
+                        # 分块插入，避免超出SQLite单条语句的参数数量上限
+                        for start in range(0, len(rows), 100):
+                            query = TotpAccount.insert_many(rows[start : start + 100])
+                            if on_duplicate == "skip":
+                                query = query.on_conflict_ignore()
+                            else:
+                                query = query.on_conflict(
+                                    conflict_target=[TotpAccount.account_name],
+                                    update={
+                                        field: getattr(EXCLUDED, field.column_name)
+                                        for field in _UPSERT_FIELDS
+                                    },
+                                )
+                            query.execute()
+
+                    updated = len(existing) if on_duplicate == "update" else 0
+                    stats["updated"] += updated
+                    stats["added"] += len(rows) - updated
+                except Exception as e:
+                    log.error(f"批量添加账户失败: {str(e)}")
+                    stats["failed"] += len(unique)
+
+                TotpAccountManager.invalidate_cache()
+                if progress is not None:
+                    progress(dict(stats))
+
+        log.info(
+            "批量添加账户完成: 新增 {added}，更新 {updated}，跳过 {skipped}，失败 {failed}".format(
+                **stats
+            )
+        )
+        return stats
+
+    @staticmethod
+    @timed("db.get_account")
+    def get_account(account_name=None, account_id=None):
+        """获取账户（通过ID或账户名）
+
+        使用单文件保险库时返回VaultRecord（密钥已解密），否则返回TotpAccount，
+        两者都可以用account_secret取得明文密钥。SQLite存储的账户会被缓存，
+        返回的对象可能与其他调用方共享，不应修改。
+        """
+        try:
+            store = _vault_store()
+            if store is not None:
+                if account_name:
+                    account = store.get(account_name)
+                elif account_id is not None:
+                    account = store.get_by_id(account_id)
+                else:
+                    return None
+                if account is None:
+                    log.error("账户不存在")
+                return account
+            if not account_name and account_id is None:
+                return None
+            cache = _get_account_cache()
+            if cache is not None:
+                account = cache.get(account_name, account_id)
+                if account is not None:
+                    return account
+                version = cache.version()
             if account_name:
-                return TotpAccount.get(TotpAccount.account_name == account_name)
+                account = TotpAccount.get(TotpAccount.account_name == account_name)
             else:
-                return None
+                account = TotpAccount.get_by_id(account_id)
+            if cache is not None:
+                cache.put(account, version)
+            return account
         except DoesNotExist:  # 使用导入的DoesNotExist异常类
             log.error("账户不存在")
             return None
@@ -38,22 +444,422 @@ class TotpAccountManager:
             return None
 
     @staticmethod
+    def invalidate_cache(account_name=None):
+        """使缓存的账户失效（None则清空整个缓存），绕过管理器直接修改账户表后需要调用"""
+        cache = _get_account_cache()
+        if cache is None:
+            return
+        if account_name is None:
+            cache.clear()
+        else:
+            cache.discard(account_name)
+
+    @staticmethod
+    @timed("db.list_accounts")
     def list_accounts():
         """列出所有账户"""
+        store = _vault_store()
+        if store is not None:
+            return list(store.records())
         query = TotpAccount.select().order_by(TotpAccount.account_name)
         return list(query)
 
     @staticmethod
+    def paginate_accounts(
+        columns=("account_name",), after=None, limit=None, page_size=500
+    ):
+        """按账户名顺序分页遍历账户，只读取需要的列
+
+        以上一页最后一个账户名为游标（keyset分页）查询下一页，每页一个短查询，
+        不会长时间持有读事务，也不会把整个结果集（或加密数据）读入内存。
+
+        Args:
+            columns: 需要的字段名，如 ("id", "account_name")
+            after: 只返回账户名大于此值的账户（上次分页的最后一个账户名）
+            limit: 最多返回的账户数量（None则不限制）
+            page_size: 每次查询的账户数量
+
+        Returns:
+            Iterator: 按 columns 顺序排列的字段元组
+        """
+        store = _vault_store()
+        if store is not None:
+            # 只需要账户名时直接读取保险库文件的名称索引，不解密
+            if tuple(columns) == ("account_name",):
+                rows = ((name,) for name in store.names(after))
+            else:
+                rows = (
+                    tuple(getattr(record, name) for name in columns)
+                    for record in store.records()
+                    if after is None or record.account_name > after
+                )
+            yield from islice(rows, limit)
+            return
+        fields = TotpAccount._meta.fields
+        unknown = [name for name in columns if name not in fields]
+        if unknown:
+            raise ValueError(f"未知的账户字段: {', '.join(unknown)}")
+        # 游标列不在所需字段中时额外读取，返回前去掉
+        select = [fields[name] for name in columns]
+        cursor_index = (
+            columns.index("account_name") if "account_name" in columns else None
+        )
+        if cursor_index is None:
+            select.append(TotpAccount.account_name)
+            cursor_index = len(columns)
+
+        remaining = limit
+        while remaining is None or remaining > 0:
+            size = page_size if remaining is None else min(page_size, remaining)
+            query = TotpAccount.select(*select).order_by(TotpAccount.account_name)
+            if after is not None:
+                query = query.where(TotpAccount.account_name > after)
+            rows = list(query.limit(size).tuples())
+            for row in rows:
+                yield row[: len(columns)]
+            if len(rows) < size:
+                return
+            after = rows[-1][cursor_index]
+            if remaining is not None:
+                remaining -= len(rows)
+
+    @staticmethod
+    def account_secret(account):
+        """获取get_account返回的账户的Base32明文密钥（bytes）"""
+        if getattr(account, "secret", None) is not None:
+            return account.secret
+        from src.core.utils.encryption_utils import decrypt_secret
+
+        return decrypt_secret(account.encrypted_secret)
+
+    @staticmethod
+    def iter_accounts(account_names=None):
+        """按ID顺序流式遍历账户
+
+        使用游标逐行读取并直接返回元组，不缓存整个结果集，内存占用与账户数量无关。
+
+        Args:
+            account_names: 只遍历这些账户（None则遍历所有账户）
+
+        Returns:
+            Iterator: (id, account_name, encrypted_secret, digits, period, algorithm) 元组
+        """
+        store = _vault_store()
+        if store is not None:
+            from src.core.utils.encryption_utils import encrypt_secret
+
+            # 保险库中保存的是明文密钥，为保持返回格式需要重新加密；
+            # 只需要明文密钥时应使用iter_decrypted_accounts
+            return (
+                (
+                    record.id,
+                    record.account_name,
+                    encrypt_secret(record.secret),
+                    record.digits,
+                    record.period,
+                    record.algorithm,
+                )
+                for record in _vault_records(store, account_names)
+            )
+        return TotpAccountManager._iter_sqlite_accounts(account_names)
+
+    @staticmethod
+    def _iter_sqlite_accounts(account_names=None):
+        """按ID顺序流式遍历SQLite数据库中的账户（参数和返回值见iter_accounts）"""
+        query = _account_query().order_by(TotpAccount.id)
+        if account_names is not None:
+            query = query.where(TotpAccount.account_name.in_(list(account_names)))
+        return query.tuples().iterator()
+
+    @staticmethod
+    def iter_decrypted_accounts(account_names=None):
+        """按ID顺序遍历账户并解密密钥
+
+        使用单文件保险库时密钥在读取时已经解密，不再经过Fernet加解密。
+
+        Args:
+            account_names: 只遍历这些账户（None则遍历所有账户）
+
+        Returns:
+            Iterator: ((id, account_name, secret, digits, period, algorithm), 错误信息) 元组，
+                      secret为Base32明文密钥（bytes），解密失败时为None并附带错误信息
+        """
+        store = _vault_store()
+        if store is not None:
+            for record in _vault_records(store, account_names):
+                yield (
+                    record.id,
+                    record.account_name,
+                    record.secret,
+                    record.digits,
+                    record.period,
+                    record.algorithm,
+                ), None
+            return
+
+        from src.core.utils.encryption_utils import decrypt_secret
+
+        for (
+            account_id,
+            name,
+            encrypted_secret,
+            *params,
+        ) in TotpAccountManager._iter_sqlite_accounts(account_names):
+            try:
+                secret, error = decrypt_secret(encrypted_secret), None
+            except ValueError as e:
+                secret, error = None, str(e)
+            yield (account_id, name, secret, *params), error
+
+    @staticmethod
+    def iter_account_codes(account_names=None, for_time=None, chunk_size=500):
+        """流式遍历账户并在同一遍中生成验证码
+
+        每读取chunk_size个账户批量生成一次验证码，解密失败的账户验证码为None。
+
+        Args:
+            account_names: 只遍历这些账户（None则遍历所有账户）
+            for_time: 生成验证码的时间戳（None则使用当前时间）
+            chunk_size: 每批生成验证码的账户数量
+
+        Returns:
+            Iterator: ((id, account_name, secret, digits, period, algorithm), 验证码) 元组，
+                      secret的含义同iter_decrypted_accounts
+        """
+        from src.core.utils.totp_utils import TOTPUtils
+
+        if for_time is None:
+            for_time = time.time()
+        accounts = TotpAccountManager.iter_decrypted_accounts(account_names)
+        while chunk := list(islice(accounts, chunk_size)):
+            codes = {}
+            valid_accounts = []
+            entries = []
+            for account, error in chunk:
+                try:
+                    if error is not None:
+                        raise ValueError(error)
+                    mac = TOTPUtils.prepare(
+                        TOTPUtils.decode_plaintext(account[2]), account[5]
+                    )
+                except Exception as e:
+                    log.error(f"处理账户 {account[1]} 失败: {str(e)}")
+                    continue
+                valid_accounts.append(account)
+                entries.append((mac, account[3], account[4]))
+            for account, code in zip(
+                valid_accounts, TOTPUtils.generate_many(entries, for_time=for_time)
+            ):
+                codes[account[0]] = code
+            for account, _ in chunk:
+                yield account, codes.get(account[0])
+
+    @staticmethod
+    @timed("db.search_accounts")
+    def search_accounts(query, mode="auto", limit=50):
+        """按账户名搜索账户
+
+        搜索方式：
+            prefix: 前缀匹配（区分大小写），使用账户名唯一索引做范围查询
+            substring: 子串匹配（不区分大小写），使用trigram全文索引
+            fuzzy: 模糊匹配，按与查询共有的trigram比例排序，可容忍少量拼写错误
+            auto: 先前缀、再子串，都没有结果时模糊匹配
+
+        查询少于3个字符或SQLite不支持trigram分词时，子串和模糊匹配退化为逐行匹配。
+
+        Args:
+            query: 搜索文本
+            mode: 搜索方式
+            limit: 最多返回的账户数量
+
+        Returns:
+            list: (id, account_name, encrypted_secret, digits, period, algorithm) 元组，
+                  前缀和子串结果按账户名排序，模糊结果按相似度排序；
+                  使用单文件保险库时encrypted_secret为None（需要密钥时用get_account）
+        """
+        if mode not in SEARCH_MODES:
+            raise ValueError(f"不支持的搜索方式: {mode}")
+        query = query.strip()
+        if not query or limit <= 0:
+            return []
+        store = _vault_store()
+        if store is not None:
+            names = TotpAccountManager._search_names(list(store.names()), query, mode)
+            return [
+                (
+                    record.id,
+                    record.account_name,
+                    None,
+                    record.digits,
+                    record.period,
+                    record.algorithm,
+                )
+                for record in map(store.get, names[:limit])
+            ]
+        # 连接时才能确定搜索索引是否可用
+        db.connect(reuse_if_open=True)
+
+        if mode == "prefix":
+            return TotpAccountManager._search_prefix(query, limit)
+        if mode == "substring":
+            return TotpAccountManager._search_substring(query, limit)
+        if mode == "fuzzy":
+            return TotpAccountManager._search_fuzzy(query, limit)
+
+        results = TotpAccountManager._search_prefix(query, limit)
+        if len(results) < limit:
+            seen = {account[0] for account in results}
+            for account in TotpAccountManager._search_substring(query, limit):
+                if account[0] not in seen and len(results) < limit:
+                    results.append(account)
+        if not results:
+            results = TotpAccountManager._search_fuzzy(query, limit)
+        return results
+
+    @staticmethod
+    def _search_names(names, query, mode):
+        """在按顺序排列的账户名列表中逐个匹配（用于没有搜索索引的单文件保险库）
+
+        Returns:
+            list: 匹配的账户名，排序方式与search_accounts相同
+        """
+        results = []
+        if mode in ("auto", "prefix"):
+            results = [name for name in names if name.startswith(query)]
+        if mode in ("auto", "substring"):
+            lowered = query.lower()
+            seen = set(results)
+            results += [
+                name for name in names if lowered in name.lower() and name not in seen
+            ]
+        if mode == "fuzzy" or (mode == "auto" and not results):
+            query_trigrams = _trigrams(query)
+            if not query_trigrams:
+                return TotpAccountManager._search_names(names, query, "substring")
+            scored = []
+            for name in names:
+                score = len(query_trigrams & _trigrams(name)) / len(query_trigrams)
+                if score >= _FUZZY_THRESHOLD:
+                    scored.append((-score, name))
+            results = [name for _, name in sorted(scored)]
+        return results
+
+    @staticmethod
+    def _search_prefix(query, limit):
+        """前缀匹配：账户名在 [query, query + 最大字符) 范围内"""
+        return list(
+            _account_query()
+            .where(
+                (TotpAccount.account_name >= query)
+                & (TotpAccount.account_name < query + "\U0010ffff")
+            )
+            .order_by(TotpAccount.account_name)
+            .limit(limit)
+            .tuples()
+        )
+
+    @staticmethod
+    def _search_substring(query, limit):
+        """子串匹配：从trigram索引中取出候选账户ID"""
+        if len(query) < _MIN_INDEXED_QUERY or not db.search_available:
+            return list(
+                _account_query()
+                .where(TotpAccount.account_name.contains(query))
+                .order_by(TotpAccount.account_name)
+                .limit(limit)
+                .tuples()
+            )
+        # 先按账户名排序再限制数量，结果与不使用索引时一致
+        matches = SQL(
+            f"(SELECT rowid FROM {SEARCH_TABLE} WHERE {SEARCH_TABLE} MATCH ?)",
+            (_fts_phrase(query),),
+        )
+        return list(
+            _account_query()
+            .where(TotpAccount.id.in_(matches))
+            .order_by(TotpAccount.account_name)
+            .limit(limit)
+            .tuples()
+        )
+
+    @staticmethod
+    def _search_fuzzy(query, limit):
+        """模糊匹配：按共有trigram数量从索引中取候选，再按共有比例过滤排序"""
+        query_trigrams = _trigrams(query)
+        if not query_trigrams or not db.search_available:
+            return TotpAccountManager._search_substring(query, limit)
+        cursor = db.execute_sql(
+            f"SELECT rowid FROM {SEARCH_TABLE} WHERE {SEARCH_TABLE} MATCH ? "
+            "ORDER BY rank LIMIT ?",
+            (
+                " OR ".join(map(_fts_phrase, sorted(query_trigrams))),
+                max(limit * 10, 200),
+            ),
+        )
+        account_ids = [row[0] for row in cursor]
+        if not account_ids:
+            return []
+        scored = []
+        for account in _account_query().where(TotpAccount.id.in_(account_ids)).tuples():
+            score = len(query_trigrams & _trigrams(account[1])) / len(query_trigrams)
+            if score >= _FUZZY_THRESHOLD:
+                scored.append((-score, account[1], account))
+        scored.sort(key=lambda item: item[:2])
+        return [account for _, _, account in scored[:limit]]
+
+    @staticmethod
+    @timed("db.get_accounts_signature")
+    def get_accounts_signature():
+        """获取账户集合的签名，账户增删改后签名会变化
+
+        用于判断是否需要重新加载账户列表，只执行一次聚合查询。
+        """
+        store = _vault_store()
+        if store is not None:
+            return store.signature()
+        cache = _get_account_cache()
+        if cache is not None:
+            signature = cache.get_signature()
+            if signature is not None:
+                return signature
+            version = cache.version()
+        signature = (
+            TotpAccount.select(
+                fn.COUNT(TotpAccount.id),
+                fn.MAX(TotpAccount.id),
+                fn.SUM(TotpAccount.id),
+                fn.MAX(TotpAccount.updated_at),
+            )
+            .tuples()
+            .get()
+        )
+        if cache is not None:
+            cache.put_signature(signature, version)
+        return signature
+
+    @staticmethod
+    @timed("db.update_account")
     def update_account(account_name, encrypted_secret):
         """更新账户信息"""
         try:
+            store = _vault_store()
+            if store is not None and encrypted_secret is not None:
+                from src.core.utils.encryption_utils import decrypt_secret
+
+                return store.update_secret(
+                    account_name, decrypt_secret(encrypted_secret)
+                )
             if encrypted_secret is not None:
                 update = (
-                    TotpAccount.update(encrypted_secret=encrypted_secret)
+                    TotpAccount.update(
+                        encrypted_secret=encrypted_secret,
+                        updated_at=datetime.now(),
+                    )
                     .where(TotpAccount.account_name == account_name)
                     .execute()
                 )
-                log.info(f"账户 {account_name} 密钥更新成功")
+                TotpAccountManager.invalidate_cache(account_name)
+                log.debug(f"账户 {account_name} 密钥更新成功")
                 return update == 1
         except DoesNotExist:
             log.error("账户不存在")
@@ -63,15 +869,26 @@ class TotpAccountManager:
             return False
 
     @staticmethod
+    @timed("db.delete_account")
     def delete_account(account_name):
         """删除账户"""
         try:
-            account = TotpAccount.get(TotpAccount.account_name == account_name)
-            account.delete_instance()
-            return True
-        except DoesNotExist:
-            log.error("账户不存在")
-            return False
+            store = _vault_store()
+            if store is not None:
+                if not store.delete(account_name):
+                    log.error("账户不存在")
+                    return False
+                return True
+            # 直接按账户名删除，不先读取账户
+            deleted = (
+                TotpAccount.delete()
+                .where(TotpAccount.account_name == account_name)
+                .execute()
+            )
+            TotpAccountManager.invalidate_cache(account_name)
+            if not deleted:
+                log.error("账户不存在")
+            return deleted == 1
         except Exception as e:
             log.error(f"删除账户失败: {str(e)}")
             return False
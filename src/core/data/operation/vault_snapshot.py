@@ -0,0 +1,249 @@
+import threading
+from datetime import timedelta
+from typing import Iterable, Optional
+
+from src.core.config.logging import get_logger
+from src.core.data.entity.totp_account import TotpAccount
+from src.core.utils.metrics import timed
+from src.core.utils.totp_utils import TOTPUtils
+
+log = get_logger()
+
+# 增量刷新时重新检查的时间余量：其他进程提交较晚但updated_at较早的修改也能被发现
+REFRESH_MARGIN = timedelta(seconds=5)
+# 按ID批量读取新增账户时每次查询的ID数量（受SQLite参数数量限制）
+_ID_BATCH = 500
+
+
+class VaultEntry:
+    """只读的账户记录（已解密的原始密钥），不带ORM的状态跟踪"""
+
+    __slots__ = ("id", "name", "key", "mac", "digits", "period", "algorithm", "version")
+
+    def __init__(self, account_id, name, key, mac, digits, period, algorithm, version):
+        self.id = account_id
+        self.name = name
+        self.key = key  # 解码后的原始密钥字节，解密失败时为None
+        self.mac = mac  # 预先准备的HMAC对象（TOTPUtils.prepare），解密失败时为None
+        self.digits = digits
+        self.period = period
+        self.algorithm = algorithm
+        self.version = version  # 加密数据的哈希，数据变化后随之变化（用作缓存版本）
+
+    def __repr__(self):
+        return f"VaultEntry({self.id}, {self.name!r})"
+
+
+class VaultSnapshot:
+    """账户的内存快照，供GUI、守护进程和批量生成验证码使用
+
+    首次加载时用一次查询读取并解密所有账户；之后的refresh只读取ID列表和
+    最近修改过的账户，只有加密数据发生变化的账户才会重新解密。
+    使用单文件保险库（STORAGE_BACKEND=vault）时从保险库文件读取所有账户。
+    """
+
+    def __init__(self):
+        self._by_id: dict[int, VaultEntry] = {}
+        self._by_name: dict[str, VaultEntry] = {}
+        self._sorted: Optional[list[VaultEntry]] = None
+        self._updated_at = None  # 已加载账户的最大updated_at
+        self._loaded = False
+        self._lock = threading.RLock()
+        self.errors: dict[int, str] = {}  # 解密失败的账户ID -> 错误信息
+
+    def __len__(self) -> int:
+        return len(self._by_id)
+
+    def get(self, account_id: int) -> Optional[VaultEntry]:
+        """按账户ID获取记录"""
+        return self._by_id.get(account_id)
+
+    def by_name(self, account_name: str) -> Optional[VaultEntry]:
+        """按账户名获取记录"""
+        return self._by_name.get(account_name)
+
+    def entries(self) -> list[VaultEntry]:
+        """按账户名排序的所有记录（快照变化前返回同一个列表，调用方不应修改）"""
+        with self._lock:
+            if self._sorted is None:
+                self._sorted = sorted(
+                    self._by_id.values(), key=lambda entry: entry.name
+                )
+            return self._sorted
+
+    @staticmethod
+    def _query():
+        return TotpAccount.select(
+            TotpAccount.id,
+            TotpAccount.account_name,
+            TotpAccount.encrypted_secret,
+            TotpAccount.digits,
+            TotpAccount.period,
+            TotpAccount.algorithm,
+            TotpAccount.updated_at,
+        )
+
+    @staticmethod
+    def _vault_rows(store) -> list[tuple]:
+        """保险库文件中的所有账户，格式同_query（密钥已解密，没有修改时间）"""
+        return [
+            (
+                record.id,
+                record.account_name,
+                record.secret,
+                record.digits,
+                record.period,
+                record.algorithm,
+                None,
+            )
+            for record in store.records()
+        ]
+
+    @timed("vault.reload")
+    def reload(self) -> None:
+        """丢弃快照并重新加载所有账户"""
+        from src.core.data.operation.totp_account_manager import _vault_store
+
+        with self._lock:
+            self._by_id = {}
+            self._by_name = {}
+            self.errors = {}
+            self._updated_at = None
+            store = _vault_store()
+            if store is not None:
+                self._apply(self._vault_rows(store), decrypted=True)
+            else:
+                self._apply(self._query().tuples().iterator())
+            self._loaded = True
+            log.debug(f"账户快照已加载 {len(self._by_id)} 个账户")
+
+    @timed("vault.refresh")
+    def refresh(self) -> None:
+        """增量刷新：删除已不存在的账户，加载新增和最近修改的账户"""
+        from src.core.data.operation.totp_account_manager import _vault_store
+
+        with self._lock:
+            if not self._loaded:
+                self.reload()
+                return
+            store = _vault_store()
+            if store is not None:
+                # 保险库文件没有修改时间，读取所有账户，只有变化的账户会被替换
+                rows = self._vault_rows(store)
+                for account_id in self._by_id.keys() - {row[0] for row in rows}:
+                    self._remove(account_id)
+                self._apply(rows, decrypted=True)
+                return
+            ids = {
+                account_id
+                for (account_id,) in TotpAccount.select(TotpAccount.id).tuples()
+            }
+            for account_id in self._by_id.keys() - ids:
+                self._remove(account_id)
+
+            new_ids = list(ids - self._by_id.keys())
+            for start in range(0, len(new_ids), _ID_BATCH):
+                batch = new_ids[start : start + _ID_BATCH]
+                self._apply(self._query().where(TotpAccount.id.in_(batch)).tuples())
+            if self._updated_at is not None:
+                self._apply(
+                    self._query()
+                    .where(TotpAccount.updated_at >= self._updated_at - REFRESH_MARGIN)
+                    .tuples()
+                )
+
+    def _apply(self, rows: Iterable[tuple], decrypted: bool = False) -> None:
+        """把查询到的账户写入快照（调用方需持有锁）
+
+        Args:
+            rows: 账户元组，格式同_query
+            decrypted: 元组中的密钥是否已是明文（来自保险库文件）
+        """
+        from src.core.utils.encryption_utils import decrypt_secret
+
+        for (
+            account_id,
+            name,
+            encrypted_secret,
+            digits,
+            period,
+            algorithm,
+            updated_at,
+        ) in rows:
+            if self._updated_at is None or updated_at > self._updated_at:
+                self._updated_at = updated_at
+            version = hash(encrypted_secret)
+            current = self._by_id.get(account_id)
+            error = None
+            if current is not None and current.version == version:
+                if (
+                    current.name,
+                    current.digits,
+                    current.period,
+                    current.algorithm,
+                ) == (
+                    name,
+                    digits,
+                    period,
+                    algorithm,
+                ):
+                    continue
+                # 只有名称或参数变化，沿用已解密的密钥
+                key = current.key
+                error = self.errors.get(account_id)
+            else:
+                try:
+                    key = TOTPUtils.decode_plaintext(
+                        encrypted_secret
+                        if decrypted
+                        else decrypt_secret(encrypted_secret)
+                    )
+                except Exception as e:
+                    key = None
+                    error = str(e)
+            mac = None
+            if key is not None:
+                try:
+                    mac = TOTPUtils.prepare(key, algorithm)
+                except ValueError as e:
+                    error = str(e)
+            if mac is None:
+                log.error(f"加载账户 {name} 失败: {error}")
+                self.errors[account_id] = error
+            else:
+                self.errors.pop(account_id, None)
+            if current is not None:
+                self._remove(account_id)
+            entry = VaultEntry(
+                account_id, name, key, mac, digits, period, algorithm, version
+            )
+            self._by_id[account_id] = entry
+            self._by_name[name] = entry
+            self._sorted = None
+
+    def _remove(self, account_id: int) -> None:
+        """从快照中删除账户（调用方需持有锁）"""
+        entry = self._by_id.pop(account_id)
+        if self._by_name.get(entry.name) is entry:
+            del self._by_name[entry.name]
+        self.errors.pop(account_id, None)
+        self._sorted = None
+
+    def generate_codes(
+        self, entries: Iterable[VaultEntry], for_time: Optional[float] = None
+    ) -> list[Optional[str]]:
+        """批量生成验证码，解密失败的账户为None
+
+        Returns:
+            list: 与entries顺序一致的验证码
+        """
+        entries = list(entries)
+        valid = [i for i, entry in enumerate(entries) if entry.mac is not None]
+        codes = [None] * len(entries)
+        generated = TOTPUtils.generate_many(
+            [(entries[i].mac, entries[i].digits, entries[i].period) for i in valid],
+            for_time=for_time,
+        )
+        for i, code in zip(valid, generated):
+            codes[i] = code
+        return codes
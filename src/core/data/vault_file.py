@@ -0,0 +1,567 @@
+import base64
+import mmap
+import os
+import struct
+import threading
+from pathlib import Path
+from typing import TYPE_CHECKING, Iterator, Optional
+
+from src.core.config.config import get_db_path
+from src.core.config.logging import get_logger
+from src.core.utils.metrics import timed
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+# cryptography 按需在函数内导入
+if TYPE_CHECKING:
+    from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+
+log = get_logger()
+
+# 文件格式（所有整数均为小端序）：
+#   文件头: 魔数(8字节) + 账户数(uint32) + 下一个账户ID(uint64) + 盐值(16字节)
+#           + 主密钥ID长度(uint16) + 主密钥ID
+#   索引:   账户数个定长索引项，按账户名（UTF-8字节序）升序排列：
+#           账户ID(uint64) + 名称偏移(uint32，相对名称区) + 名称长度(uint16)
+#           + 数据块偏移(uint64) + 数据块长度(uint32)
+#   ID顺序: 账户数个索引项位置(uint32)，按账户ID升序排列，用于按ID二分查找
+#   名称区: 所有账户名（UTF-8，明文，与SQLite中的account_name、id一样不加密）
+#   数据块: 每个账户一个AES-GCM块：随机数(12字节) + 密文，附加数据为 盐值 + 主密钥ID + 账户名
+#           明文为 账户ID(uint64) + 位数(uint8) + 有效期(uint16) + 算法长度(uint8) + 算法 + Base32密钥
+#   查找账户时在索引上二分查找，只解密该账户的数据块；解密后校验数据块中的账户ID与索引一致
+VAULT_MAGIC = b"TOTPVLT\x01"
+_HEADER = struct.Struct("<8sIQ16sH")
+_INDEX = struct.Struct("<QIHQI")
+_POSITION = struct.Struct("<I")
+_PAYLOAD = struct.Struct("<QBHB")
+_NONCE_LENGTH = 12
+_SALT_LENGTH = 16
+# 由主密钥派生数据块密钥时使用的上下文
+_HKDF_INFO = b"totp-vault-block-key"
+
+
+def get_vault_path() -> Path:
+    """获取单文件保险库路径（位于数据目录下）"""
+    return Path.home() / get_db_path() / "totp_vault.bin"
+
+
+class VaultRecord:
+    """单文件保险库中的账户（已解密），字段与TotpAccount一致，密钥为明文"""
+
+    __slots__ = ("id", "account_name", "secret", "digits", "period", "algorithm")
+
+    def __init__(
+        self, account_id, account_name, secret, digits=6, period=30, algorithm="SHA1"
+    ):
+        self.id = account_id
+        self.account_name = account_name
+        self.secret = secret  # Base32格式的明文密钥（bytes）
+        self.digits = digits
+        self.period = period
+        self.algorithm = algorithm
+
+    def __str__(self):
+        return f"{self.account_name}"
+
+
+class VaultFile:
+    """单文件保险库的只读访问（内存映射，不解密）"""
+
+    def __init__(self, path: Path):
+        """
+        Args:
+            path: 保险库文件路径
+        """
+        with open(path, "rb") as f:
+            stat = os.fstat(f.fileno())
+            self.version = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            if len(self._mmap) < _HEADER.size:
+                raise ValueError("保险库文件不完整")
+            magic, self._count, self.next_id, self.salt, key_id_length = (
+                _HEADER.unpack_from(self._mmap)
+            )
+            if magic != VAULT_MAGIC:
+                raise ValueError("不是保险库文件")
+            self._index_offset = _HEADER.size + key_id_length
+            self._order_offset = self._index_offset + self._count * _INDEX.size
+            self._names_offset = self._order_offset + self._count * _POSITION.size
+            if len(self._mmap) < self._names_offset:
+                raise ValueError("保险库文件不完整")
+            self.key_id = self._mmap[_HEADER.size : self._index_offset].decode()
+        except Exception:
+            self._mmap.close()
+            raise
+
+    def __len__(self) -> int:
+        return self._count
+
+    def close(self) -> None:
+        """关闭内存映射"""
+        self._mmap.close()
+
+    def _entry(self, index: int) -> tuple[int, int, int, int, int]:
+        return _INDEX.unpack_from(self._mmap, self._index_offset + index * _INDEX.size)
+
+    def account_id(self, index: int) -> int:
+        """第index个账户的ID"""
+        return self._entry(index)[0]
+
+    def name(self, index: int) -> bytes:
+        """第index个账户名（UTF-8字节）"""
+        _, name_offset, name_length, _, _ = self._entry(index)
+        start = self._names_offset + name_offset
+        return self._mmap[start : start + name_length]
+
+    def block(self, index: int) -> bytes:
+        """第index个账户的加密数据块"""
+        _, _, _, block_offset, block_length = self._entry(index)
+        return self._mmap[block_offset : block_offset + block_length]
+
+    def bisect(self, name: bytes) -> int:
+        """第一个账户名不小于name的位置"""
+        low, high = 0, self._count
+        while low < high:
+            middle = (low + high) // 2
+            if self.name(middle) < name:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    def find(self, name: str) -> Optional[int]:
+        """二分查找账户的位置，不存在时返回None"""
+        encoded = name.encode()
+        index = self.bisect(encoded)
+        if index < self._count and self.name(index) == encoded:
+            return index
+        return None
+
+    def find_id(self, account_id: int) -> Optional[int]:
+        """在ID顺序表上二分查找账户的位置，不存在时返回None"""
+        low, high = 0, self._count
+        while low < high:
+            middle = (low + high) // 2
+            if self.account_id(self._position(middle)) < account_id:
+                low = middle + 1
+            else:
+                high = middle
+        if low < self._count:
+            index = self._position(low)
+            if self.account_id(index) == account_id:
+                return index
+        return None
+
+    def _position(self, order: int) -> int:
+        """ID顺序表中第order项对应的索引位置"""
+        (index,) = _POSITION.unpack_from(
+            self._mmap, self._order_offset + order * _POSITION.size
+        )
+        return index
+
+
+def _encode_payload(record: VaultRecord) -> bytes:
+    algorithm = record.algorithm.encode()
+    return (
+        _PAYLOAD.pack(record.id, record.digits, record.period, len(algorithm))
+        + algorithm
+        + record.secret
+    )
+
+
+def _decode_payload(name: str, payload: bytes) -> VaultRecord:
+    account_id, digits, period, algorithm_length = _PAYLOAD.unpack_from(payload)
+    start = _PAYLOAD.size
+    algorithm = payload[start : start + algorithm_length].decode()
+    return VaultRecord(
+        account_id, name, payload[start + algorithm_length :], digits, period, algorithm
+    )
+
+
+class VaultFileStore:
+    """单文件保险库存储：读取时内存映射文件并只解密需要的数据块，修改时整体重写
+
+    重写在临时文件中完成后原子替换原文件，已打开旧文件的读取方不受影响；
+    未修改账户的加密数据块原样复制，只有修改的账户需要重新加密。
+    主密钥仍保存在SQLite的密钥表中（与密码保护、密钥轮换共用）。
+    派生的数据块密钥随加密会话一起失效（CipherSession锁定、清除或密钥变化后重新派生）。
+    """
+
+    def __init__(self, path: Optional[Path] = None):
+        """
+        Args:
+            path: 保险库文件路径（None则使用默认路径）
+        """
+        self.path = Path(path or get_vault_path())
+        self._file: Optional[VaultFile] = None
+        self._ciphers: dict[tuple[str, bytes], "AESGCM"] = {}
+        self._cipher_generation = None  # 派生_ciphers时CipherSession的版本
+        self._lock = threading.RLock()
+
+    def _reader(self) -> Optional[VaultFile]:
+        """当前文件的读取器，文件被其他进程替换后重新映射（文件不存在时返回None）"""
+        try:
+            stat = self.path.stat()
+        except FileNotFoundError:
+            return None
+        version = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+        if self._file is None or self._file.version != version:
+            # 旧的映射可能仍被正在进行的遍历使用，交给垃圾回收关闭
+            self._file = VaultFile(self.path)
+        return self._file
+
+    def _cipher(self, key_id: str, salt: bytes) -> "AESGCM":
+        """由主密钥和文件盐值派生数据块密钥（按密钥ID和盐值缓存）
+
+        Raises:
+            ValueError: 加密会话已锁定或密钥不存在
+        """
+        from src.core.utils.encryption_utils import CipherSession, EncryptionUtils
+
+        generation = CipherSession.generation()
+        if generation != self._cipher_generation:
+            self._ciphers = {}
+            self._cipher_generation = generation
+        cipher = self._ciphers.get((key_id, salt))
+        if cipher is None:
+            from cryptography.hazmat.primitives import hashes
+            from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+            from cryptography.hazmat.primitives.kdf.hkdf import HKDF
+
+            keys, _ = EncryptionUtils.load_keys()
+            if key_id not in keys:
+                raise ValueError(f"未找到加密密钥: {key_id}")
+            block_key = HKDF(
+                algorithm=hashes.SHA256(), length=32, salt=salt, info=_HKDF_INFO
+            ).derive(base64.urlsafe_b64decode(keys[key_id]))
+            cipher = self._ciphers[(key_id, salt)] = AESGCM(block_key)
+        return cipher
+
+    def _decrypt(self, vault: VaultFile, index: int) -> VaultRecord:
+        from cryptography.exceptions import InvalidTag
+
+        name = vault.name(index)
+        block = vault.block(index)
+        cipher = self._cipher(vault.key_id, vault.salt)
+        try:
+            payload = cipher.decrypt(
+                block[:_NONCE_LENGTH],
+                block[_NONCE_LENGTH:],
+                vault.salt + vault.key_id.encode() + name,
+            )
+        except InvalidTag:
+            raise ValueError("解密失败，密钥可能不正确或数据已损坏") from None
+        record = _decode_payload(name.decode(), payload)
+        # 索引中的账户ID是明文，以数据块中经过认证的ID为准
+        if record.id != vault.account_id(index):
+            raise ValueError("保险库文件已损坏：账户ID与索引不一致")
+        return record
+
+    @timed("vault_file.get")
+    def get(self, account_name: str) -> Optional[VaultRecord]:
+        """按账户名读取并解密一个账户，不存在时返回None"""
+        with self._lock:
+            vault = self._reader()
+            index = vault.find(account_name) if vault is not None else None
+            return self._decrypt(vault, index) if index is not None else None
+
+    def get_by_id(self, account_id: int) -> Optional[VaultRecord]:
+        """按账户ID读取并解密一个账户，不存在时返回None"""
+        with self._lock:
+            vault = self._reader()
+            index = vault.find_id(account_id) if vault is not None else None
+            return self._decrypt(vault, index) if index is not None else None
+
+    def names(self, after: Optional[str] = None) -> Iterator[str]:
+        """按账户名顺序遍历账户名（不解密）
+
+        Args:
+            after: 只返回大于此值的账户名
+        """
+        with self._lock:
+            vault = self._reader()
+        if vault is None:
+            return
+        index = 0
+        if after is not None:
+            encoded = after.encode()
+            index = vault.bisect(encoded)
+            if index < len(vault) and vault.name(index) == encoded:
+                index += 1
+        for index in range(index, len(vault)):
+            yield vault.name(index).decode()
+
+    def records(self) -> Iterator[VaultRecord]:
+        """按账户名顺序解密并遍历所有账户"""
+        with self._lock:
+            vault = self._reader()
+        if vault is None:
+            return
+        for index in range(len(vault)):
+            yield self._decrypt(vault, index)
+
+    def signature(self):
+        """文件签名（inode、修改时间、大小），文件被重写后变化"""
+        with self._lock:
+            vault = self._reader()
+            return vault.version if vault is not None else None
+
+    def add(
+        self, account_name: str, secret: bytes, digits=6, period=30, algorithm="SHA1"
+    ):
+        """添加账户，账户名已存在时返回None"""
+        changes = {account_name: (secret, digits, period, algorithm)}
+        return self._rewrite(changes, replace=False).get(account_name)
+
+    def add_many(self, changes: dict, replace: bool = False) -> dict:
+        """一次重写添加多个账户
+
+        Args:
+            changes: {账户名: (密钥, 位数, 有效期, 算法)}
+            replace: 账户名已存在时是否覆盖（否则跳过）
+
+        Returns:
+            dict: {账户名: VaultRecord}，实际写入的账户
+        """
+        return self._rewrite(changes, replace=replace)
+
+    def update_secret(self, account_name: str, secret: bytes) -> bool:
+        """更新账户密钥，账户不存在时返回False"""
+        with self._lock:
+            current = self.get(account_name)
+            if current is None:
+                return False
+            changes = {
+                account_name: (
+                    secret,
+                    current.digits,
+                    current.period,
+                    current.algorithm,
+                )
+            }
+            return account_name in self._rewrite(changes)
+
+    def delete(self, account_name: str) -> bool:
+        """删除账户，账户不存在时返回False"""
+        with self._lock:
+            vault = self._reader()
+            if vault is None or vault.find(account_name) is None:
+                return False
+            self._rewrite({account_name: None})
+            return True
+
+    def reencrypt(self) -> int:
+        """用当前主密钥重新加密整个文件（文件已使用当前密钥时不重写）
+
+        Returns:
+            int: 重新加密的账户数
+        """
+        from src.core.utils.encryption_utils import EncryptionUtils
+
+        with self._lock:
+            vault = self._reader()
+            if vault is None or vault.key_id == EncryptionUtils.active_key_id():
+                return 0
+            self._rewrite({})
+            return len(self._reader())
+
+    @timed("vault_file.rewrite")
+    def _rewrite(
+        self, changes: dict, replace: bool = True, clear: bool = False
+    ) -> dict:
+        """应用修改并原子重写整个文件
+
+        Args:
+            changes: {账户名: VaultRecord、(密钥, 位数, 有效期, 算法) 或 None（删除）}，
+                     元组形式的账户沿用原账户ID或分配新ID
+            replace: 账户名已存在时是否覆盖（否则跳过）
+            clear: 是否丢弃文件中原有的所有账户
+
+        Returns:
+            dict: {账户名: VaultRecord}，实际写入的账户
+        """
+        from src.core.utils.encryption_utils import EncryptionUtils
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self._lock, open(self.path.with_suffix(".lock"), "w") as lock_file:
+            if fcntl is not None:
+                # 串行化多个进程的重写，避免后写入的覆盖先写入的修改
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            vault = None if clear else self._reader()
+            active_key_id = EncryptionUtils.active_key_id()
+            # 当前主密钥未变化时沿用盐值，未修改的数据块可以原样复制
+            reuse = vault is not None and vault.key_id == active_key_id
+            salt = vault.salt if reuse else os.urandom(_SALT_LENGTH)
+            next_id = vault.next_id if vault is not None else 1
+
+            # 账户名字节 -> (账户ID, 原加密数据块（原样复制）或 VaultRecord（需要加密）)
+            entries: dict[bytes, tuple[int, object]] = {}
+            if vault is not None:
+                for index in range(len(vault)):
+                    if reuse:
+                        entries[vault.name(index)] = (
+                            vault.account_id(index),
+                            vault.block(index),
+                        )
+                    else:
+                        record = self._decrypt(vault, index)
+                        entries[vault.name(index)] = (record.id, record)
+
+            written = {}
+            for account_name, values in changes.items():
+                name = account_name.encode()
+                current = entries.get(name)
+                if values is None:
+                    entries.pop(name, None)
+                    continue
+                if current is not None and not replace:
+                    continue
+                if isinstance(values, VaultRecord):
+                    record = values
+                else:
+                    account_id = next_id if current is None else current[0]
+                    record = VaultRecord(account_id, account_name, *values)
+                next_id = max(next_id, record.id + 1)
+                entries[name] = (record.id, record)
+                written[account_name] = record
+
+            cipher = self._cipher(active_key_id, salt)
+            aad_prefix = salt + active_key_id.encode()
+            names = sorted(entries)
+            ids = []
+            blocks = []
+            for name in names:
+                account_id, block = entries[name]
+                if isinstance(block, VaultRecord):
+                    nonce = os.urandom(_NONCE_LENGTH)
+                    block = nonce + cipher.encrypt(
+                        nonce, _encode_payload(block), aad_prefix + name
+                    )
+                ids.append(account_id)
+                blocks.append(block)
+            self._write(names, ids, blocks, next_id, salt, active_key_id)
+            self._reader()
+        return written
+
+    def _write(self, names, ids, blocks, next_id, salt, key_id) -> None:
+        """写入临时文件并原子替换保险库文件（调用方需持有锁）"""
+        key_id = key_id.encode()
+        index_offset = _HEADER.size + len(key_id)
+        names_offset = (
+            index_offset + len(names) * _INDEX.size + len(names) * _POSITION.size
+        )
+        block_offset = names_offset + sum(map(len, names))
+
+        tmp_path = self.path.with_suffix(".tmp")
+        try:
+            with open(tmp_path, "wb") as f:
+                f.write(
+                    _HEADER.pack(VAULT_MAGIC, len(names), next_id, salt, len(key_id))
+                )
+                f.write(key_id)
+                name_offset = 0
+                for account_id, name, block in zip(ids, names, blocks):
+                    f.write(
+                        _INDEX.pack(
+                            account_id,
+                            name_offset,
+                            len(name),
+                            block_offset,
+                            len(block),
+                        )
+                    )
+                    name_offset += len(name)
+                    block_offset += len(block)
+                for index in sorted(range(len(ids)), key=ids.__getitem__):
+                    f.write(_POSITION.pack(index))
+                f.writelines(names)
+                f.writelines(blocks)
+                f.flush()
+                os.fsync(f.fileno())
+            os.chmod(tmp_path, 0o600)
+            os.replace(tmp_path, self.path)
+        finally:
+            # 写入失败时不留下不完整的临时文件
+            if tmp_path.exists():
+                tmp_path.unlink()
+
+    def import_from_sqlite(self) -> tuple[int, int]:
+        """用SQLite数据库中的所有账户替换保险库内容（保留账户ID）
+
+        Returns:
+            tuple: (写入的账户数, 解密失败的账户数)
+        """
+        from src.core.data.operation.totp_account_manager import TotpAccountManager
+        from src.core.utils.encryption_utils import decrypt_secret
+
+        # 直接读取SQLite，不受STORAGE_BACKEND影响
+        records = {}
+        failed = 0
+        for (
+            account_id,
+            name,
+            encrypted_secret,
+            digits,
+            period,
+            algorithm,
+        ) in TotpAccountManager._iter_sqlite_accounts():
+            try:
+                secret = decrypt_secret(encrypted_secret)
+            except ValueError as e:
+                log.error(f"导入账户 {name} 失败: {str(e)}")
+                failed += 1
+                continue
+            records[name] = VaultRecord(
+                account_id, name, secret, digits, period, algorithm
+            )
+        written = self._rewrite(records, clear=True)
+        log.info(f"已从SQLite导入 {len(written)} 个账户到保险库文件")
+        return len(written), failed
+
+    def export_to_sqlite(
+        self, on_duplicate: str = "update", batch_size: int = 1000
+    ) -> dict:
+        """把保险库中的所有账户写入SQLite数据库
+
+        Args:
+            on_duplicate: 账户名已存在时的处理方式：skip（跳过）或 update（覆盖）
+            batch_size: 每个事务写入的账户数
+
+        Returns:
+            dict: bulk_add的统计信息
+        """
+        from src.core.data.operation.totp_account_manager import TotpAccountManager
+
+        # 直接写入SQLite，不受STORAGE_BACKEND影响
+        return TotpAccountManager._bulk_add_sqlite(
+            (
+                {
+                    "account_name": record.account_name,
+                    "secret": record.secret.decode(),
+                    "digits": record.digits,
+                    "period": record.period,
+                    "algorithm": record.algorithm,
+                }
+                for record in self.records()
+            ),
+            batch_size=batch_size,
+            on_duplicate=on_duplicate,
+        )
+
+
+_store: Optional[VaultFileStore] = None
+_store_lock = threading.Lock()
+
+
+def get_vault_store() -> VaultFileStore:
+    """获取进程内共享的保险库存储"""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = VaultFileStore()
+    return _store
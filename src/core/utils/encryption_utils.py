@@ -1,26 +1,53 @@
 import base64
+import json
 import os
 import sys
+import threading
+import time
 from pathlib import Path
-from typing import Optional
-
-from cryptography.fernet import Fernet
-from cryptography.hazmat.backends import default_backend
-from cryptography.hazmat.primitives import hashes
-from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
+from typing import TYPE_CHECKING, Optional
 
+from src.core.config.config import get_settings
 from src.core.config.logging import get_logger
+from src.core.utils.metrics import timed
+from src.core.data.connection import db
 from src.core.data.entity.totp_key_storage import TotpKeyStorage
 from peewee import DoesNotExist
 
+# cryptography 按需在函数内导入，避免不需要加解密的命令为其付出启动开销
+if TYPE_CHECKING:
+    from cryptography.fernet import Fernet
+
 log = get_logger()
 
+# 最初的主密钥ID（该密钥加密的数据没有密钥ID前缀）
+LEGACY_KEY_ID = "main_key"
+# 轮换生成的主密钥ID前缀
+KEY_ID_PREFIX = "key-"
+# 加密数据中密钥ID与Fernet令牌的分隔符（不属于Fernet令牌的字符集）
+KEY_ID_SEPARATOR = b"$"
+# 加密前确认当前密钥的最小间隔（秒）
+ACTIVE_KEY_CHECK_INTERVAL = 1.0
+# 密码保护参数的记录名（存在该记录时主密钥由密码派生的解锁密钥加密保存）
+KDF_RECORD = "kdf"
+# 由密码派生密钥支持的算法
+KDF_ALGORITHMS = ("scrypt", "pbkdf2")
+# 用于校验密码的常量明文
+_KDF_CHECK = b"totp-unlock-check"
+
 
 class EncryptionUtils:
     """加密工具类，用于TOTP密钥的安全存储"""
 
     # 加密算法参数（可根据安全需求调整）
-    _KDF_ITERATIONS = 100000  # 迭代次数，越高越安全但耗时越长
+    # pbkdf2默认迭代次数，越高越安全但耗时越长。只用于新设置的密码：
+    # 实际使用的派生参数随密码保护记录保存，解锁时按记录中的参数派生，
+    # 修改默认值不影响已有的密码
+    _KDF_ITERATIONS = 600000
+    _LEGACY_KDF_ITERATIONS = 100000  # 未记录迭代次数时使用的旧默认值
+    _SCRYPT_COST = 2**15  # scrypt默认成本参数N（必须是2的幂）
+    _SCRYPT_BLOCK_SIZE = 8  # scrypt参数r
+    _SCRYPT_PARALLELISM = 1  # scrypt参数p
     _KDF_LENGTH = 32  # 密钥长度
     _SALT_LENGTH = 16  # 盐值长度（字节）
 
@@ -31,36 +58,182 @@ class EncryptionUtils:
         Returns:
                 bytes: 随机生成的Fernet密钥
         """
+        from cryptography.fernet import Fernet
+
         return Fernet.generate_key()
 
     @classmethod
+    @timed("crypto.derive_key")
     def derive_key(
-        cls, password: str, salt: Optional[bytes] = None
+        cls,
+        password: str,
+        salt: Optional[bytes] = None,
+        algorithm: str = "pbkdf2",
+        cost: Optional[int] = None,
     ) -> tuple[bytes, bytes]:
         """从密码派生加密密钥（适用于用户提供密码的场景）
 
         Args:
                 password: 用户密码
                 salt: 盐值（None则自动生成）
+                algorithm: 派生算法（scrypt或pbkdf2）
+                cost: 派生成本（scrypt的N或pbkdf2的迭代次数，None则使用默认值）
 
         Returns:
                 tuple: (派生的密钥, 使用的盐值)
         """
+        from cryptography.hazmat.backends import default_backend
+        from cryptography.hazmat.primitives import hashes
+        from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
+        from cryptography.hazmat.primitives.kdf.scrypt import Scrypt
+
         if salt is None:
             salt = os.urandom(cls._SALT_LENGTH)
 
-        kdf = PBKDF2HMAC(
-            algorithm=hashes.SHA256(),
-            length=cls._KDF_LENGTH,
-            salt=salt,
-            iterations=cls._KDF_ITERATIONS,
-            backend=default_backend(),
-        )
+        if algorithm == "scrypt":
+            cost = cost or cls._SCRYPT_COST
+            if cost < 2 or cost & (cost - 1):
+                raise ValueError("scrypt成本参数必须是大于1的2的幂")
+            kdf = Scrypt(
+                salt=salt,
+                length=cls._KDF_LENGTH,
+                n=cost,
+                r=cls._SCRYPT_BLOCK_SIZE,
+                p=cls._SCRYPT_PARALLELISM,
+                backend=default_backend(),
+            )
+        elif algorithm == "pbkdf2":
+            kdf = PBKDF2HMAC(
+                algorithm=hashes.SHA256(),
+                length=cls._KDF_LENGTH,
+                salt=salt,
+                iterations=cost or cls._KDF_ITERATIONS,
+                backend=default_backend(),
+            )
+        else:
+            raise ValueError(f"不支持的密钥派生算法: {algorithm}")
 
         key = base64.urlsafe_b64encode(kdf.derive(password.encode()))
         return key, salt
 
     @classmethod
+    def kdf_params(cls) -> Optional[dict]:
+        """读取密码保护参数，未设置密码时返回None
+
+        Returns:
+            Optional[dict]: {"algorithm", "cost", "salt"(base64), "check"(校验令牌)}
+        """
+        record = TotpKeyStorage.get_or_none(TotpKeyStorage.key_name == KDF_RECORD)
+        return json.loads(bytes(record.encrypted_key)) if record else None
+
+    @classmethod
+    def is_protected(cls) -> bool:
+        """主密钥是否由密码保护"""
+        return (
+            TotpKeyStorage.select()
+            .where(TotpKeyStorage.key_name == KDF_RECORD)
+            .exists()
+        )
+
+    @classmethod
+    def derive_unlock_key(cls, passphrase: str) -> bytes:
+        """由密码派生解锁密钥并校验（执行一次完整的密钥派生，耗时由派生成本决定）
+
+        Raises:
+            ValueError: 未设置密码或密码错误
+        """
+        from cryptography.fernet import Fernet, InvalidToken
+
+        params = cls.kdf_params()
+        if params is None:
+            raise ValueError("保险库未设置密码")
+        unlock_key, _ = cls.derive_key(
+            passphrase,
+            base64.b64decode(params["salt"]),
+            params["algorithm"],
+            params.get("cost") or cls._LEGACY_KDF_ITERATIONS,
+        )
+        try:
+            Fernet(unlock_key).decrypt(params["check"].encode())
+        except InvalidToken:
+            raise ValueError("密码错误") from None
+        return unlock_key
+
+    @classmethod
+    def protect(
+        cls,
+        passphrase: str,
+        algorithm: Optional[str] = None,
+        cost: Optional[int] = None,
+    ) -> bytes:
+        """设置或修改密码：用密码派生的解锁密钥重新加密保存所有主密钥
+
+        已设置密码时需要先解锁（当前进程或解锁代理持有旧的解锁密钥）。
+
+        Args:
+            passphrase: 新密码
+            algorithm: 派生算法（None则使用配置KDF_ALGORITHM）
+            cost: 派生成本（None则使用配置KDF_COST或算法默认值）
+
+        Returns:
+            bytes: 新的解锁密钥
+        """
+        from cryptography.fernet import Fernet
+
+        settings = get_settings()
+        algorithm = (algorithm or settings.kdf_algorithm).lower()
+        if algorithm not in KDF_ALGORITHMS:
+            raise ValueError(f"不支持的密钥派生算法: {algorithm}")
+        cost = (
+            cost
+            or settings.kdf_cost
+            or (cls._SCRYPT_COST if algorithm == "scrypt" else cls._KDF_ITERATIONS)
+        )
+        keys, _ = cls.load_keys()
+        unlock_key, salt = cls.derive_key(passphrase, None, algorithm, cost)
+        wrapper = Fernet(unlock_key)
+        params = {
+            "algorithm": algorithm,
+            "cost": cost,
+            "salt": base64.b64encode(salt).decode(),
+            "check": wrapper.encrypt(_KDF_CHECK).decode(),
+        }
+        with db.atomic("IMMEDIATE"):
+            for key_id, key in keys.items():
+                TotpKeyStorage.update(encrypted_key=wrapper.encrypt(key)).where(
+                    TotpKeyStorage.key_name == key_id
+                ).execute()
+            TotpKeyStorage.insert(
+                key_name=KDF_RECORD, encrypted_key=json.dumps(params).encode()
+            ).on_conflict_replace().execute()
+        CipherSession.set_unlock_key(unlock_key)
+        log.info(f"主密钥已由密码保护（{algorithm}, 成本 {cost}）")
+        return unlock_key
+
+    @classmethod
+    def unprotect(cls) -> None:
+        """取消密码保护（需要先解锁），主密钥恢复为直接保存"""
+        keys, _ = cls.load_keys()
+        with db.atomic("IMMEDIATE"):
+            for key_id, key in keys.items():
+                TotpKeyStorage.update(encrypted_key=key).where(
+                    TotpKeyStorage.key_name == key_id
+                ).execute()
+            TotpKeyStorage.delete().where(
+                TotpKeyStorage.key_name == KDF_RECORD
+            ).execute()
+        CipherSession.set_unlock_key(None)
+        log.info("已取消主密钥的密码保护")
+
+    @classmethod
+    def _wrap(cls, key: bytes) -> bytes:
+        """已设置密码时用解锁密钥加密主密钥，否则原样返回"""
+        if not cls.is_protected():
+            return key
+        return cls.encrypt(key, CipherSession.get_unlock_key())
+
+    @classmethod
+    @timed("crypto.encrypt")
     def encrypt(cls, data: bytes, key: bytes) -> bytes:
         """加密二进制数据
 
@@ -71,10 +244,13 @@ class EncryptionUtils:
         Returns:
                 bytes: 加密后的数据（包含IV等信息，可直接存储）
         """
+        from cryptography.fernet import Fernet
+
         fernet = Fernet(key)
         return fernet.encrypt(data)
 
     @classmethod
+    @timed("crypto.decrypt")
     def decrypt(cls, encrypted_data: bytes, key: bytes) -> bytes:
         """解密数据
 
@@ -85,6 +261,8 @@ class EncryptionUtils:
         Returns:
                 bytes: 解密后的原始数据
         """
+        from cryptography.fernet import Fernet
+
         fernet = Fernet(key)
         try:
             return fernet.decrypt(encrypted_data)
@@ -92,13 +270,56 @@ class EncryptionUtils:
             raise ValueError("解密失败，密钥可能不正确或数据已损坏") from e
 
     @classmethod
-    def load_encrypt_key(cls) -> bytes:
-        """从数据库加载加密密钥"""
-        try:
-            key_record = TotpKeyStorage.get(TotpKeyStorage.key_name == "main_key")
-            return key_record.encrypted_key
-        except DoesNotExist:
+    def _key_records(cls):
+        """查询所有主密钥记录（按创建顺序，最后一条为当前使用的密钥）"""
+        return (
+            TotpKeyStorage.select()
+            .where(
+                (TotpKeyStorage.key_name == LEGACY_KEY_ID)
+                | TotpKeyStorage.key_name.startswith(KEY_ID_PREFIX)
+            )
+            .order_by(TotpKeyStorage.id)
+        )
+
+    @classmethod
+    @timed("db.load_keys")
+    def load_keys(cls) -> tuple[dict[str, bytes], str]:
+        """从数据库加载所有主密钥
+
+        Returns:
+            tuple: ({密钥ID: 密钥}, 当前使用的密钥ID)
+        """
+        keys = {record.key_name: record.encrypted_key for record in cls._key_records()}
+        if not keys:
+            raise ValueError("未找到加密密钥，请先初始化密钥")
+        if cls.is_protected():
+            # 主密钥由密码保护，用解锁密钥解开（不会在这里执行密钥派生）
+            unlock_key = CipherSession.get_unlock_key()
+            keys = {
+                key_id: cls.decrypt(key, unlock_key) for key_id, key in keys.items()
+            }
+        return keys, list(keys)[-1]
+
+    @classmethod
+    @timed("db.active_key_id")
+    def active_key_id(cls) -> str:
+        """查询当前使用的主密钥ID（只读取密钥名）"""
+        record = (
+            cls._key_records()
+            .select(TotpKeyStorage.key_name)
+            .order_by(TotpKeyStorage.id.desc())
+            .first()
+        )
+        if record is None:
             raise ValueError("未找到加密密钥，请先初始化密钥")
+        return record.key_name
+
+    @classmethod
+    @timed("db.load_encrypt_key")
+    def load_encrypt_key(cls) -> bytes:
+        """从数据库加载当前使用的加密密钥"""
+        keys, active_key_id = cls.load_keys()
+        return keys[active_key_id]
 
     @classmethod
     def save_encrypt_key(cls, key: bytes) -> None:
@@ -109,40 +330,246 @@ class EncryptionUtils:
         """
         try:
             # 尝试更新现有记录
-            key_record = TotpKeyStorage.get(TotpKeyStorage.key_name == "main_key")
-            key_record.encrypted_key = key
+            key_record = TotpKeyStorage.get(TotpKeyStorage.key_name == LEGACY_KEY_ID)
+            key_record.encrypted_key = cls._wrap(key)
             key_record.save()
             log.info("加密密钥已更新并保存到数据库")
-            return
         except DoesNotExist:
             # 如果记录不存在，则创建新记录
-            TotpKeyStorage.create(key_name="main_key", encrypted_key=key)
+            # 已设置密码时同样用解锁密钥加密（保险库已锁定时拒绝保存）
+            TotpKeyStorage.create(key_name=LEGACY_KEY_ID, encrypted_key=cls._wrap(key))
             log.info("加密密钥已创建并保存到数据库")
-            return
+        finally:
+            # 密钥已变更，缓存的加密器失效
+            CipherSession.clear()
+
+    @classmethod
+    def add_key(cls, key: bytes) -> str:
+        """新增一个主密钥并设为当前使用的密钥（旧密钥保留，用于解密旧数据）
+
+        Args:
+            key: 新的Fernet密钥
+
+        Returns:
+            str: 新密钥的ID
+        """
+        key_id = f"{KEY_ID_PREFIX}{int(time.time())}"
+        while TotpKeyStorage.select().where(TotpKeyStorage.key_name == key_id).exists():
+            key_id = f"{KEY_ID_PREFIX}{int(key_id[len(KEY_ID_PREFIX):]) + 1}"
+        TotpKeyStorage.create(key_name=key_id, encrypted_key=cls._wrap(key))
+        CipherSession.clear()
+        log.info(f"已新增主密钥: {key_id}")
+        return key_id
+
+    @classmethod
+    def delete_keys(cls, key_ids) -> int:
+        """删除指定的主密钥（调用方需确保已没有数据使用这些密钥）"""
+        deleted = (
+            TotpKeyStorage.delete()
+            .where(TotpKeyStorage.key_name.in_(list(key_ids)))
+            .execute()
+        )
+        CipherSession.clear()
+        log.info(f"已删除主密钥: {', '.join(key_ids)}")
+        return deleted
+
+
+class CipherSession:
+    """进程级加密会话，缓存所有主密钥对应的Fernet对象
+
+    首次使用时从数据库加载一次密钥，之后复用同一组Fernet对象，
+    超过有效期（ttl）或调用lock/clear后重新加载。加密前最多每
+    ACTIVE_KEY_CHECK_INTERVAL秒确认一次当前密钥，以便其他进程轮换密钥后
+    新数据使用新密钥加密。
+
+    主密钥由密码保护时，解锁密钥优先使用当前进程设置的（set_unlock_key），
+    其次向解锁代理获取；两者都没有时拒绝加载，不会隐式执行密钥派生。
+    """
+
+    # 会话有效期（秒），None表示不过期
+    ttl: Optional[float] = None
+
+    _ciphers: dict[str, "Fernet"] = {}
+    _active_key_id: Optional[str] = None
+    _loaded_at: float = 0.0
+    _checked_at: float = 0.0
+    _locked: bool = False
+    _unlock_key: Optional[bytes] = None
+    _generation: int = 0  # 每次清除或锁定时加1
+    _lock = threading.Lock()
+
+    @classmethod
+    def get_cipher(cls) -> "Fernet":
+        """获取当前使用的密钥对应的Fernet对象（必要时从数据库加载密钥）"""
+        return cls.get_active()[1]
+
+    @classmethod
+    def get_active(cls) -> tuple[str, "Fernet"]:
+        """获取当前使用的密钥ID及Fernet对象（用于加密）"""
+        with cls._lock:
+            cls._ensure_loaded()
+            if time.monotonic() - cls._checked_at > ACTIVE_KEY_CHECK_INTERVAL:
+                if EncryptionUtils.active_key_id() != cls._active_key_id:
+                    cls._load()
+                cls._checked_at = time.monotonic()
+            return cls._active_key_id, cls._ciphers[cls._active_key_id]
+
+    @classmethod
+    def get_cipher_for(cls, key_id: str) -> "Fernet":
+        """获取指定密钥ID对应的Fernet对象（用于解密）"""
+        with cls._lock:
+            cls._ensure_loaded()
+            if key_id not in cls._ciphers:
+                # 可能是其他进程新增的密钥
+                cls._load()
+            if key_id not in cls._ciphers:
+                raise ValueError(f"未找到加密密钥: {key_id}")
+            return cls._ciphers[key_id]
+
+    @classmethod
+    def set_ttl(cls, ttl: Optional[float]) -> None:
+        """设置会话有效期
+
+        Args:
+            ttl: 有效期（秒），None表示不过期
+        """
+        with cls._lock:
+            cls.ttl = ttl
+
+    @classmethod
+    def set_unlock_key(cls, unlock_key: Optional[bytes]) -> None:
+        """设置当前进程使用的解锁密钥（None则改为向解锁代理获取）"""
+        cls._unlock_key = unlock_key
+        cls.clear()
+
+    @classmethod
+    def get_unlock_key(cls) -> bytes:
+        """获取解锁密钥：当前进程设置的优先，其次向解锁代理获取
+
+        Raises:
+            ValueError: 保险库已锁定
+        """
+        unlock_key = cls._unlock_key
+        if unlock_key is None:
+            from src.core.daemon.agent import AgentClient
+            from src.core.daemon.client import DaemonError
+
+            try:
+                unlock_key = AgentClient().get_unlock_key()
+            except DaemonError:
+                unlock_key = None
+        if unlock_key is None:
+            raise ValueError("保险库已锁定，请先执行 totp unlock")
+        return unlock_key
+
+    @classmethod
+    def generation(cls) -> int:
+        """缓存密钥的版本，清除（包括新增、删除密钥）或锁定后变化
+
+        在会话之外缓存由主密钥派生的密钥时（如单文件保险库），据此判断缓存是否失效。
+
+        Raises:
+            ValueError: 会话已锁定
+        """
+        with cls._lock:
+            if cls._locked:
+                raise ValueError("加密会话已锁定，请先解锁")
+            return cls._generation
+
+    @classmethod
+    def clear(cls) -> None:
+        """清除缓存的密钥，下次使用时重新加载"""
+        with cls._lock:
+            cls._ciphers = {}
+            cls._active_key_id = None
+            cls._loaded_at = 0.0
+            cls._generation += 1
+
+    @classmethod
+    def lock(cls) -> None:
+        """锁定会话：清除缓存的密钥和解锁密钥，并拒绝加解密直到调用unlock"""
+        with cls._lock:
+            cls._ciphers = {}
+            cls._active_key_id = None
+            cls._unlock_key = None
+            cls._locked = True
+            cls._generation += 1
+
+    @classmethod
+    def unlock(cls) -> None:
+        """解锁会话"""
+        with cls._lock:
+            cls._locked = False
+
+    @classmethod
+    def _ensure_loaded(cls) -> None:
+        """未加载或已过期时加载密钥（调用方需持有锁）"""
+        if cls._locked:
+            raise ValueError("加密会话已锁定，请先解锁")
+        if cls._active_key_id is None or cls._is_expired():
+            cls._load()
+
+    @classmethod
+    def _load(cls) -> None:
+        """从数据库加载所有密钥（调用方需持有锁）"""
+        from cryptography.fernet import Fernet
+
+        keys, active_key_id = EncryptionUtils.load_keys()
+        cls._ciphers = {key_id: Fernet(key) for key_id, key in keys.items()}
+        cls._active_key_id = active_key_id
+        cls._loaded_at = cls._checked_at = time.monotonic()
+
+    @classmethod
+    def _is_expired(cls) -> bool:
+        """判断会话是否超过有效期（调用方需持有锁）"""
+        return cls.ttl is not None and time.monotonic() - cls._loaded_at > cls.ttl
+
+
+def split_key_id(encrypted_secret: bytes) -> tuple[str, bytes]:
+    """拆分加密数据中的密钥ID前缀
+
+    加密数据格式为 "密钥ID$Fernet令牌"；没有前缀的旧数据使用 main_key 加密。
+
+    Returns:
+        tuple: (密钥ID, Fernet令牌)
+    """
+    key_id, separator, token = encrypted_secret.partition(KEY_ID_SEPARATOR)
+    if not separator:
+        return LEGACY_KEY_ID, encrypted_secret
+    return key_id.decode(), token
+
+
+def key_id_prefix(key_id: str) -> bytes:
+    """返回使用指定密钥加密的数据的前缀"""
+    return key_id.encode() + KEY_ID_SEPARATOR
 
 
 # 项目专用的加密函数（简化调用）
 def init_encrypt_key() -> None:
     """初始化加密密钥（兼容开发和打包后环境）"""
-    try:
-        # 检查数据库中是否已经存在密钥
-        TotpKeyStorage.get(TotpKeyStorage.key_name == "main_key")
+    # 检查数据库中是否已经存在密钥（密钥轮换后main_key可能已被替换）
+    if EncryptionUtils._key_records().exists():
         log.info("加密密钥已存在在数据库中")
         return
-    except DoesNotExist:
-        log.info("数据库中未找到加密密钥，将生成新密钥")
-        EncryptionUtils().save_encrypt_key(EncryptionUtils.generate_fernet_key())
+    log.info("数据库中未找到加密密钥，将生成新密钥")
+    EncryptionUtils().save_encrypt_key(EncryptionUtils.generate_fernet_key())
 
 
+@timed("crypto.encrypt_secret")
 def encrypt_secret(
     secret: bytes,
 ) -> bytes:
-    """加密TOTP密钥（项目专用接口）"""
-    key = EncryptionUtils.load_encrypt_key()
-    return EncryptionUtils.encrypt(secret, key)
+    """加密TOTP密钥（项目专用接口），结果带有所用密钥的ID前缀"""
+    key_id, cipher = CipherSession.get_active()
+    return key_id_prefix(key_id) + cipher.encrypt(secret)
 
 
+@timed("crypto.decrypt_secret")
 def decrypt_secret(encrypted_secret: bytes) -> bytes:
     """解密TOTP密钥（项目专用接口）"""
-    key = EncryptionUtils.load_encrypt_key()
-    return EncryptionUtils.decrypt(encrypted_secret, key)
+    key_id, token = split_key_id(encrypted_secret)
+    cipher = CipherSession.get_cipher_for(key_id)
+    try:
+        return cipher.decrypt(token)
+    except Exception as e:
+        raise ValueError("解密失败，密钥可能不正确或数据已损坏") from e
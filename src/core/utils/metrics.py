@@ -0,0 +1,241 @@
+import atexit
+import functools
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+from pathlib import Path
+from typing import Optional
+
+# 延迟直方图的桶上限（秒）
+BUCKETS = (
+    0.00001,
+    0.00005,
+    0.0001,
+    0.0005,
+    0.001,
+    0.005,
+    0.01,
+    0.05,
+    0.1,
+    0.5,
+    1.0,
+    5.0,
+)
+
+# 当前正在计时的操作中，已结束的子操作的累计耗时（[秒]，None表示没有外层操作）
+# 用于计算每个操作去掉嵌套子操作后的自身耗时，按类别汇总时不重复计算
+_child_seconds: ContextVar[Optional[list]] = ContextVar("child_seconds", default=None)
+
+
+class Metrics:
+    """进程内的计数器和延迟直方图
+
+    操作名使用 "类别.操作" 格式（如 db.get_account、crypto.decrypt、hmac.generate_many），
+    便于按类别统计数据库、加解密和HMAC各自的耗时。未启用时记录函数直接返回。
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self._lock = threading.Lock()
+        # 操作名 -> [调用次数, 总耗时, 各桶计数, 自身耗时]
+        self._timings: dict[str, list] = {}
+        # 计数器名 -> 值
+        self._counters: dict[str, int] = {}
+
+    def observe(
+        self, name: str, seconds: float, self_seconds: Optional[float] = None
+    ) -> None:
+        """记录一次操作耗时
+
+        Args:
+            name: 操作名
+            seconds: 总耗时（包含嵌套的子操作）
+            self_seconds: 去掉已计时子操作后的自身耗时（None则等于总耗时）
+        """
+        if not self.enabled:
+            return
+        if self_seconds is None:
+            self_seconds = seconds
+        with self._lock:
+            timing = self._timings.get(name)
+            if timing is None:
+                timing = self._timings[name] = [0, 0.0, [0] * (len(BUCKETS) + 1), 0.0]
+            timing[0] += 1
+            timing[1] += seconds
+            timing[2][bisect_left(BUCKETS, seconds)] += 1
+            timing[3] += self_seconds
+
+    def increment(self, name: str, value: int = 1) -> None:
+        """增加计数器"""
+        if not self.enabled:
+            return
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + value
+
+    def reset(self) -> None:
+        """清空所有统计数据"""
+        with self._lock:
+            self._timings.clear()
+            self._counters.clear()
+
+    def snapshot(self) -> dict:
+        """返回当前统计数据的副本（可直接序列化为JSON）"""
+        with self._lock:
+            return {
+                "timings": {
+                    name: {
+                        "count": count,
+                        "total_seconds": total,
+                        "self_seconds": self_total,
+                        "buckets": list(buckets),
+                    }
+                    for name, (
+                        count,
+                        total,
+                        buckets,
+                        self_total,
+                    ) in self._timings.items()
+                },
+                "counters": dict(self._counters),
+            }
+
+
+def format_prometheus(snapshot: dict) -> str:
+    """把统计数据转换为Prometheus文本格式"""
+    lines = [
+        "# HELP totp_operation_duration_seconds Duration of instrumented operations.",
+        "# TYPE totp_operation_duration_seconds histogram",
+    ]
+    for name, timing in sorted(snapshot["timings"].items()):
+        cumulative = 0
+        for bound, count in zip(BUCKETS + (float("inf"),), timing["buckets"]):
+            cumulative += count
+            le = "+Inf" if bound == float("inf") else repr(bound)
+            lines.append(
+                f'totp_operation_duration_seconds_bucket{{operation="{name}",le="{le}"}} {cumulative}'
+            )
+        lines.append(
+            f'totp_operation_duration_seconds_sum{{operation="{name}"}} {timing["total_seconds"]}'
+        )
+        lines.append(
+            f'totp_operation_duration_seconds_count{{operation="{name}"}} {timing["count"]}'
+        )
+    lines.append(
+        "# HELP totp_operation_self_seconds_total Time spent in operations excluding nested instrumented operations."
+    )
+    lines.append("# TYPE totp_operation_self_seconds_total counter")
+    for name, timing in sorted(snapshot["timings"].items()):
+        self_seconds = timing.get("self_seconds", timing["total_seconds"])
+        lines.append(
+            f'totp_operation_self_seconds_total{{operation="{name}"}} {self_seconds}'
+        )
+    lines.append("# HELP totp_events_total Count of instrumented events.")
+    lines.append("# TYPE totp_events_total counter")
+    for name, value in sorted(snapshot["counters"].items()):
+        lines.append(f'totp_events_total{{event="{name}"}} {value}')
+    return "\n".join(lines) + "\n"
+
+
+def format_summary(snapshot: dict) -> str:
+    """把统计数据格式化为按类别汇总的可读文本
+
+    类别汇总使用各操作的自身耗时（不含嵌套的子操作），嵌套调用不会被重复计算。
+    """
+    lines = []
+    categories: dict[str, float] = {}
+    for name, timing in snapshot["timings"].items():
+        category = name.split(".", 1)[0]
+        self_seconds = timing.get("self_seconds", timing["total_seconds"])
+        categories[category] = categories.get(category, 0.0) + self_seconds
+
+    lines.append(f"{'类别':<10}{'总耗时(ms)':>14}")
+    for category, total in sorted(categories.items(), key=lambda item: -item[1]):
+        lines.append(f"{category:<12}{total * 1000:>14.3f}")
+    lines.append("")
+    lines.append(
+        f"{'操作':<28}{'次数':>10}{'平均(ms)':>12}{'总计(ms)':>12}{'自身(ms)':>12}"
+    )
+    for name, timing in sorted(snapshot["timings"].items()):
+        count, total = timing["count"], timing["total_seconds"]
+        self_seconds = timing.get("self_seconds", total)
+        lines.append(
+            f"{name:<30}{count:>10}{total / count * 1000:>12.3f}"
+            f"{total * 1000:>12.3f}{self_seconds * 1000:>12.3f}"
+        )
+    if snapshot["counters"]:
+        lines.append("")
+        for name, value in sorted(snapshot["counters"].items()):
+            lines.append(f"{name:<30}{value:>10}")
+    return "\n".join(lines)
+
+
+# 全局统计对象
+metrics = Metrics()
+
+
+def timed(name: str):
+    """装饰器：记录函数耗时（未启用统计时只多一次属性判断）"""
+
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not metrics.enabled:
+                return func(*args, **kwargs)
+            with _span(name):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+@contextmanager
+def timer(name: str):
+    """上下文管理器：记录代码块耗时"""
+    if not metrics.enabled:
+        yield
+        return
+    with _span(name):
+        yield
+
+
+@contextmanager
+def _span(name: str):
+    """记录一个操作的总耗时和自身耗时，并把总耗时计入外层操作的子操作耗时"""
+    parent = _child_seconds.get()
+    children = [0.0]
+    token = _child_seconds.set(children)
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - started
+        _child_seconds.reset(token)
+        if parent is not None:
+            parent[0] += elapsed
+        # 子操作在其他线程中并行执行时子耗时可能超过总耗时
+        metrics.observe(name, elapsed, max(0.0, elapsed - children[0]))
+
+
+def configure_metrics(enabled: Optional[bool] = None) -> None:
+    """按配置启用统计；配置了METRICS_FILE时在进程退出时导出Prometheus文本
+
+    Args:
+        enabled: 是否启用（None则读取配置）
+    """
+    from src.core.config.config import get_settings
+
+    settings = get_settings()
+    metrics.enabled = settings.metrics_enabled if enabled is None else enabled
+    if metrics.enabled and settings.metrics_file:
+        atexit.register(dump_prometheus, Path(settings.metrics_file).expanduser())
+
+
+def dump_prometheus(path: Path) -> None:
+    """把当前统计数据以Prometheus文本格式写入文件"""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_suffix(path.suffix + ".tmp")
+    tmp_path.write_text(format_prometheus(metrics.snapshot()), encoding="utf-8")
+    tmp_path.replace(path)
@@ -0,0 +1,147 @@
+import csv
+from pathlib import Path
+from typing import Iterator, Optional
+from urllib.parse import parse_qs, quote, unquote, urlencode, urlparse
+
+from src.core.utils.totp_utils import HASH_ALGORITHMS, TOTPUtils
+
+SUPPORTED_ALGORITHMS = tuple(HASH_ALGORITHMS)
+
+
+def _build_record(
+    account_name: str,
+    secret: str,
+    digits=None,
+    period=None,
+    algorithm=None,
+) -> dict:
+    """校验字段并生成账户记录"""
+    account_name = account_name.strip()
+    secret = "".join(secret.split()).upper()
+    if not account_name:
+        raise ValueError("账户名不能为空")
+    if not secret:
+        raise ValueError("密钥不能为空")
+    TOTPUtils.decode_secret(secret)
+    record = {
+        "account_name": account_name,
+        "secret": secret,
+        "digits": int(digits or 6),
+        "period": int(period or 30),
+        "algorithm": (algorithm or "SHA1").upper().replace("-", ""),
+    }
+    if record["digits"] not in (6, 7, 8):
+        raise ValueError(f"不支持的验证码位数: {record['digits']}")
+    if record["period"] <= 0:
+        raise ValueError(f"无效的有效期: {record['period']}")
+    if record["algorithm"] not in SUPPORTED_ALGORITHMS:
+        raise ValueError(f"不支持的哈希算法: {record['algorithm']}")
+    return record
+
+
+def parse_otpauth_uri(uri: str) -> dict:
+    """解析 otpauth://totp/ URI
+
+    Args:
+        uri: 形如 otpauth://totp/Issuer:account?secret=...&digits=6&period=30 的URI
+
+    Returns:
+        dict: 包含 account_name、secret、digits、period、algorithm 的账户记录
+    """
+    parsed = urlparse(uri.strip())
+    if parsed.scheme != "otpauth":
+        raise ValueError("不是otpauth URI")
+    if parsed.netloc.lower() != "totp":
+        raise ValueError(f"不支持的OTP类型: {parsed.netloc}")
+
+    params = {key: values[-1] for key, values in parse_qs(parsed.query).items()}
+    if "secret" not in params:
+        raise ValueError("URI中缺少secret参数")
+    account_name = unquote(parsed.path.lstrip("/"))
+    issuer = params.get("issuer")
+    # 标签中没有发行方前缀时，用issuer参数补全
+    if issuer and ":" not in account_name:
+        account_name = f"{issuer}:{account_name}"
+    return _build_record(
+        account_name,
+        params["secret"],
+        params.get("digits"),
+        params.get("period"),
+        params.get("algorithm"),
+    )
+
+
+def build_otpauth_uri(
+    account_name: str,
+    secret: str,
+    digits: int = 6,
+    period: int = 30,
+    algorithm: str = "SHA1",
+) -> str:
+    """生成 otpauth://totp/ URI（parse_otpauth_uri 的逆操作）"""
+    params = {"secret": secret, "digits": digits, "period": period}
+    if algorithm != "SHA1":
+        params["algorithm"] = algorithm
+    return f"otpauth://totp/{quote(account_name)}?{urlencode(params)}"
+
+
+def iter_import_file(
+    path: Path, file_format: Optional[str] = None
+) -> Iterator[tuple[int, Optional[dict], Optional[str]]]:
+    """逐行流式读取导入文件，不会一次性读入整个文件
+
+    支持两种格式：
+        uri: 每行一个 otpauth URI（空行和#开头的行被忽略）
+        csv: 带表头的CSV，列为 account_name/name、secret、digits、period、algorithm，
+             或包含一个 uri/otpauth 列
+
+    Args:
+        path: 文件路径
+        file_format: uri 或 csv（None则按扩展名判断）
+
+    Returns:
+        Iterator: (行号, 账户记录, 错误信息) ，解析失败时记录为None
+    """
+    path = Path(path)
+    if file_format is None:
+        file_format = "csv" if path.suffix.lower() == ".csv" else "uri"
+
+    with open(path, "r", encoding="utf-8-sig", newline="") as f:
+        if file_format == "uri":
+            for line_no, line in enumerate(f, 1):
+                line = line.strip()
+                if not line or line.startswith("#"):
+                    continue
+                try:
+                    yield line_no, parse_otpauth_uri(line), None
+                except ValueError as e:
+                    yield line_no, None, str(e)
+        elif file_format == "csv":
+            reader = csv.DictReader(f)
+            for row in reader:
+                line_no = reader.line_num
+                try:
+                    # 字段多于表头时DictReader把多余的值放在None键下（值为列表）
+                    if None in row:
+                        raise ValueError("字段数量多于表头")
+                    row = {
+                        k.strip().lower(): v.strip() if isinstance(v, str) else ""
+                        for k, v in row.items()
+                    }
+                    uri = row.get("uri") or row.get("otpauth")
+                    if uri:
+                        record = parse_otpauth_uri(uri)
+                    else:
+                        record = _build_record(
+                            row.get("account_name") or row.get("name") or "",
+                            row.get("secret") or "",
+                            row.get("digits"),
+                            row.get("period"),
+                            row.get("algorithm"),
+                        )
+                except ValueError as e:
+                    yield line_no, None, str(e)
+                    continue
+                yield line_no, record, None
+        else:
+            raise ValueError(f"不支持的导入格式: {file_format}")
@@ -0,0 +1,125 @@
+import heapq
+import threading
+import time
+from collections import OrderedDict
+from typing import Hashable, Optional
+
+
+class TOTPCodeCache:
+    """TOTP验证码缓存，按 (账户ID, 时间计数器) 缓存已生成的验证码
+
+    验证码只在 floor(t / period) 变化时才会改变，因此同一时间窗口内的
+    重复请求可以直接命中缓存。时间窗口结束后条目立即失效，
+    缓存条目数量不超过 max_size。
+    """
+
+    def __init__(self, max_size: int = 4096):
+        """
+        Args:
+            max_size: 最多缓存的验证码数量
+        """
+        if max_size <= 0:
+            raise ValueError("缓存大小必须大于0")
+        self._max_size = max_size
+        # (账户ID, 计数器) -> (验证码, 过期时间, 版本)
+        self._codes: OrderedDict = OrderedDict()
+        # (过期时间, (账户ID, 计数器))，用于按窗口结束时间淘汰
+        self._expiry_heap: list = []
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._codes)
+
+    def get(
+        self,
+        account_id: Hashable,
+        period: int,
+        for_time: Optional[float] = None,
+        version: Optional[Hashable] = None,
+    ) -> Optional[str]:
+        """获取缓存的验证码
+
+        Args:
+            account_id: 账户ID
+            period: 验证码有效期（秒）
+            for_time: 时间戳（None则使用当前时间）
+            version: 账户版本（如加密后的密钥），与缓存时不一致视为未命中
+
+        Returns:
+            Optional[str]: 缓存的验证码，未命中时返回None
+        """
+        if for_time is None:
+            for_time = time.time()
+        key = (account_id, int(for_time // period))
+        with self._lock:
+            self._evict_expired(for_time)
+            entry = self._codes.get(key)
+            if entry is None or entry[2] != version:
+                return None
+            return entry[0]
+
+    def put(
+        self,
+        account_id: Hashable,
+        period: int,
+        code: str,
+        for_time: Optional[float] = None,
+        version: Optional[Hashable] = None,
+    ) -> None:
+        """缓存验证码，有效期到所在时间窗口结束为止
+
+        Args:
+            account_id: 账户ID
+            period: 验证码有效期（秒）
+            code: 验证码
+            for_time: 生成验证码所用的时间戳（None则使用当前时间）
+            version: 账户版本（如加密后的密钥）
+        """
+        if for_time is None:
+            for_time = time.time()
+        counter = int(for_time // period)
+        key = (account_id, counter)
+        expires_at = (counter + 1) * period
+        with self._lock:
+            self._evict_expired(for_time)
+            self._codes[key] = (code, expires_at, version)
+            self._codes.move_to_end(key)
+            heapq.heappush(self._expiry_heap, (expires_at, key))
+            while len(self._codes) > self._max_size:
+                self._codes.popitem(last=False)
+            # 被容量淘汰的条目仍留在堆中，堆过大时重建
+            if len(self._expiry_heap) > 2 * self._max_size:
+                self._expiry_heap = [(entry[1], k) for k, entry in self._codes.items()]
+                heapq.heapify(self._expiry_heap)
+
+    def invalidate(self, account_id: Hashable) -> None:
+        """删除指定账户的所有缓存验证码（账户更新或删除时调用）"""
+        with self._lock:
+            for key in [k for k in self._codes if k[0] == account_id]:
+                del self._codes[key]
+
+    def clear(self) -> None:
+        """清空缓存"""
+        with self._lock:
+            self._codes.clear()
+            self._expiry_heap.clear()
+
+    def _evict_expired(self, now: float) -> None:
+        """淘汰时间窗口已结束的条目（调用方需持有锁）"""
+        heap = self._expiry_heap
+        while heap and heap[0][0] <= now:
+            expires_at, key = heapq.heappop(heap)
+            entry = self._codes.get(key)
+            if entry is not None and entry[1] == expires_at:
+                del self._codes[key]
+
+
+_code_cache = None
+
+
+def get_code_cache() -> TOTPCodeCache:
+    """获取进程内共享的验证码缓存"""
+    global _code_cache
+    if _code_cache is None:
+        _code_cache = TOTPCodeCache()
+    return _code_cache
@@ -0,0 +1,230 @@
+import hmac
+import mmap
+import os
+import struct
+import time
+from pathlib import Path
+from typing import Iterable, Optional
+
+from src.core.utils.totp_utils import TOTPUtils
+
+# 文件格式：
+#   文件头: 魔数(8字节) + 起始时间(int64) + 每个账户的窗口数(uint32) + 账户数(uint32)
+#   记录:   账户ID(uint64) + 首个时间计数器(uint64) + 有效期(uint16) + 位数(uint8) + 填充(1字节)
+#           + 窗口数个验证码(uint32)
+#   记录定长且按账户ID升序排列，可内存映射后二分查找，所有整数均为小端序
+SCHEDULE_MAGIC = b"TOTPSCH\x01"
+_HEADER = struct.Struct("<8sqII")
+_RECORD_PREFIX = struct.Struct("<QQHBx")
+_ACCOUNT_ID = struct.Struct("<Q")
+# 记录字段的取值上限（有效期为uint16，位数为uint8）
+_MAX_PERIOD = 0xFFFF
+_MAX_DIGITS = 0xFF
+
+
+def _record_struct(windows: int) -> struct.Struct:
+    """指定窗口数的定长记录格式"""
+    return struct.Struct(f"{_RECORD_PREFIX.format}{windows}I")
+
+
+def write_schedule(
+    path: Path,
+    accounts: Iterable[tuple[int, str, int, int, str]],
+    windows: int,
+    start_time: Optional[float] = None,
+) -> int:
+    """预先计算账户在接下来若干时间窗口的验证码并写入二进制文件（不包含密钥）
+
+    相同有效期的账户共享已打包的时间计数器，每个账户的所有窗口在一次批量计算中完成。
+    先写入临时文件，完成后再替换目标文件。
+
+    Args:
+        path: 输出文件路径
+        accounts: (账户ID, 密钥, 验证码位数, 有效期, 哈希算法) 序列，必须按账户ID升序
+        windows: 每个账户计算的时间窗口数量
+        start_time: 起始时间戳（None则使用当前时间）
+
+    Returns:
+        int: 写入的账户数量
+    """
+    if windows <= 0:
+        raise ValueError("时间窗口数量必须大于0")
+    if start_time is None:
+        start_time = time.time()
+    start_time = int(start_time)
+    record = _record_struct(windows)
+    # 有效期 -> (首个计数器, 打包后的计数器)
+    counters: dict[int, tuple[int, list[bytes]]] = {}
+
+    path = Path(path)
+    tmp_path = path.with_suffix(path.suffix + ".tmp")
+    count = 0
+    last_id = -1
+    try:
+        with open(tmp_path, "wb") as f:
+            f.write(_HEADER.pack(SCHEDULE_MAGIC, start_time, windows, 0))
+            for account_id, secret, digits, period, algorithm in accounts:
+                if account_id <= last_id:
+                    raise ValueError("账户必须按ID升序排列")
+                if not 0 < period <= _MAX_PERIOD:
+                    raise ValueError(f"账户 {account_id} 的有效期超出范围: {period}")
+                if not 0 < digits <= _MAX_DIGITS:
+                    raise ValueError(
+                        f"账户 {account_id} 的验证码位数超出范围: {digits}"
+                    )
+                last_id = account_id
+                if period not in counters:
+                    first = start_time // period
+                    counters[period] = (
+                        first,
+                        [struct.pack(">Q", first + i) for i in range(windows)],
+                    )
+                first, packed = counters[period]
+                codes = TOTPUtils.code_values(secret, digits, packed, algorithm)
+                f.write(record.pack(account_id, first, period, digits, *codes))
+                count += 1
+            # 补写账户数量
+            f.seek(0)
+            f.write(_HEADER.pack(SCHEDULE_MAGIC, start_time, windows, count))
+        os.replace(tmp_path, path)
+    finally:
+        # 写入失败时不留下不完整的临时文件
+        if tmp_path.exists():
+            tmp_path.unlink()
+    return count
+
+
+class CodeSchedule:
+    """验证码计划文件的只读访问
+
+    文件以内存映射方式打开，按账户ID二分查找（O(log n)），只有被访问的页会被读入内存。
+    可用于无法接触密钥的离线验证端。
+    """
+
+    def __init__(self, path: Path):
+        """
+        Args:
+            path: write_schedule 生成的文件
+        """
+        with open(path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            if len(self._mmap) < _HEADER.size:
+                raise ValueError("验证码计划文件不完整")
+            magic, self.start_time, self.windows, self._count = _HEADER.unpack_from(
+                self._mmap
+            )
+            if magic != SCHEDULE_MAGIC:
+                raise ValueError("不是验证码计划文件")
+            self._record = _record_struct(self.windows)
+            if len(self._mmap) != _HEADER.size + self._count * self._record.size:
+                raise ValueError("验证码计划文件不完整")
+        except Exception:
+            self._mmap.close()
+            raise
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self) -> None:
+        """关闭内存映射"""
+        self._mmap.close()
+
+    def _offset(self, index: int) -> int:
+        return _HEADER.size + index * self._record.size
+
+    def find(self, account_id: int) -> Optional[int]:
+        """二分查找账户记录的位置，不存在时返回None"""
+        low, high = 0, self._count
+        while low < high:
+            middle = (low + high) // 2
+            (middle_id,) = _ACCOUNT_ID.unpack_from(self._mmap, self._offset(middle))
+            if middle_id < account_id:
+                low = middle + 1
+            else:
+                high = middle
+        if low < self._count:
+            (found_id,) = _ACCOUNT_ID.unpack_from(self._mmap, self._offset(low))
+            if found_id == account_id:
+                return low
+        return None
+
+    def codes(self, account_id: int) -> Optional[tuple[int, int, int, list[str]]]:
+        """读取账户的所有预计算验证码
+
+        Returns:
+            tuple: (首个时间计数器, 有效期, 验证码位数, 验证码列表)，账户不存在时返回None
+        """
+        index = self.find(account_id)
+        if index is None:
+            return None
+        _, first, period, digits, *values = self._record.unpack_from(
+            self._mmap, self._offset(index)
+        )
+        return first, period, digits, [str(value).zfill(digits) for value in values]
+
+    def _code_at(self, index: int, counter: int) -> Optional[str]:
+        """读取指定记录中某个时间计数器的验证码（超出计划范围时返回None）"""
+        offset = self._offset(index)
+        _, first, _, digits = _RECORD_PREFIX.unpack_from(self._mmap, offset)
+        position = counter - first
+        if not 0 <= position < self.windows:
+            return None
+        (value,) = struct.unpack_from(
+            "<I", self._mmap, offset + _RECORD_PREFIX.size + position * 4
+        )
+        return str(value).zfill(digits)
+
+    def code_at(
+        self, account_id: int, for_time: Optional[float] = None
+    ) -> Optional[str]:
+        """获取账户在指定时间的验证码
+
+        Returns:
+            Optional[str]: 验证码，账户不存在或时间超出计划范围时返回None
+        """
+        index = self.find(account_id)
+        if index is None:
+            return None
+        if for_time is None:
+            for_time = time.time()
+        _, _, period, _ = _RECORD_PREFIX.unpack_from(self._mmap, self._offset(index))
+        return self._code_at(index, int(for_time // period))
+
+    def verify(
+        self,
+        account_id: int,
+        code: str,
+        for_time: Optional[float] = None,
+        window: int = 1,
+    ) -> bool:
+        """验证验证码（允许前后window个时间窗口的漂移，不做防重放）
+
+        Returns:
+            bool: 验证码是否有效，账户不存在或时间超出计划范围时返回False
+        """
+        code = code.strip()
+        # 验证码只能由ASCII数字组成（如全角数字直接拒绝）
+        if not (code.isascii() and code.isdigit()):
+            return False
+        code = code.encode()
+        index = self.find(account_id)
+        if index is None:
+            return False
+        if for_time is None:
+            for_time = time.time()
+        _, _, period, _ = _RECORD_PREFIX.unpack_from(self._mmap, self._offset(index))
+        counter = int(for_time // period)
+        matched = False
+        for drift in range(-window, window + 1):
+            expected = self._code_at(index, counter + drift)
+            # 检查所有窗口并使用常量时间比较，避免通过耗时推测验证码
+            if expected is not None and hmac.compare_digest(expected.encode(), code):
+                matched = True
+        return matched
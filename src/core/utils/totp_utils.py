@@ -1,5 +1,21 @@
+import base64
+import binascii
+import hmac
+import struct
+import time
+from array import array
+from typing import Iterable, Optional, Union
+
 import pyotp
 
+from src.core.utils.metrics import timed
+
+# 支持的哈希算法 -> hashlib名称
+HASH_ALGORITHMS = {"SHA1": "sha1", "SHA256": "sha256", "SHA512": "sha512"}
+
+# 可用于生成验证码的密钥：Base32字符串、原始字节或预先准备的HMAC对象
+Secret = Union[str, bytes, hmac.HMAC]
+
 
 class TOTPUtils:
     """TOTP工具类，处理TOTP密钥生成、验证码计算和二维码生成"""
@@ -17,16 +33,184 @@ class TOTPUtils:
         return pyotp.random_base32(length=length)
 
     @staticmethod
-    def generate_totp(secret: str, digits: int = 6, period: int = 30) -> str:
+    def decode_secret(secret: Union[str, bytes]) -> bytes:
+        """将Base32格式的TOTP密钥解码为原始字节
+
+        Args:
+            secret: TOTP密钥（Base32格式，允许缺少填充和包含空格），
+                    或已解码的原始密钥字节（原样返回）
+
+        Returns:
+            bytes: 解码后的原始密钥
+        """
+        if isinstance(secret, bytes):
+            return secret
+        secret = secret.replace(" ", "").upper()
+        try:
+            return base64.b32decode(secret + "=" * (-len(secret) % 8))
+        except binascii.Error as e:
+            raise ValueError("TOTP密钥不是合法的Base32格式") from e
+
+    @staticmethod
+    def decode_plaintext(plaintext: bytes) -> bytes:
+        """把解密得到的Base32字节直接解码为原始密钥（不经过str转换）
+
+        Args:
+            plaintext: decrypt_secret 返回的Base32格式密钥字节
+
+        Returns:
+            bytes: 解码后的原始密钥
+        """
+        plaintext = plaintext.replace(b" ", b"").upper()
+        try:
+            return base64.b32decode(plaintext + b"=" * (-len(plaintext) % 8))
+        except binascii.Error as e:
+            raise ValueError("TOTP密钥不是合法的Base32格式") from e
+
+    @staticmethod
+    def prepare(secret: Secret, algorithm: str = "SHA1") -> hmac.HMAC:
+        """解码密钥并预先计算HMAC的内外填充
+
+        返回的HMAC对象只需复制后输入8字节计数器即可得到摘要，
+        适合为同一账户反复生成验证码（已准备好的对象原样返回）。
+
+        Args:
+            secret: TOTP密钥（Base32格式或原始字节）
+            algorithm: 哈希算法（SHA1、SHA256或SHA512）
+
+        Returns:
+            hmac.HMAC: 未输入任何数据的HMAC对象
+        """
+        if isinstance(secret, hmac.HMAC):
+            return secret
+        digestmod = HASH_ALGORITHMS.get(algorithm.upper())
+        if digestmod is None:
+            raise ValueError(f"不支持的哈希算法: {algorithm}")
+        return hmac.new(TOTPUtils.decode_secret(secret), digestmod=digestmod)
+
+    @staticmethod
+    @timed("hmac.generate_totp")
+    def generate_totp(
+        secret: Secret, digits: int = 6, period: int = 30, algorithm: str = "SHA1"
+    ) -> str:
         """生成当前时间的TOTP验证码
 
         Args:
-            secret: TOTP密钥（Base32格式）
-            digits: 验证码位数（6或8）
+            secret: TOTP密钥（Base32格式、原始字节或prepare返回的HMAC对象）
+            digits: 验证码位数（6到8）
             period: 验证码有效期（秒）
+            algorithm: 哈希算法（SHA1、SHA256或SHA512）
 
         Returns:
             str: 当前TOTP验证码
         """
-        totp = pyotp.TOTP(s=secret, digits=digits, interval=period)
-        return totp.now()
+        return TOTPUtils.generate_many([(secret, digits, period, algorithm)])[0]
+
+    @staticmethod
+    @timed("hmac.generate_many")
+    def generate_many(
+        entries: Iterable[tuple], for_time: Optional[float] = None
+    ) -> list[str]:
+        """批量生成同一时刻的多个TOTP验证码
+
+        按有效期分组，每组只计算一次时间计数器；截断结果先写入数组，
+        最后统一格式化，避免为每个账户创建pyotp.TOTP对象。
+
+        Args:
+            entries: (密钥, 验证码位数, 有效期[, 哈希算法]) 元组序列，
+                     密钥可以是Base32字符串、原始字节或prepare返回的HMAC对象，
+                     未指定哈希算法时使用SHA1
+            for_time: 计算验证码的时间戳（None则使用当前时间）
+
+        Returns:
+            list[str]: 与entries顺序一致的TOTP验证码列表
+        """
+        entries = list(entries)
+        if for_time is None:
+            for_time = time.time()
+
+        # 按有效期分组，记录每个账户在结果中的位置
+        groups: dict[int, list[int]] = {}
+        for index, entry in enumerate(entries):
+            groups.setdefault(entry[2], []).append(index)
+
+        truncated = array("L", bytes(array("L").itemsize * len(entries)))
+        for period, indexes in groups.items():
+            counter = struct.pack(">Q", int(for_time // period))
+            for index in indexes:
+                entry = entries[index]
+                mac = TOTPUtils.prepare(
+                    entry[0], entry[3] if len(entry) > 3 else "SHA1"
+                )
+                truncated[index] = TOTPUtils._truncate(mac, counter)
+
+        return [
+            str(truncated[index] % 10 ** entry[1]).zfill(entry[1])
+            for index, entry in enumerate(entries)
+        ]
+
+    @staticmethod
+    @timed("hmac.generate_for_counters")
+    def generate_for_counters(
+        secret: Secret, digits: int, counters: Iterable[int], algorithm: str = "SHA1"
+    ) -> list[str]:
+        """为同一账户生成多个时间计数器对应的验证码（用于验证时的时间漂移窗口）
+
+        Args:
+            secret: TOTP密钥（Base32格式、原始字节或prepare返回的HMAC对象）
+            digits: 验证码位数
+            counters: 时间计数器（floor(t / period)）序列
+            algorithm: 哈希算法（SHA1、SHA256或SHA512）
+
+        Returns:
+            list[str]: 与counters顺序一致的验证码列表
+        """
+        mac = TOTPUtils.prepare(secret, algorithm)
+        return [
+            str(
+                TOTPUtils._truncate(mac, struct.pack(">Q", counter)) % 10**digits
+            ).zfill(digits)
+            for counter in counters
+        ]
+
+    @staticmethod
+    @timed("hmac.code_values")
+    def code_values(
+        secret: Secret,
+        digits: int,
+        packed_counters: Iterable[bytes],
+        algorithm: str = "SHA1",
+    ) -> array:
+        """为同一账户批量计算多个时间窗口的验证码（整数形式，不做补零格式化）
+
+        用于预先生成大量时间窗口的验证码，调用方可在多个账户间复用已打包的计数器。
+
+        Args:
+            secret: TOTP密钥（Base32格式、原始字节或prepare返回的HMAC对象）
+            digits: 验证码位数
+            packed_counters: 8字节大端序时间计数器序列
+            algorithm: 哈希算法（SHA1、SHA256或SHA512）
+
+        Returns:
+            array: 与packed_counters顺序一致的验证码（array("L")）
+        """
+        mac = TOTPUtils.prepare(secret, algorithm)
+        modulus = 10**digits
+        truncate = TOTPUtils._truncate
+        return array(
+            "L", [truncate(mac, counter) % modulus for counter in packed_counters]
+        )
+
+    @staticmethod
+    def _truncate(mac: hmac.HMAC, counter: bytes) -> int:
+        """计算HMAC并按RFC 4226动态截断为31位整数
+
+        Args:
+            mac: prepare返回的HMAC对象（不会被修改）
+            counter: 8字节大端序时间计数器
+        """
+        mac = mac.copy()
+        mac.update(counter)
+        digest = mac.digest()
+        offset = digest[-1] & 0x0F
+        return int.from_bytes(digest[offset : offset + 4], "big") & 0x7FFFFFFF
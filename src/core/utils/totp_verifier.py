@@ -0,0 +1,207 @@
+import heapq
+import hmac
+import threading
+import time
+from collections import OrderedDict
+from typing import Hashable, Iterable, Optional, Union
+
+from src.core.utils.totp_utils import TOTPUtils
+
+
+class ReplayStore:
+    """已接受验证码的防重放记录，按 (账户ID, 时间计数器) 保存
+
+    条目在其时间窗口超出验证漂移范围后过期。各账户的有效期和漂移窗口不同，
+    过期时间与记录顺序无关，因此用最小堆按过期时间淘汰。记录数量达到max_size
+    且没有可淘汰的过期条目时拒绝新的验证，而不是丢弃仍在有效期内的记录。
+    """
+
+    def __init__(self, max_size: int = 100000):
+        """
+        Args:
+            max_size: 最多保存的记录数量
+        """
+        if max_size <= 0:
+            raise ValueError("记录数量上限必须大于0")
+        self._max_size = max_size
+        # (账户ID, 计数器) -> 过期时间
+        self._used: dict = {}
+        # (过期时间, (账户ID, 计数器))，与_used中的条目一一对应
+        self._expiry: list = []
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._used)
+
+    def mark_used(self, account_id: Hashable, counter: int, expires_at: float) -> bool:
+        """记录一次验证成功
+
+        Returns:
+            bool: 首次使用返回True，已被使用过或记录已满返回False
+        """
+        key = (account_id, counter)
+        with self._lock:
+            self._evict_expired(time.time())
+            if key in self._used or len(self._used) >= self._max_size:
+                return False
+            self._used[key] = expires_at
+            heapq.heappush(self._expiry, (expires_at, key))
+            return True
+
+    def _evict_expired(self, now: float) -> None:
+        """淘汰所有已过期的条目（调用方需持有锁）"""
+        while self._expiry and self._expiry[0][0] <= now:
+            _, key = heapq.heappop(self._expiry)
+            del self._used[key]
+
+
+class TOTPVerifier:
+    """TOTP验证码验证器，支持时间漂移窗口、防重放和批量验证
+
+    每个账户当前时间窗口附近的可接受验证码会被预先计算并缓存，
+    同一时间窗口内的重复验证不再计算HMAC。
+    """
+
+    def __init__(
+        self,
+        window: int = 1,
+        replay_store: Optional[ReplayStore] = None,
+        max_accounts: int = 10000,
+    ):
+        """
+        Args:
+            window: 允许的时间漂移窗口数量（前后各window个时间窗口）
+            replay_store: 防重放记录（None则新建）
+            max_accounts: 最多缓存预计算验证码的账户数量
+        """
+        if window < 0:
+            raise ValueError("时间漂移窗口不能为负数")
+        self.window = window
+        self.replay_store = replay_store or ReplayStore()
+        self._max_accounts = max_accounts
+        # 账户ID -> (版本, 当前计数器, [(计数器, 验证码), ...])
+        self._candidates: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    def acceptable_codes(
+        self,
+        account_id: Hashable,
+        secret: Union[str, bytes, hmac.HMAC],
+        digits: int = 6,
+        period: int = 30,
+        for_time: Optional[float] = None,
+        version: Optional[Hashable] = None,
+        algorithm: str = "SHA1",
+    ) -> list[tuple[int, str]]:
+        """获取当前可接受的 (计数器, 验证码) 列表（按时间窗口缓存）
+
+        Args:
+            account_id: 账户ID
+            secret: TOTP密钥（Base32格式、原始字节或TOTPUtils.prepare返回的HMAC对象）
+            digits: 验证码位数
+            period: 验证码有效期（秒）
+            for_time: 时间戳（None则使用当前时间）
+            version: 账户版本（如加密后的密钥），变化时重新计算
+            algorithm: 哈希算法（SHA1、SHA256或SHA512）
+
+        Returns:
+            list[tuple[int, str]]: 可接受的计数器及验证码
+        """
+        if for_time is None:
+            for_time = time.time()
+        counter = int(for_time // period)
+        with self._lock:
+            cached = self._candidates.get(account_id)
+            if cached is not None and cached[:2] == (version, counter):
+                self._candidates.move_to_end(account_id)
+                return cached[2]
+
+        counters = range(max(0, counter - self.window), counter + self.window + 1)
+        codes = TOTPUtils.generate_for_counters(secret, digits, counters, algorithm)
+        candidates = list(zip(counters, codes))
+        with self._lock:
+            self._candidates[account_id] = (version, counter, candidates)
+            self._candidates.move_to_end(account_id)
+            while len(self._candidates) > self._max_accounts:
+                self._candidates.popitem(last=False)
+        return candidates
+
+    def verify(
+        self,
+        account_id: Hashable,
+        secret: Union[str, bytes, hmac.HMAC],
+        code: str,
+        digits: int = 6,
+        period: int = 30,
+        for_time: Optional[float] = None,
+        version: Optional[Hashable] = None,
+        algorithm: str = "SHA1",
+    ) -> bool:
+        """验证一个验证码，验证成功的 (账户, 计数器) 不能再次使用
+
+        Args:
+            account_id: 账户ID
+            secret: TOTP密钥（Base32格式、原始字节或TOTPUtils.prepare返回的HMAC对象）
+            code: 用户提交的验证码
+            digits: 验证码位数
+            period: 验证码有效期（秒）
+            for_time: 时间戳（None则使用当前时间）
+            version: 账户版本（如加密后的密钥）
+            algorithm: 哈希算法（SHA1、SHA256或SHA512）
+
+        Returns:
+            bool: 验证是否通过
+        """
+        if for_time is None:
+            for_time = time.time()
+        code = code.strip()
+        # 验证码只能由ASCII数字组成（如全角数字直接拒绝）
+        if not (code.isascii() and code.isdigit()):
+            return False
+        code = code.encode()
+        matched_counter = None
+        # 逐个做常量时间比较，避免通过响应时间推测验证码
+        for counter, expected in self.acceptable_codes(
+            account_id, secret, digits, period, for_time, version, algorithm
+        ):
+            if hmac.compare_digest(expected.encode(), code):
+                matched_counter = counter
+        if matched_counter is None:
+            return False
+        expires_at = (matched_counter + self.window + 1) * period
+        return self.replay_store.mark_used(account_id, matched_counter, expires_at)
+
+    def verify_many(
+        self,
+        items: Iterable[tuple],
+        for_time: Optional[float] = None,
+    ) -> list[bool]:
+        """批量验证
+
+        Args:
+            items: (账户ID, 密钥, 验证码, 验证码位数, 有效期[, 哈希算法[, 账户版本]])
+                   元组序列，未指定哈希算法时使用SHA1
+            for_time: 时间戳（None则使用当前时间），所有条目使用同一时刻
+
+        Returns:
+            list[bool]: 与items顺序一致的验证结果
+        """
+        if for_time is None:
+            for_time = time.time()
+        results = []
+        for account_id, secret, code, digits, period, *extra in items:
+            algorithm = extra[0] if extra else "SHA1"
+            version = extra[1] if len(extra) > 1 else None
+            results.append(
+                self.verify(
+                    account_id,
+                    secret,
+                    code,
+                    digits,
+                    period,
+                    for_time,
+                    version=version,
+                    algorithm=algorithm,
+                )
+            )
+        return results
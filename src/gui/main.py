@@ -1,9 +1,14 @@
 import tkinter as tk
-from tkinter import ttk, messagebox
+from tkinter import ttk, messagebox, simpledialog
 from src.gui.widgets import AccountListFrame, AddAccountDialog
 from src.core.data.operation.totp_account_manager import TotpAccountManager
-from src.core.utils.encryption_utils import init_encrypt_key
+from src.core.utils.encryption_utils import (
+    CipherSession,
+    EncryptionUtils,
+    init_encrypt_key,
+)
 from src.core.data.database import init_db  # 假设数据库初始化函数在这里
+from src.core.utils.metrics import configure_metrics
 
 
 class TOTPApp(tk.Tk):
@@ -43,10 +48,34 @@ class TOTPApp(tk.Tk):
             init_db()
             # 初始化加密密钥（首次运行会自动生成）
             init_encrypt_key()
+            self.unlock_vault()
         except Exception as e:
             messagebox.showerror("初始化失败", f"应用启动出错: {str(e)}")
             self.quit()
 
+    def unlock_vault(self):
+        """主密钥由密码保护且解锁代理未运行时，提示输入密码（只派生一次密钥）"""
+        if not EncryptionUtils.is_protected():
+            return
+        try:
+            CipherSession.get_unlock_key()
+            return
+        except ValueError:
+            pass
+        while True:
+            passphrase = simpledialog.askstring(
+                "解锁", "请输入密码：", show="*", parent=self
+            )
+            if passphrase is None:
+                raise ValueError("保险库已锁定")
+            try:
+                CipherSession.set_unlock_key(
+                    EncryptionUtils.derive_unlock_key(passphrase)
+                )
+                return
+            except ValueError as e:
+                messagebox.showerror("解锁失败", str(e), parent=self)
+
     def open_add_account_dialog(self):
         """打开添加账户对话框"""
         AddAccountDialog(self)
@@ -58,6 +87,7 @@ class TOTPApp(tk.Tk):
 
 def main():
     """程序入口函数"""
+    configure_metrics()
     app = TOTPApp()
     app.mainloop()
 
@@ -1,18 +1,52 @@
+import os
+import queue
 import tkinter as tk
+from concurrent.futures import ThreadPoolExecutor
 from tkinter import ttk, messagebox
 import time
+from src.core.config.config import get_settings
 from src.core.data.operation.totp_account_manager import TotpAccountManager
-from src.core.utils.totp_utils import TOTPUtils
-from src.core.utils.encryption_utils import decrypt_secret, encrypt_secret
+from src.core.data.operation.vault_snapshot import VaultSnapshot
+from src.core.utils.totp_cache import get_code_cache
+from src.core.utils.metrics import timed
+from src.core.utils.encryption_utils import encrypt_secret
+
+SEARCH_DELAY_MS = 200  # 搜索框输入停顿多久后开始搜索（毫秒）
+SEARCH_LIMIT = 1000  # 搜索结果最多显示的账户数量
 
 
 class AccountListFrame(ttk.Frame):
-    """账户列表组件（TOTP临时密码默认隐藏）"""
+    """账户列表组件（TOTP临时密码默认隐藏）
+
+    Treeview中只保留可视区域大小的行（槽位），滚动时把对应账户渲染到槽位上；
+    账户加载、解密和验证码计算在后台线程池中进行，结果通过队列交回Tk主线程。
+    """
 
     def __init__(self, parent, *args, **kwargs):
         super().__init__(parent, *args, **kwargs)
         self.parent = parent
-        self.visible_codes = {}  # 存储需要显示的TOTP码及其过期时间
+        self.visible_codes = {}  # 存储需要显示的账户ID及其过期时间
+        self.code_cache = get_code_cache()  # 按时间窗口缓存已生成的TOTP码
+        self.snapshot = VaultSnapshot()  # 已解密账户的内存快照（在后台线程中刷新）
+        self.accounts = []  # 按账户名排序的账户行（VaultEntry）
+        self.account_index = {}  # 账户ID -> 在accounts中的位置
+        self.periods = set()  # 所有账户使用的有效期
+        self.offset = 0  # 可视区域第一行对应的账户位置
+        self.slots = []  # Treeview槽位项ID
+        self.slot_values = {}  # 槽位项ID -> 当前显示的值，避免重复写入
+        self.accounts_signature = None  # 上次加载时的账户集合签名
+        self.loading = False  # 是否有账户加载任务在后台执行
+        self.pending_jobs = 0  # 后台未完成的任务数
+        self.computing = set()  # 正在后台计算TOTP码的账户ID
+        self.refresh_job = None  # 待执行的刷新任务
+        # 检查账户集合是否变化的间隔（秒，不大于0则只在时间窗口边界检查）
+        self.refresh_interval = get_settings().refresh_interval
+        self.search_query = ""  # 当前的搜索过滤条件
+        self.search_job = None  # 待执行的搜索任务（输入停顿后才搜索）
+        self.executor = ThreadPoolExecutor(
+            max_workers=min(4, os.cpu_count() or 1), thread_name_prefix="totp-gui"
+        )
+        self.results = queue.Queue()  # 后台任务结果队列
         self.create_widgets()
         self.load_accounts()
         self.start_refresh_timer()  # 启动定时刷新
@@ -24,22 +58,98 @@ class AccountListFrame(ttk.Frame):
             pady=10
         )
 
-        # 账户列表
+        # 搜索框（按账户名前缀、子串或模糊匹配过滤）
+        search_frame = ttk.Frame(self)
+        search_frame.pack(fill=tk.X, padx=10, pady=(0, 5))
+        ttk.Label(search_frame, text="搜索:").pack(side=tk.LEFT)
+        self.search_var = tk.StringVar()
+        self.search_var.trace_add("write", self.on_search_changed)
+        ttk.Entry(search_frame, textvariable=self.search_var).pack(
+            side=tk.LEFT, fill=tk.X, expand=True, padx=(5, 0)
+        )
+
+        # 账户列表（滚动条由本组件控制，Treeview只显示可视区域）
+        list_frame = ttk.Frame(self)
+        list_frame.pack(fill=tk.BOTH, expand=True, padx=10)
+        self.scrollbar = ttk.Scrollbar(
+            list_frame, orient=tk.VERTICAL, command=self.on_scroll
+        )
+        self.scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
         self.account_tree = ttk.Treeview(
-            self, columns=("name", "code"), show="headings"
+            list_frame, columns=("name", "code"), show="headings", selectmode="none"
         )
         self.account_tree.heading("name", text="账户名")
         self.account_tree.heading("code", text="当前TOTP（点击显示）")
         self.account_tree.column("name", width=200, anchor=tk.CENTER)
         self.account_tree.column("code", width=150, anchor=tk.CENTER)
-        self.account_tree.pack(fill=tk.BOTH, expand=True, padx=10)
+        self.account_tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
 
         # 绑定点击事件（用于显示TOTP码）
         self.account_tree.bind("<ButtonRelease-1>", self.toggle_code_visibility)
+        # 窗口尺寸变化时调整槽位数量
+        self.account_tree.bind("<Configure>", self.resize_slots)
+        # 鼠标滚轮（Windows/macOS使用MouseWheel，Linux使用Button-4/5）
+        self.account_tree.bind("<MouseWheel>", self.on_mouse_wheel)
+        self.account_tree.bind("<Button-4>", lambda e: self.scroll_to(self.offset - 3))
+        self.account_tree.bind("<Button-5>", lambda e: self.scroll_to(self.offset + 3))
 
         # 刷新按钮
         ttk.Button(self, text="刷新列表", command=self.load_accounts).pack(pady=10)
 
+    def destroy(self):
+        """销毁组件时停止后台线程池"""
+        if self.refresh_job is not None:
+            self.after_cancel(self.refresh_job)
+            self.refresh_job = None
+        if self.search_job is not None:
+            self.after_cancel(self.search_job)
+            self.search_job = None
+        self.executor.shutdown(wait=False, cancel_futures=True)
+        super().destroy()
+
+    def resize_slots(self, event=None):
+        """根据Treeview高度调整槽位数量"""
+        style = ttk.Style(self)
+        row_height = int(style.lookup("Treeview", "rowheight") or 20)
+        # 扣除表头所占高度
+        count = max(
+            1, (self.account_tree.winfo_height() - row_height - 4) // row_height
+        )
+        while len(self.slots) < count:
+            item = f"slot-{len(self.slots)}"
+            self.account_tree.insert("", tk.END, iid=item, values=("", ""))
+            self.slots.append(item)
+            self.slot_values[item] = ("", "")
+        while len(self.slots) > count:
+            item = self.slots.pop()
+            self.account_tree.delete(item)
+            del self.slot_values[item]
+        self.scroll_to(self.offset)
+
+    def on_scroll(self, *args):
+        """滚动条回调：moveto按比例定位，scroll按行或页滚动"""
+        if args[0] == "moveto":
+            self.scroll_to(int(float(args[1]) * len(self.accounts)))
+        elif args[0] == "scroll":
+            step = len(self.slots) if args[2] == "pages" else 1
+            self.scroll_to(self.offset + int(args[1]) * step)
+
+    def on_mouse_wheel(self, event):
+        """鼠标滚轮滚动"""
+        self.scroll_to(self.offset - int(event.delta / 120) * 3)
+        return "break"
+
+    def scroll_to(self, offset):
+        """滚动到指定位置，并为新进入可视区域的行计算TOTP码"""
+        max_offset = max(0, len(self.accounts) - len(self.slots))
+        self.offset = min(max(0, offset), max_offset)
+        self.request_codes()
+        self.render()
+
+    def viewport_rows(self):
+        """返回当前可视区域内的账户行"""
+        return self.accounts[self.offset : self.offset + len(self.slots)]
+
     def toggle_code_visibility(self, event):
         """点击TOTP列时切换显示/隐藏状态"""
         region = self.account_tree.identify_region(event.x, event.y)
@@ -51,66 +161,236 @@ class AccountListFrame(ttk.Frame):
         if column != 2:
             return
 
-        # 获取当前行的账户名
+        # 获取当前槽位对应的账户
         item = self.account_tree.identify_row(event.y)
-        if item:
-            account_name = self.account_tree.item(item, "values")[0]
-            # 点击时显示5秒，再次点击取消显示
-            if account_name in self.visible_codes:
-                del self.visible_codes[account_name]
-            else:
-                self.visible_codes[account_name] = time.time() + 5  # 5秒后自动隐藏
-            self.load_accounts()  # 立即刷新显示
+        if item not in self.slots:
+            return
+        position = self.offset + self.slots.index(item)
+        if position >= len(self.accounts):
+            return
+        account_id = self.accounts[position].id
+        # 点击时显示验证码，再次点击取消显示
+        if account_id in self.visible_codes:
+            del self.visible_codes[account_id]
+        else:
+            # 显示一段时间后自动隐藏
+            self.visible_codes[account_id] = (
+                time.time() + get_settings().code_reveal_seconds
+            )
+        self.refresh()  # 立即刷新显示
+
+    def on_search_changed(self, *args):
+        """搜索框内容变化时，等输入停顿后再重新加载账户"""
+        if self.search_job is not None:
+            self.after_cancel(self.search_job)
+        self.search_job = self.after(SEARCH_DELAY_MS, self.apply_search)
+
+    def apply_search(self):
+        """按搜索框内容过滤账户列表"""
+        self.search_job = None
+        query = self.search_var.get().strip()
+        if query != self.search_query:
+            self.search_query = query
+            self.offset = 0
+            self.load_accounts()
 
     def load_accounts(self):
-        """加载账户列表，TOTP码默认隐藏"""
-        # 清空现有数据
-        for item in self.account_tree.get_children():
-            self.account_tree.delete(item)
+        """强制重新加载账户列表（添加账户或点击刷新按钮时调用）"""
+        self.accounts_signature = None
+        self.refresh()
 
-        # 获取所有账户
-        accounts = TotpAccountManager.list_accounts()
-        if not accounts:
-            return
+    @timed("gui.refresh")
+    def refresh(self):
+        """刷新：在后台检查账户集合是否变化（变化时重新加载），然后更新可视区域"""
+        if not self.loading:
+            self.loading = True
+            self.submit(self.sync_accounts, self.accounts_signature, self.search_query)
+        self.request_codes()
+        self.render()
+        self.schedule_refresh()
+
+    def submit(self, func, *args):
+        """提交后台任务，结果放入队列后由主线程处理"""
+
+        def run():
+            try:
+                self.results.put(func(*args))
+            except Exception as e:
+                self.results.put(("error", str(e)))
+
+        if self.pending_jobs == 0:
+            self.after(20, self.poll_results)
+        self.pending_jobs += 1
+        self.executor.submit(run)
 
+    def poll_results(self):
+        """在主线程中处理后台任务结果"""
+        while True:
+            try:
+                result = self.results.get_nowait()
+            except queue.Empty:
+                break
+            self.pending_jobs -= 1
+            self.apply_result(result)
+        if self.pending_jobs > 0:
+            self.after(20, self.poll_results)
+
+    def apply_result(self, result):
+        """应用后台任务结果（主线程）"""
+        kind = result[0]
+        if kind == "unchanged":
+            _, signature, query = result
+            self.loading = False
+            if signature != self.accounts_signature or query != self.search_query:
+                # 检查期间要求了重新加载或搜索条件已变化
+                self.refresh()
+        elif kind == "accounts":
+            _, signature, query, accounts = result
+            self.loading = False
+            if query != self.search_query:
+                # 加载期间搜索条件已变化，按新条件重新加载
+                self.refresh()
+                return
+            self.accounts_signature = signature
+            self.accounts = accounts
+            self.account_index = {row.id: i for i, row in enumerate(accounts)}
+            self.periods = {row.period for row in accounts}
+            self.visible_codes = {
+                account_id: expiry
+                for account_id, expiry in self.visible_codes.items()
+                if account_id in self.account_index
+            }
+            self.scroll_to(self.offset)
+            self.schedule_refresh()
+        elif kind == "codes":
+            _, account_ids, errors = result
+            self.computing.difference_update(account_ids)
+            for account_id, error in errors.items():
+                self.visible_codes.pop(account_id, None)
+                position = self.account_index.get(account_id)
+                if position is not None:
+                    name = self.accounts[position].name
+                    messagebox.showerror("错误", f"处理账户 {name} 失败: {error}")
+            self.render()
+        else:
+            self.loading = False
+            messagebox.showerror("错误", f"加载账户失败: {result[1]}")
+
+    def sync_accounts(self, known_signature, query=""):
+        """后台任务：账户集合签名与known_signature不同时重新加载账户"""
+        signature = TotpAccountManager.get_accounts_signature()
+        if signature == known_signature:
+            return "unchanged", known_signature, query
+        return self.fetch_accounts(signature, query)
+
+    @timed("gui.fetch_accounts")
+    def fetch_accounts(self, signature, query=""):
+        """后台任务：增量刷新账户快照，返回所有账户（或匹配搜索条件的账户）"""
+        self.snapshot.refresh()
+        if query:
+            accounts = [
+                self.snapshot.get(account[0])
+                for account in TotpAccountManager.search_accounts(
+                    query, limit=SEARCH_LIMIT
+                )
+            ]
+            accounts = [entry for entry in accounts if entry is not None]
+        else:
+            accounts = self.snapshot.entries()
+        return "accounts", signature, query, accounts
+
+    @timed("gui.compute_codes")
+    def compute_codes(self, rows, for_time):
+        """后台任务：用快照中的密钥批量生成TOTP码，写入缓存"""
+        errors = {
+            row.id: self.snapshot.errors.get(row.id, "无法解密")
+            for row in rows
+            if row.mac is None
+        }
+        for row, totp_code in zip(rows, self.snapshot.generate_codes(rows, for_time)):
+            if totp_code is not None:
+                self.code_cache.put(
+                    row.id,
+                    row.period,
+                    totp_code,
+                    for_time=for_time,
+                    version=row.version,
+                )
+        return "codes", [row.id for row in rows], errors
+
+    def cached_code(self, row, for_time):
+        """从缓存读取账户当前时间窗口的TOTP码"""
+        return self.code_cache.get(
+            row.id, row.period, for_time=for_time, version=row.version
+        )
+
+    def request_codes(self):
+        """为可视区域内显示中且未缓存的账户提交后台计算任务"""
         current_time = time.time()
-        # 清理过期的显示记录（超过5秒自动隐藏）
+        # 清理过期的显示记录（超过显示时长自动隐藏）
         self.visible_codes = {
-            name: expiry for name, expiry in self.visible_codes.items()
+            account_id: expiry
+            for account_id, expiry in self.visible_codes.items()
             if expiry > current_time
         }
+        rows = [
+            row
+            for row in self.viewport_rows()
+            if row.id in self.visible_codes
+            and row.id not in self.computing
+            and self.cached_code(row, current_time) is None
+        ]
+        if rows:
+            self.computing.update(row.id for row in rows)
+            self.submit(self.compute_codes, rows, current_time)
 
-        # 显示账户和TOTP码（默认隐藏）
-        for account in accounts:
-            try:
-                # 解密密钥并生成TOTP
-                secret = decrypt_secret(account.encrypted_secret).decode()
-                totp_code = TOTPUtils.generate_totp(
-                    secret=secret,
-                    digits=account.digits,
-                    period=account.period
-                )
-
+    @timed("gui.render")
+    def render(self):
+        """把可视区域内的账户渲染到槽位上，只写入发生变化的单元格"""
+        current_time = time.time()
+        rows = self.viewport_rows()
+        for index, item in enumerate(self.slots):
+            if index < len(rows):
+                row = rows[index]
                 # 显示逻辑：默认用●隐藏，需要时显示明文
-                if account.account_name in self.visible_codes:
-                    display_code = totp_code
-                else:
-                    display_code = "●" * len(totp_code)  # 用圆点隐藏
+                display_code = None
+                if row.id in self.visible_codes:
+                    display_code = self.cached_code(row, current_time)
+                values = (row.name, display_code or "●" * row.digits)
+            else:
+                values = ("", "")
+            if values != self.slot_values[item]:
+                self.account_tree.item(item, values=values)
+                self.slot_values[item] = values
 
-                self.account_tree.insert(
-                    "", tk.END, values=(account.account_name, display_code)
-                )
-            except Exception as e:
-                messagebox.showerror(
-                    "错误", f"处理账户 {account.account_name} 失败: {str(e)}"
-                )
+        # 更新滚动条位置
+        total = len(self.accounts)
+        if total:
+            self.scrollbar.set(
+                self.offset / total, min(1.0, (self.offset + len(self.slots)) / total)
+            )
+        else:
+            self.scrollbar.set(0.0, 1.0)
+
+    def schedule_refresh(self):
+        """在下一个时间窗口边界、显示到期或到达检查间隔时刷新"""
+        if self.refresh_job is not None:
+            self.after_cancel(self.refresh_job)
+
+        current_time = time.time()
+        deadlines = [(current_time // p + 1) * p for p in self.periods or {30}]
+        deadlines.extend(self.visible_codes.values())
+        if self.refresh_interval > 0:
+            # 其他进程修改账户后，最迟在一个检查间隔后显示
+            deadlines.append(current_time + self.refresh_interval)
+        delay = max(min(deadlines) - current_time, 0)
+        # 多留10毫秒，确保刷新时已进入新的时间窗口
+        self.refresh_job = self.after(int(delay * 1000) + 10, self.refresh)
 
     def start_refresh_timer(self):
-        """定时刷新TOTP码（每1秒）"""
-        def refresh():
-            self.load_accounts()
-            self.after(1000, refresh)  # 1秒后再次刷新
-        refresh()
+        """启动定时刷新"""
+        self.schedule_refresh()
+
 
 class AddAccountDialog(tk.Toplevel):
     """添加账户对话框"""
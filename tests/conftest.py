@@ -0,0 +1,37 @@
+"""测试公共夹具：使用临时HOME目录和独立的数据库，避免影响真实数据"""
+
+import os
+
+import pytest
+
+# 测试不写日志文件
+os.environ.setdefault("LOG_SINK", "none")
+
+
+@pytest.fixture()
+def data_home(tmp_path, monkeypatch):
+    """在临时HOME目录中初始化数据库和主密钥，测试结束后关闭连接并清除进程内缓存"""
+    from src.core.config.config import reload_settings
+    from src.core.data import vault_file
+    from src.core.data.connection import db
+    from src.core.data.database import init_db
+    from src.core.data.operation import totp_account_manager
+    from src.core.utils.encryption_utils import CipherSession
+
+    def reset():
+        if not db.deferred:
+            db.close()
+            db.init(None)
+        db._schema_checked = False
+        CipherSession.set_unlock_key(None)
+        totp_account_manager._account_cache = None
+        vault_file._store = None
+
+    monkeypatch.setenv("HOME", str(tmp_path))
+    reload_settings()
+    reset()
+    init_db()
+    yield tmp_path
+    reset()
+    monkeypatch.undo()
+    reload_settings()
@@ -0,0 +1,92 @@
+"""账户缓存测试：LRU淘汰、本进程修改和其他连接修改后的失效"""
+
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+
+@pytest.fixture()
+def manager(data_home):
+    from src.core.data.operation.totp_account_manager import TotpAccountManager
+    from src.core.utils.encryption_utils import encrypt_secret
+
+    for name in ("a", "b", "c"):
+        TotpAccountManager.add_account(name, encrypt_secret(b"JBSWY3DPEHPK3PXP"))
+    return TotpAccountManager
+
+
+def external_write(sql, *params):
+    """通过另一个连接修改数据库（相当于其他进程）"""
+    from src.core.data.connection import get_database_path
+
+    connection = sqlite3.connect(get_database_path())
+    with connection:
+        connection.execute(sql, params)
+    connection.close()
+
+
+def test_cached_by_name_and_id(manager):
+    account = manager.get_account("a")
+    assert manager.get_account("a") is account
+    assert manager.get_account(account_id=account.id) is account
+
+
+def test_lru_eviction(manager):
+    from src.core.data.operation import totp_account_manager
+
+    manager.get_account("a")
+    totp_account_manager._account_cache.max_size = 2
+    account_b = manager.get_account("b")
+    manager.get_account("c")
+    assert manager.get_account("b") is account_b
+    assert "a" not in totp_account_manager._account_cache._accounts
+
+
+def test_local_writes_invalidate(manager):
+    from src.core.utils.encryption_utils import encrypt_secret
+
+    account = manager.get_account("a")
+    assert manager.update_account("a", encrypt_secret(b"JBSWY3DPEHPK3PXQ"))
+    updated = manager.get_account("a")
+    assert updated is not account
+    assert updated.encrypted_secret != account.encrypted_secret
+
+    assert manager.delete_account("a")
+    assert manager.get_account("a") is None
+
+
+def test_external_write_invalidates(manager):
+    account = manager.get_account("a")
+    signature = manager.get_accounts_signature()
+    external_write(
+        "UPDATE totpaccount SET digits = 8, updated_at = '2099-01-01 00:00:00' "
+        "WHERE account_name = ?",
+        "a",
+    )
+    assert manager.get_account("a").digits == 8
+    assert manager.get_accounts_signature() != signature
+    assert manager.get_account("a") is not account
+
+
+def test_put_skipped_when_data_changed_during_query(manager):
+    from src.core.data.entity.totp_account import TotpAccount
+    from src.core.data.operation import totp_account_manager
+
+    cache = totp_account_manager._get_account_cache()
+    version = cache.version()
+    stale = TotpAccount.get(TotpAccount.account_name == "a")
+    external_write("UPDATE totpaccount SET digits = 8 WHERE account_name = ?", "a")
+    cache.put(stale, version)
+    assert manager.get_account("a").digits == 8
+
+
+def test_thread_switch_keeps_cache(manager):
+    # 两个线程各自持有连接，交替访问时缓存不应失效
+    with ThreadPoolExecutor(1) as first, ThreadPoolExecutor(1) as second:
+        accounts = [
+            executor.submit(manager.get_account, "a").result()
+            for executor in (first, second) * 4
+        ]
+    # 每个线程首次使用自己的连接时清空一次，之后命中同一个缓存对象
+    assert all(account is accounts[1] for account in accounts[1:])
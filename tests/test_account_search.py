@@ -0,0 +1,53 @@
+"""账户搜索测试：trigram索引的子串和模糊匹配，结果与逐行匹配一致"""
+
+import pytest
+
+SECRET = b"JBSWY3DPEHPK3PXP"
+NAMES = [f"user{i:02d}@example.com" for i in range(30)] + ["github", "gitlab"]
+
+
+@pytest.fixture()
+def manager(data_home):
+    from src.core.data.connection import db
+    from src.core.data.operation.totp_account_manager import TotpAccountManager
+    from src.core.utils.encryption_utils import encrypt_secret
+
+    # 倒序添加，使索引中的rowid顺序与账户名顺序相反
+    for name in reversed(NAMES):
+        TotpAccountManager.add_account(name, encrypt_secret(SECRET))
+    db.connect(reuse_if_open=True)
+    if not db.search_available:
+        pytest.skip("SQLite不支持trigram分词")
+    return TotpAccountManager
+
+
+def names(accounts):
+    return [account[1] for account in accounts]
+
+
+def test_substring_orders_before_limit(manager, monkeypatch):
+    from src.core.data.connection import db
+
+    indexed = names(manager.search_accounts("EXAMPLE", "substring", limit=5))
+    assert indexed == NAMES[:5]
+    assert names(manager.search_accounts("lab", "substring")) == ["gitlab"]
+
+    # 不使用索引时逐行匹配，结果相同
+    monkeypatch.setattr(db, "search_available", False)
+    assert names(manager.search_accounts("example", "substring", limit=5)) == indexed
+
+
+def test_fuzzy_tolerates_typos(manager):
+    assert names(manager.search_accounts("githab", "fuzzy")) == ["github"]
+    assert names(manager.search_accounts("user07@exampel.com", "fuzzy"))[0] == (
+        "user07@example.com"
+    )
+    assert manager.search_accounts("zzzzzz", "fuzzy") == []
+
+
+def test_auto_mode(manager):
+    assert names(manager.search_accounts("git")) == ["github", "gitlab"]
+    assert names(manager.search_accounts("hub")) == ["github"]
+    assert names(manager.search_accounts("gitlob")) == ["gitlab"]
+    with pytest.raises(ValueError):
+        manager.search_accounts("git", mode="regex")
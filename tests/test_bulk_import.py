@@ -0,0 +1,51 @@
+"""批量导入测试：跳过和覆盖重复账户，导入期间每批都能被重新加载的读取方发现"""
+
+import pytest
+
+SECRET = "JBSWY3DPEHPK3PXP"
+OTHER_SECRET = "JBSWY3DPEHPK3PXQ"
+
+
+@pytest.fixture()
+def manager(data_home):
+    from src.core.data.operation.totp_account_manager import TotpAccountManager
+    from src.core.utils.encryption_utils import encrypt_secret
+
+    for name in ("a", "b"):
+        TotpAccountManager.add_account(name, encrypt_secret(SECRET.encode()))
+    return TotpAccountManager
+
+
+def records(*names, secret=OTHER_SECRET):
+    return [{"account_name": name, "secret": secret} for name in names]
+
+
+def test_skip_and_update_duplicates(manager):
+    from src.core.utils.encryption_utils import decrypt_secret
+
+    stats = manager.bulk_add(records("a", "c", "c"), batch_size=2)
+    assert stats == {"added": 1, "updated": 0, "skipped": 2, "failed": 0}
+    secret = decrypt_secret(manager.get_account("a").encrypted_secret)
+    assert secret == SECRET.encode()
+
+    stats = manager.bulk_add(records("a", "b", "d"), on_duplicate="update")
+    assert stats == {"added": 1, "updated": 2, "skipped": 0, "failed": 0}
+    secret = decrypt_secret(manager.get_account("a").encrypted_secret)
+    assert secret == OTHER_SECRET.encode()
+
+
+def test_each_batch_changes_signature(manager):
+    # 覆盖模式下账户数和ID都不变，只能通过修改时间发现后续批次
+    signatures = [manager.get_accounts_signature()]
+    manager.bulk_add(
+        records("a", "b"),
+        batch_size=1,
+        on_duplicate="update",
+        progress=lambda stats: signatures.append(manager.get_accounts_signature()),
+    )
+    assert len(set(signatures)) == 3
+
+
+def test_invalid_duplicate_mode(manager):
+    with pytest.raises(ValueError):
+        manager.bulk_add(records("a"), on_duplicate="replace")
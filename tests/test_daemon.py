@@ -0,0 +1,87 @@
+"""守护进程测试：请求处理、过长请求，以及CLI在守护进程出错或不可用时的行为"""
+
+import asyncio
+
+import pytest
+from click.testing import CliRunner
+
+SECRET = b"JBSWY3DPEHPK3PXP"
+
+
+@pytest.fixture()
+def daemon(data_home):
+    from src.core.daemon.server import TotpDaemon
+    from src.core.data.operation.totp_account_manager import TotpAccountManager
+    from src.core.utils.encryption_utils import encrypt_secret
+
+    TotpAccountManager.add_account("github", encrypt_secret(SECRET))
+    return TotpDaemon(socket_path=data_home / "test.sock")
+
+
+def exchange(daemon, *lines):
+    """启动服务，在一个连接中依次发送请求，返回收到的所有响应行"""
+
+    async def scenario():
+        daemon._reload_lock = asyncio.Lock()
+        server = await asyncio.start_unix_server(
+            daemon.handle_client, path=str(daemon.socket_path)
+        )
+        async with server:
+            reader, writer = await asyncio.open_unix_connection(str(daemon.socket_path))
+            for line in lines:
+                writer.write(line)
+            # 关闭写端，服务端处理完所有请求后读到EOF并关闭连接
+            writer.write_eof()
+            await writer.drain()
+            responses = (await reader.read()).splitlines()
+            writer.close()
+        return responses
+
+    return asyncio.run(scenario())
+
+
+def test_requests_on_one_connection(daemon):
+    from src.core.daemon.client import decode_message, encode_message
+
+    responses = exchange(
+        daemon,
+        encode_message("PING"),
+        encode_message("GET", "missing"),
+        encode_message("LIST"),
+    )
+    assert [decode_message(line) for line in responses] == [
+        ["OK", "pong"],
+        ["ERR", "账户不存在: missing"],
+        ["OK", "github"],
+    ]
+
+
+def test_overlong_request_is_rejected(daemon):
+    from src.core.daemon.client import decode_message, encode_message
+
+    # 超过StreamReader默认的64KiB缓冲区上限
+    responses = exchange(
+        daemon, b"GET\t" + b"x" * 80_000 + b"\n", encode_message("PING")
+    )
+    assert [decode_message(line) for line in responses] == [["ERR", "请求过长"]]
+
+
+def test_cli_get_shows_daemon_error(data_home, monkeypatch):
+    from src.cli.totp_cli import totp_cli
+    from src.core.daemon.client import DaemonClient, DaemonError
+
+    def request(self, command, *args):
+        raise DaemonError("账户无法解密: github")
+
+    monkeypatch.setattr(DaemonClient, "request", request)
+    result = CliRunner().invoke(totp_cli, ["get", "github"])
+    assert "账户无法解密: github" in result.output
+
+
+def test_cli_get_falls_back_without_daemon(daemon, monkeypatch):
+    from src.cli.totp_cli import totp_cli
+    from src.core.daemon.client import DaemonClient
+
+    monkeypatch.setattr(DaemonClient, "request", lambda self, *args: None)
+    result = CliRunner().invoke(totp_cli, ["get", "github"])
+    assert "获取账户成功" in result.output
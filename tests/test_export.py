@@ -0,0 +1,100 @@
+"""流式导出测试：加密和明文导出、otpauth格式、解密失败的账户，以及批量输出验证码"""
+
+import base64
+import json
+
+import pytest
+from click.testing import CliRunner
+
+SECRET = "JBSWY3DPEHPK3PXP"
+FOR_TIME = 1_234_567_890
+
+
+@pytest.fixture()
+def manager(data_home):
+    from src.core.data.entity.totp_account import TotpAccount
+    from src.core.data.operation.totp_account_manager import TotpAccountManager
+    from src.core.utils.encryption_utils import encrypt_secret
+
+    for name in ("github", "broken", "aws"):
+        TotpAccountManager.add_account(name, encrypt_secret(SECRET.encode()))
+    TotpAccount.update(encrypted_secret=b"garbage").where(
+        TotpAccount.account_name == "broken"
+    ).execute()
+    return TotpAccountManager
+
+
+def export(*args):
+    from src.cli.totp_cli import totp_cli
+
+    result = CliRunner().invoke(totp_cli, ["export", *args])
+    assert result.exit_code == 0, result.output
+    return result.stdout.splitlines(), result.stderr
+
+
+def test_export_encrypted(manager):
+    from src.core.utils.encryption_utils import decrypt_secret
+
+    lines, _ = export()
+    records = [json.loads(line) for line in lines]
+    # 按ID顺序输出所有账户（包括无法解密的），不解密
+    assert [record["account_name"] for record in records] == ["github", "broken", "aws"]
+    assert decrypt_secret(base64.b64decode(records[0]["encrypted_secret"])) == (
+        SECRET.encode()
+    )
+    assert "secret" not in records[0]
+
+
+def test_export_plaintext(manager):
+    from src.core.utils.otpauth import parse_otpauth_uri
+
+    lines, stderr = export("--plaintext")
+    records = [json.loads(line) for line in lines]
+    assert [(r["account_name"], r["secret"]) for r in records] == [
+        ("github", SECRET),
+        ("aws", SECRET),
+    ]
+    assert "broken" in stderr
+
+    lines, _ = export("--plaintext", "--format", "otpauth")
+    assert [parse_otpauth_uri(line)["account_name"] for line in lines] == [
+        "github",
+        "aws",
+    ]
+
+
+def test_otpauth_requires_plaintext(manager):
+    from src.cli.totp_cli import totp_cli
+
+    result = CliRunner().invoke(totp_cli, ["export", "--format", "otpauth"])
+    assert result.exit_code != 0
+
+
+def test_iterators_are_lazy(manager):
+    accounts = manager.iter_accounts()
+    assert iter(accounts) is accounts
+    codes = manager.iter_account_codes(for_time=FOR_TIME, chunk_size=1)
+    assert iter(codes) is codes
+    assert [(account[1], code is None) for account, code in codes] == [
+        ("github", False),
+        ("broken", True),
+        ("aws", False),
+    ]
+
+
+def test_codes_json(manager):
+    import time
+
+    import pyotp
+
+    from src.cli.totp_cli import totp_cli
+
+    now = time.time()
+    result = CliRunner().invoke(totp_cli, ["codes", "--all", "--json"])
+    records = [json.loads(line) for line in result.stdout.splitlines()]
+    assert [record["account_name"] for record in records] == ["github", "broken", "aws"]
+    assert records[1]["code"] is None
+    # 调用期间可能跨过时间窗口边界
+    totp = pyotp.TOTP(SECRET)
+    assert records[0]["code"] in (totp.at(now), totp.at(now + 30))
+    assert 0 < records[0]["remaining"] <= 30
@@ -0,0 +1,108 @@
+"""主密钥轮换测试：中断后继续、单文件保险库随密钥一起重新加密"""
+
+import pytest
+
+SECRET = b"JBSWY3DPEHPK3PXP"
+
+
+@pytest.fixture()
+def accounts(data_home, monkeypatch):
+    from src.core.data.operation import key_rotation
+    from src.core.data.operation.totp_account_manager import TotpAccountManager
+    from src.core.utils.encryption_utils import encrypt_secret
+
+    # 测试中没有其他进程，不需要等待它们确认新密钥
+    monkeypatch.setattr(key_rotation, "ACTIVE_KEY_CHECK_INTERVAL", 0)
+    for name in ("a", "b", "c"):
+        TotpAccountManager.add_account(name, encrypt_secret(SECRET))
+    return TotpAccountManager
+
+
+def decrypted_secrets(manager):
+    from src.core.utils.encryption_utils import decrypt_secret
+
+    return {
+        name: decrypt_secret(encrypted_secret)
+        for _, name, encrypted_secret, *_ in manager.iter_accounts()
+    }
+
+
+def test_rotation_resumes_after_interruption(accounts):
+    from src.core.data.operation.key_rotation import KeyRotation, rotate_master_key
+    from src.core.utils.encryption_utils import EncryptionUtils
+
+    def interrupt(done, remaining):
+        raise KeyboardInterrupt
+
+    with pytest.raises(KeyboardInterrupt):
+        KeyRotation(batch_size=1, workers=1, progress=interrupt).run()
+    keys, active_key_id = EncryptionUtils.load_keys()
+    assert len(keys) == 2
+    # 中断前处理的账户已使用新密钥，其余账户仍可用旧密钥解密
+    assert decrypted_secrets(accounts) == dict.fromkeys("abc", SECRET)
+
+    stats = rotate_master_key(batch_size=1, workers=1)
+    assert stats["resumed"]
+    assert stats["key_id"] == active_key_id
+    assert stats["reencrypted"] == 2
+    assert list(EncryptionUtils.load_keys()[0]) == [active_key_id]
+    assert decrypted_secrets(accounts) == dict.fromkeys("abc", SECRET)
+
+
+def test_rotation_reencrypts_vault_file(accounts):
+    from src.core.data import vault_file
+    from src.core.data.operation.key_rotation import rotate_master_key
+
+    store = vault_file.get_vault_store()
+    assert store.import_from_sqlite() == (3, 0)
+
+    stats = rotate_master_key(workers=1)
+    vault = vault_file.VaultFile(vault_file.get_vault_path())
+    assert vault.key_id == stats["key_id"]
+    vault.close()
+
+    # 旧密钥已删除，新的进程（新的存储对象）仍能读写
+    vault_file._store = None
+    store = vault_file.get_vault_store()
+    assert store.get("a").secret == SECRET
+    assert store.add("d", SECRET) is not None
+    assert [record.secret for record in store.records()] == [SECRET] * 4
+
+
+@pytest.fixture()
+def corrupted(accounts):
+    from src.core.data.entity.totp_account import TotpAccount
+    from src.core.utils.encryption_utils import EncryptionUtils, key_id_prefix
+
+    # 使用存在的密钥ID但无法解密的数据
+    _, key_id = EncryptionUtils.load_keys()
+    TotpAccount.update(encrypted_secret=key_id_prefix(key_id) + b"garbage").where(
+        TotpAccount.account_name == "b"
+    ).execute()
+    return TotpAccount.get(TotpAccount.account_name == "b").id
+
+
+def test_failed_accounts_keep_old_key(accounts, corrupted):
+    from src.core.data.operation.key_rotation import rotate_master_key
+    from src.core.utils.encryption_utils import EncryptionUtils
+
+    stats = rotate_master_key(workers=1)
+    assert (stats["reencrypted"], stats["failed_ids"]) == (2, [corrupted])
+    assert stats["dropped"] == 0
+    assert len(EncryptionUtils.load_keys()[0]) == 2
+
+    # 再次运行继续同一轮换，没有账户需要重新加密
+    stats = rotate_master_key(workers=1)
+    assert stats["resumed"] and stats["reencrypted"] == 0
+    assert stats["failed_ids"] == [corrupted]
+
+
+def test_drop_failed_finishes_rotation(accounts, corrupted):
+    from src.core.data.operation.key_rotation import rotate_master_key
+    from src.core.utils.encryption_utils import EncryptionUtils
+
+    rotate_master_key(workers=1)
+    stats = rotate_master_key(workers=1, drop_failed=True)
+    assert stats["dropped"] == 1
+    assert len(EncryptionUtils.load_keys()[0]) == 1
+    assert decrypted_secrets(accounts) == dict.fromkeys("ac", SECRET)
@@ -0,0 +1,25 @@
+"""日志限流测试：同一调用位置每个时间窗口最多记录limit条，并报告被丢弃的条数"""
+
+from src.core.config.logging import RateLimitFilter
+
+
+def record(line=1, message="重复日志"):
+    return {"name": "test", "function": "f", "line": line, "message": message}
+
+
+def test_rate_limit_per_call_site():
+    rate_limit = RateLimitFilter(limit=2, interval=60)
+    assert [rate_limit(record()) for _ in range(5)] == [True, True, False, False, False]
+    # 其他调用位置不受影响
+    assert rate_limit(record(line=2))
+
+
+def test_reports_suppressed_count():
+    rate_limit = RateLimitFilter(limit=1, interval=60)
+    assert rate_limit(record())
+    assert not rate_limit(record())
+    # 模拟时间窗口结束
+    rate_limit._windows[("test", "f", 1)][0] -= 60
+    message = record()
+    assert rate_limit(message)
+    assert message["message"].endswith("(已忽略 1 条重复日志)")
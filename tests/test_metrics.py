@@ -0,0 +1,52 @@
+"""耗时统计测试：未启用时不记录、嵌套操作的自身耗时和导出格式"""
+
+import time
+
+import pytest
+
+from src.core.utils.metrics import format_prometheus, metrics, timed, timer
+
+
+@pytest.fixture()
+def enabled():
+    metrics.reset()
+    metrics.enabled = True
+    yield metrics
+    metrics.enabled = False
+    metrics.reset()
+
+
+@timed("test.inner")
+def inner():
+    time.sleep(0.02)
+
+
+def test_disabled_records_nothing():
+    metrics.reset()
+    inner()
+    metrics.increment("test.event")
+    assert metrics.snapshot() == {"timings": {}, "counters": {}}
+
+
+def test_nested_self_time(enabled):
+    with timer("test.outer"):
+        inner()
+        inner()
+    enabled.increment("test.event", 3)
+
+    snapshot = enabled.snapshot()
+    outer, nested = snapshot["timings"]["test.outer"], snapshot["timings"]["test.inner"]
+    assert (outer["count"], nested["count"]) == (1, 2)
+    assert outer["total_seconds"] >= nested["total_seconds"] >= 0.04
+    # 外层的自身耗时不包含已计时的子操作
+    assert outer["self_seconds"] < 0.02
+    assert sum(outer["buckets"]) == 1
+    assert snapshot["counters"] == {"test.event": 3}
+
+    text = format_prometheus(snapshot)
+    assert 'totp_operation_duration_seconds_count{operation="test.inner"} 2' in text
+    assert (
+        'totp_operation_duration_seconds_bucket{operation="test.outer",le="+Inf"} 1'
+        in text
+    )
+    assert 'totp_events_total{event="test.event"} 3' in text
@@ -0,0 +1,118 @@
+"""otpauth URI和导入文件解析测试"""
+
+import pytest
+
+from src.core.utils.otpauth import (
+    build_otpauth_uri,
+    iter_import_file,
+    parse_otpauth_uri,
+)
+
+SECRET = "JBSWY3DPEHPK3PXP"
+
+
+def test_parse_uri_with_parameters():
+    record = parse_otpauth_uri(
+        f"otpauth://totp/GitHub:alice%40example.com?secret={SECRET.lower()}"
+        "&digits=8&period=60&algorithm=sha-256&issuer=GitHub"
+    )
+    assert record == {
+        "account_name": "GitHub:alice@example.com",
+        "secret": SECRET,
+        "digits": 8,
+        "period": 60,
+        "algorithm": "SHA256",
+    }
+
+
+def test_parse_uri_defaults_and_issuer():
+    record = parse_otpauth_uri(f"otpauth://totp/alice?secret={SECRET}&issuer=ACME")
+    assert record["account_name"] == "ACME:alice"
+    assert (record["digits"], record["period"], record["algorithm"]) == (6, 30, "SHA1")
+
+
+@pytest.mark.parametrize(
+    "uri",
+    [
+        f"https://totp/a?secret={SECRET}",
+        f"otpauth://hotp/a?secret={SECRET}",
+        "otpauth://totp/a?digits=6",
+        "otpauth://totp/a?secret=not-base32!",
+        f"otpauth://totp/?secret={SECRET}",
+        f"otpauth://totp/a?secret={SECRET}&digits=5",
+        f"otpauth://totp/a?secret={SECRET}&period=0",
+        f"otpauth://totp/a?secret={SECRET}&algorithm=MD5",
+    ],
+)
+def test_parse_invalid_uri(uri):
+    with pytest.raises(ValueError):
+        parse_otpauth_uri(uri)
+
+
+def test_build_uri_round_trip():
+    uri = build_otpauth_uri("Work: a/b", SECRET, 7, 45, "SHA512")
+    assert parse_otpauth_uri(uri) == {
+        "account_name": "Work: a/b",
+        "secret": SECRET,
+        "digits": 7,
+        "period": 45,
+        "algorithm": "SHA512",
+    }
+
+
+def test_iter_uri_file(tmp_path):
+    path = tmp_path / "accounts.txt"
+    path.write_text(
+        f"# 注释\n\notpauth://totp/a?secret={SECRET}\nnot a uri\n", encoding="utf-8"
+    )
+    results = list(iter_import_file(path))
+    assert [(line_no, record is None) for line_no, record, _ in results] == [
+        (3, False),
+        (4, True),
+    ]
+    assert results[0][1]["account_name"] == "a"
+    assert results[1][2]
+
+
+def test_iter_csv_file(tmp_path):
+    path = tmp_path / "accounts.csv"
+    path.write_text(
+        # 带BOM和大写表头（常见于电子表格导出）
+        "\ufeffName,Secret,Digits,URI\n"
+        f"a,{SECRET},8,\n"
+        f",,,otpauth://totp/b?secret={SECRET}\n"
+        ",bad,,\n",
+        encoding="utf-8",
+    )
+    results = list(iter_import_file(path))
+    assert [record and record["account_name"] for _, record, _ in results] == [
+        "a",
+        "b",
+        None,
+    ]
+    assert results[0][1]["digits"] == 8
+    assert [line_no for line_no, _, _ in results] == [2, 3, 4]
+
+
+def test_iter_csv_malformed_rows(tmp_path):
+    path = tmp_path / "accounts.csv"
+    path.write_text(
+        "name,secret,digits\n" f"a,{SECRET},6,extra\n" "b,\n" "c,   \n" f"d,{SECRET}\n",
+        encoding="utf-8",
+    )
+    results = list(iter_import_file(path))
+    # 多余字段、空密钥逐行报告错误，字段不足的行使用默认值
+    assert [(record is None, bool(error)) for _, record, error in results] == [
+        (True, True),
+        (True, True),
+        (True, True),
+        (False, False),
+    ]
+    assert results[3][1]["digits"] == 6
+
+
+def test_iter_unknown_format(tmp_path):
+    path = tmp_path / "accounts.txt"
+    path.write_text("", encoding="utf-8")
+    with pytest.raises(ValueError):
+        list(iter_import_file(path, "xml"))
@@ -0,0 +1,51 @@
+"""分页测试：以账户名为游标逐页读取，跨页边界不重复不遗漏"""
+
+import pytest
+
+SECRET = b"JBSWY3DPEHPK3PXP"
+NAMES = sorted(f"account-{i:03d}" for i in range(23))
+
+
+@pytest.fixture()
+def manager(data_home):
+    from src.core.data.operation.totp_account_manager import TotpAccountManager
+    from src.core.utils.encryption_utils import encrypt_secret
+
+    for name in reversed(NAMES):
+        TotpAccountManager.add_account(name, encrypt_secret(SECRET))
+    return TotpAccountManager
+
+
+def test_pages_follow_cursor(manager):
+    # 每次查询5个账户，跨越多个内部分页
+    rows = list(manager.paginate_accounts(page_size=5))
+    assert rows == [(name,) for name in NAMES]
+
+    pages = []
+    after = None
+    while page := [
+        name for (name,) in manager.paginate_accounts(after=after, limit=10)
+    ]:
+        pages.append(page)
+        after = page[-1]
+    assert [len(page) for page in pages] == [10, 10, 3]
+    assert sum(pages, []) == NAMES
+
+
+def test_columns_and_cursor_between_names(manager):
+    rows = list(
+        manager.paginate_accounts(
+            ("id", "digits"), after="account-010", limit=3, page_size=2
+        )
+    )
+    assert [manager.get_account(account_id=row[0]).account_name for row in rows] == (
+        NAMES[11:14]
+    )
+    assert all(digits == 6 for _, digits in rows)
+    # 游标不必是已存在的账户名
+    assert list(manager.paginate_accounts(after="account-0105", limit=1)) == [
+        (NAMES[11],)
+    ]
+    assert list(manager.paginate_accounts(after=NAMES[-1])) == []
+    with pytest.raises(ValueError):
+        list(manager.paginate_accounts(("encrypted", "account_name")))
@@ -0,0 +1,68 @@
+"""主密钥密码保护测试：设置和取消密码、由密码派生解锁密钥、未解锁时拒绝解密"""
+
+import pytest
+
+SECRET = b"JBSWY3DPEHPK3PXP"
+
+
+@pytest.fixture()
+def token(data_home):
+    from src.core.utils.encryption_utils import encrypt_secret
+
+    return encrypt_secret(SECRET)
+
+
+@pytest.mark.parametrize("algorithm, cost", [("pbkdf2", 1000), ("scrypt", 16)])
+def test_protect_and_unlock(token, algorithm, cost):
+    from src.core.data.entity.totp_key_storage import TotpKeyStorage
+    from src.core.utils.encryption_utils import (
+        CipherSession,
+        EncryptionUtils,
+        decrypt_secret,
+    )
+
+    keys, _ = EncryptionUtils.load_keys()
+    unlock_key = EncryptionUtils.protect("correct horse", algorithm, cost)
+    assert EncryptionUtils.is_protected()
+    assert EncryptionUtils.kdf_params()["algorithm"] == algorithm
+    # 数据库中只保存被解锁密钥加密后的主密钥
+    stored = {row.key_name: bytes(row.encrypted_key) for row in TotpKeyStorage.select()}
+    assert all(stored[key_id] != key for key_id, key in keys.items())
+    assert decrypt_secret(token) == SECRET
+
+    # 新进程：没有解锁密钥也没有解锁代理时拒绝解密
+    CipherSession.set_unlock_key(None)
+    with pytest.raises(ValueError):
+        decrypt_secret(token)
+    with pytest.raises(ValueError):
+        EncryptionUtils.derive_unlock_key("wrong")
+    assert EncryptionUtils.derive_unlock_key("correct horse") == unlock_key
+    CipherSession.set_unlock_key(unlock_key)
+    assert decrypt_secret(token) == SECRET
+
+
+def test_unprotect(token):
+    from src.core.utils.encryption_utils import (
+        CipherSession,
+        EncryptionUtils,
+        decrypt_secret,
+    )
+
+    keys, _ = EncryptionUtils.load_keys()
+    EncryptionUtils.protect("correct horse", "pbkdf2", 1000)
+    EncryptionUtils.unprotect()
+    assert not EncryptionUtils.is_protected()
+    with pytest.raises(ValueError):
+        EncryptionUtils.derive_unlock_key("correct horse")
+
+    CipherSession.set_unlock_key(None)
+    assert EncryptionUtils.load_keys()[0] == keys
+    assert decrypt_secret(token) == SECRET
+
+
+def test_protect_rejects_unknown_algorithm(token):
+    from src.core.utils.encryption_utils import EncryptionUtils
+
+    with pytest.raises(ValueError):
+        EncryptionUtils.protect("correct horse", "md5")
+    assert not EncryptionUtils.is_protected()
@@ -0,0 +1,52 @@
+"""多进程分片读取测试：结果与单进程遍历一致，顺序按ID，解密失败的账户单独标记"""
+
+import pytest
+
+SECRET = b"JBSWY3DPEHPK3PXP"
+FOR_TIME = 1_234_567_890
+
+
+@pytest.fixture()
+def manager(data_home, monkeypatch):
+    from src.core.data.entity.totp_account import TotpAccount
+    from src.core.data.operation import sharded_reader
+    from src.core.data.operation.totp_account_manager import TotpAccountManager
+    from src.core.utils.encryption_utils import encrypt_secret
+
+    # 账户很少时也分成多个分片
+    monkeypatch.setattr(sharded_reader, "MIN_SHARD_SIZE", 2)
+    for i in range(10):
+        TotpAccountManager.add_account(f"account-{9 - i}", encrypt_secret(SECRET))
+    TotpAccount.update(encrypted_secret=b"garbage").where(
+        TotpAccount.account_name == "account-4"
+    ).execute()
+    return TotpAccountManager
+
+
+def test_shards_match_single_process(manager):
+    from src.core.data.operation.sharded_reader import (
+        ShardedAccountReader,
+        iter_decrypted_accounts,
+    )
+
+    assert len(ShardedAccountReader(workers=2).shard_bounds()) == 5
+    expected = [
+        (account[:2], None if code is None else SECRET.decode(), code)
+        for account, code in manager.iter_account_codes(for_time=FOR_TIME)
+    ]
+    assert [code for _, _, code in expected].count(None) == 1
+
+    results = list(iter_decrypted_accounts(workers=2, for_time=FOR_TIME))
+    assert [
+        (account[:2], secret, code) for account, secret, code in results
+    ] == expected
+    # 返回的账户元组带有数据库中的加密数据
+    assert [account for account, _, _ in results] == list(manager.iter_accounts())
+
+
+def test_without_codes(manager):
+    from src.core.data.operation.sharded_reader import iter_decrypted_accounts
+
+    results = list(iter_decrypted_accounts(workers=2))
+    assert all(code is None for _, _, code in results)
+    assert [secret for _, secret, _ in results].count(None) == 1
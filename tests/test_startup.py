@@ -0,0 +1,72 @@
+"""CLI启动开销测试：限制 totp --help / totp list 的启动时间和导入的模块"""
+
+import os
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import pytest
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+
+# 单次启动的时间预算（秒），可通过环境变量调整以适应较慢的机器
+STARTUP_BUDGET = float(os.getenv("TOTP_STARTUP_BUDGET", "1.0"))
+
+
+@pytest.fixture()
+def cli_env(tmp_path):
+    """使用临时HOME目录运行CLI，避免影响真实数据"""
+    env = dict(os.environ, HOME=str(tmp_path), PYTHONPATH=str(PROJECT_ROOT))
+    run_cli(env, "init")
+    return env
+
+
+def run_cli(env, *args):
+    """运行CLI子命令，返回耗时（秒）"""
+    started = time.perf_counter()
+    subprocess.run(
+        [sys.executable, "-m", "src.cli.main", *args],
+        cwd=PROJECT_ROOT,
+        env=env,
+        check=True,
+        capture_output=True,
+    )
+    return time.perf_counter() - started
+
+
+def loaded_modules(env, *args):
+    """在子进程中运行CLI子命令，返回运行后已导入的顶级模块"""
+    script = (
+        "import sys\n"
+        "from click.testing import CliRunner\n"
+        "from src.cli.totp_cli import totp_cli\n"
+        f"result = CliRunner().invoke(totp_cli, {list(args)!r})\n"
+        "assert result.exit_code == 0, result.output\n"
+        "print(' '.join(sorted({name.split('.')[0] for name in sys.modules})))\n"
+    )
+    output = subprocess.run(
+        [sys.executable, "-c", script],
+        cwd=PROJECT_ROOT,
+        env=env,
+        check=True,
+        capture_output=True,
+        text=True,
+    ).stdout
+    return set(output.split())
+
+
+@pytest.mark.parametrize("args", [("--help",), ("list",)])
+def test_startup_within_budget(cli_env, args):
+    # 取多次运行中的最小值，减少机器负载带来的抖动
+    elapsed = min(run_cli(cli_env, *args) for _ in range(3))
+    assert elapsed < STARTUP_BUDGET, f"totp {' '.join(args)} 耗时 {elapsed:.3f}s"
+
+
+def test_help_imports_no_backend(cli_env):
+    modules = loaded_modules(cli_env, "--help")
+    assert not {"peewee", "cryptography", "loguru"} & modules
+
+
+def test_list_does_not_import_cryptography(cli_env):
+    assert "cryptography" not in loaded_modules(cli_env, "list")
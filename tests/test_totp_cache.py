@@ -0,0 +1,38 @@
+"""验证码缓存测试：时间窗口内命中、窗口结束后过期、容量淘汰和版本校验"""
+
+import pytest
+
+from src.core.utils.totp_cache import TOTPCodeCache
+
+
+def test_hit_within_window_and_expiry():
+    cache = TOTPCodeCache()
+    cache.put(1, 30, "123456", for_time=60)
+    assert cache.get(1, 30, for_time=60) == "123456"
+    assert cache.get(1, 30, for_time=89.9) == "123456"
+    # 下一个时间窗口开始时条目过期并被淘汰
+    assert cache.get(1, 30, for_time=90) is None
+    assert len(cache) == 0
+
+
+def test_capacity_eviction():
+    cache = TOTPCodeCache(max_size=2)
+    for account_id in (1, 2, 3):
+        cache.put(account_id, 30, f"00000{account_id}", for_time=0)
+    assert len(cache) == 2
+    assert cache.get(1, 30, for_time=0) is None
+    assert cache.get(3, 30, for_time=0) == "000003"
+
+
+def test_version_mismatch_and_invalidate():
+    cache = TOTPCodeCache()
+    cache.put(1, 30, "123456", for_time=0, version="v1")
+    assert cache.get(1, 30, for_time=0, version="v2") is None
+    assert cache.get(1, 30, for_time=0, version="v1") == "123456"
+    cache.invalidate(1)
+    assert cache.get(1, 30, for_time=0, version="v1") is None
+
+
+def test_invalid_size():
+    with pytest.raises(ValueError):
+        TOTPCodeCache(max_size=0)
@@ -0,0 +1,88 @@
+"""验证码计划文件测试：写入后读取与直接生成的验证码一致、查找、验证和输入校验"""
+
+import pytest
+
+from src.core.utils.totp_schedule import CodeSchedule, write_schedule
+from src.core.utils.totp_utils import TOTPUtils
+
+SECRET = "JBSWY3DPEHPK3PXP"
+START = 1_000_000_020
+WINDOWS = 4
+ACCOUNTS = [
+    (1, SECRET, 6, 30, "SHA1"),
+    (5, SECRET, 8, 60, "SHA256"),
+    (9, "GEZDGNBVGY3TQOJQ", 6, 30, "SHA512"),
+]
+
+
+def expected_code(secret, digits, period, algorithm, for_time):
+    return TOTPUtils.generate_for_counters(
+        secret, digits, [int(for_time // period)], algorithm
+    )[0]
+
+
+@pytest.fixture()
+def schedule(tmp_path):
+    path = tmp_path / "codes.bin"
+    assert write_schedule(path, ACCOUNTS, WINDOWS, START) == len(ACCOUNTS)
+    with CodeSchedule(path) as schedule:
+        yield schedule
+
+
+def test_round_trip(schedule):
+    assert len(schedule) == len(ACCOUNTS)
+    assert (schedule.start_time, schedule.windows) == (START, WINDOWS)
+    for account_id, secret, digits, period, algorithm in ACCOUNTS:
+        first, stored_period, stored_digits, codes = schedule.codes(account_id)
+        assert (first, stored_period, stored_digits) == (
+            START // period,
+            period,
+            digits,
+        )
+        assert codes == [
+            expected_code(secret, digits, period, algorithm, (first + i) * period)
+            for i in range(WINDOWS)
+        ]
+        for_time = START + period
+        assert schedule.code_at(account_id, for_time) == expected_code(
+            secret, digits, period, algorithm, for_time
+        )
+
+
+def test_lookup_outside_schedule(schedule):
+    assert schedule.find(2) is None
+    assert schedule.codes(10) is None
+    assert schedule.code_at(1, START - 30) is None
+    assert schedule.code_at(1, START + WINDOWS * 30) is None
+
+
+def test_verify(schedule):
+    code = expected_code(SECRET, 6, 30, "SHA1", START + 30)
+    assert schedule.verify(1, code, for_time=START + 30)
+    assert schedule.verify(1, code, for_time=START + 60)
+    assert not schedule.verify(1, code, for_time=START + 90)
+    assert not schedule.verify(2, code, for_time=START + 30)
+    full_width = code.translate(str.maketrans("0123456789", "０１２３４５６７８９"))
+    assert not schedule.verify(1, full_width, for_time=START + 30)
+
+
+@pytest.mark.parametrize(
+    "accounts",
+    [
+        [(2, SECRET, 6, 30, "SHA1"), (1, SECRET, 6, 30, "SHA1")],
+        [(1, SECRET, 6, 70000, "SHA1")],
+        [(1, SECRET, 256, 30, "SHA1")],
+    ],
+)
+def test_invalid_accounts_leave_no_files(tmp_path, accounts):
+    path = tmp_path / "codes.bin"
+    with pytest.raises(ValueError):
+        write_schedule(path, accounts, WINDOWS, START)
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_rejects_foreign_file(tmp_path):
+    path = tmp_path / "codes.bin"
+    path.write_bytes(b"x" * 64)
+    with pytest.raises(ValueError):
+        CodeSchedule(path)
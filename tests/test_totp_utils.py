@@ -0,0 +1,70 @@
+"""验证码生成测试：批量生成的结果与pyotp逐个生成一致，以及RFC 6238测试向量"""
+
+import hashlib
+import struct
+
+import pyotp
+import pytest
+
+from src.core.utils.totp_utils import TOTPUtils
+
+SECRETS = ["JBSWY3DPEHPK3PXP", "GEZDGNBVGY3TQOJQ", pyotp.random_base32(32)]
+TIMES = [0, 59, 1_111_111_109, 1_234_567_890, 2_000_000_000]
+
+
+def test_generate_many_matches_pyotp():
+    entries = [
+        (secret, digits, period)
+        for secret in SECRETS
+        for digits in (6, 8)
+        for period in (30, 60)
+    ]
+    for for_time in TIMES:
+        expected = [
+            pyotp.TOTP(secret, digits=digits, interval=period).at(for_time)
+            for secret, digits, period in entries
+        ]
+        assert TOTPUtils.generate_many(entries, for_time=for_time) == expected
+
+
+def test_generate_many_accepts_prepared_and_raw_secrets():
+    secret = SECRETS[0]
+    raw = TOTPUtils.decode_secret(secret)
+    prepared = TOTPUtils.prepare(secret, "SHA256")
+    expected = pyotp.TOTP(secret, digest=hashlib.sha256).at(TIMES[2])
+    assert TOTPUtils.generate_many(
+        [(raw, 6, 30, "SHA256"), (prepared, 6, 30, "SHA256")], for_time=TIMES[2]
+    ) == [expected, expected]
+    assert TOTPUtils.generate_many([], for_time=TIMES[2]) == []
+
+
+# RFC 6238 附录B的测试向量（8位验证码，30秒有效期）
+RFC_SEEDS = {
+    "SHA1": b"12345678901234567890",
+    "SHA256": b"12345678901234567890123456789012",
+    "SHA512": b"1234567890" * 6 + b"1234",
+}
+RFC_VECTORS = [
+    (59, {"SHA1": "94287082", "SHA256": "46119246", "SHA512": "90693936"}),
+    (1111111109, {"SHA1": "07081804", "SHA256": "68084774", "SHA512": "25091201"}),
+    (1111111111, {"SHA1": "14050471", "SHA256": "67062674", "SHA512": "99943326"}),
+    (1234567890, {"SHA1": "89005924", "SHA256": "91819424", "SHA512": "93441116"}),
+    (2000000000, {"SHA1": "69279037", "SHA256": "90698825", "SHA512": "38618901"}),
+    (20000000000, {"SHA1": "65353130", "SHA256": "77737706", "SHA512": "47863826"}),
+]
+
+
+@pytest.mark.parametrize("algorithm", sorted(RFC_SEEDS))
+def test_rfc6238_vectors(algorithm):
+    seed = RFC_SEEDS[algorithm]
+    expected = [codes[algorithm] for _, codes in RFC_VECTORS]
+    assert [
+        TOTPUtils.generate_many([(seed, 8, 30, algorithm)], for_time=for_time)[0]
+        for for_time, _ in RFC_VECTORS
+    ] == expected
+    counters = [for_time // 30 for for_time, _ in RFC_VECTORS]
+    assert TOTPUtils.generate_for_counters(seed, 8, counters, algorithm) == expected
+    values = TOTPUtils.code_values(
+        seed, 8, [struct.pack(">Q", counter) for counter in counters], algorithm
+    )
+    assert [str(value).zfill(8) for value in values] == expected
@@ -0,0 +1,92 @@
+"""验证器测试：时间漂移窗口、防重放、输入校验和批量验证"""
+
+import time
+
+from src.core.utils.totp_utils import TOTPUtils
+from src.core.utils.totp_verifier import ReplayStore, TOTPVerifier
+
+SECRET = "JBSWY3DPEHPK3PXP"
+PERIOD = 30
+
+
+def code_at(counter, algorithm="SHA1", digits=6):
+    return TOTPUtils.generate_for_counters(SECRET, digits, [counter], algorithm)[0]
+
+
+def now_counter():
+    # 使用当前时间：防重放记录按真实时间淘汰过期条目
+    now = time.time()
+    return now, int(now // PERIOD)
+
+
+def test_drift_window():
+    now, counter = now_counter()
+    verifier = TOTPVerifier(window=1)
+    assert verifier.verify(1, SECRET, code_at(counter - 1), for_time=now)
+    assert verifier.verify(2, SECRET, code_at(counter + 1), for_time=now)
+    assert not verifier.verify(3, SECRET, code_at(counter - 2), for_time=now)
+    assert not verifier.verify(4, SECRET, code_at(counter + 2), for_time=now)
+
+
+def test_code_cannot_be_replayed():
+    now, counter = now_counter()
+    verifier = TOTPVerifier(window=1)
+    code = code_at(counter)
+    assert verifier.verify(1, SECRET, code, for_time=now)
+    assert not verifier.verify(1, SECRET, code, for_time=now)
+    # 同一时间窗口的验证码对其他账户不受影响
+    assert verifier.verify(2, SECRET, code, for_time=now)
+    # 防重放记录共享时，新的验证器也拒绝
+    shared = TOTPVerifier(window=1, replay_store=verifier.replay_store)
+    assert not shared.verify(1, SECRET, code, for_time=now)
+
+
+def test_replay_store_expiry_and_capacity():
+    store = ReplayStore(max_size=2)
+    assert store.mark_used(1, 10, expires_at=time.time() - 1)
+    # 已过期的记录被淘汰，同一计数器可以再次记录
+    assert store.mark_used(1, 10, expires_at=time.time() + 60)
+    assert store.mark_used(2, 10, expires_at=time.time() + 60)
+    # 记录已满且都在有效期内时拒绝，而不是丢弃未过期的记录
+    assert not store.mark_used(3, 10, expires_at=time.time() + 60)
+    assert len(store) == 2
+    assert not store.mark_used(1, 10, expires_at=time.time() + 60)
+
+
+def test_replay_store_expiry_out_of_order():
+    # 有效期不同的账户：后记录的条目先过期
+    store = ReplayStore(max_size=2)
+    assert store.mark_used(1, 10, expires_at=time.time() + 300)
+    assert store.mark_used(2, 10, expires_at=time.time() - 1)
+    assert store.mark_used(3, 10, expires_at=time.time() + 60)
+    assert len(store) == 2
+    assert not store.mark_used(1, 10, expires_at=time.time() + 300)
+
+
+def test_rejects_malformed_codes():
+    now, counter = now_counter()
+    verifier = TOTPVerifier()
+    code = code_at(counter)
+    full_width = code.translate(str.maketrans("0123456789", "０１２３４５６７８９"))
+    assert not verifier.verify(1, SECRET, full_width, for_time=now)
+    assert not verifier.verify(1, SECRET, "", for_time=now)
+    assert not verifier.verify(1, SECRET, code[:-1], for_time=now)
+    assert verifier.verify(1, SECRET, f" {code}\n", for_time=now)
+
+
+def test_verify_many_uses_algorithm():
+    # 每个账户只验证一次，可以使用固定时间
+    for_time, counter = 1_000_000_000, 1_000_000_000 // PERIOD
+    assert code_at(counter, "SHA256") != code_at(counter)
+    verifier = TOTPVerifier()
+    results = verifier.verify_many(
+        [
+            (1, SECRET, code_at(counter), 6, PERIOD),
+            (2, SECRET, code_at(counter, "SHA256"), 6, PERIOD, "SHA256"),
+            (3, SECRET, code_at(counter, "SHA512", 8), 8, PERIOD, "SHA512", "v1"),
+            # 未指定算法时按SHA1验证
+            (4, SECRET, code_at(counter, "SHA256"), 6, PERIOD),
+        ],
+        for_time=for_time,
+    )
+    assert results == [True, True, True, False]
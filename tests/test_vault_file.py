@@ -0,0 +1,193 @@
+"""单文件保险库测试：文件格式（读写、篡改检测、有序查找）和STORAGE_BACKEND=vault时的路由"""
+
+import pytest
+
+SECRET = b"JBSWY3DPEHPK3PXP"
+OTHER_SECRET = b"JBSWY3DPEHPK3PXQ"
+
+
+@pytest.fixture()
+def store(data_home):
+    from src.core.data.vault_file import VaultFileStore
+
+    return VaultFileStore(data_home / "vault.bin")
+
+
+@pytest.fixture()
+def vault_backend(data_home, monkeypatch):
+    from src.core.config.config import reload_settings
+    from src.core.data.operation.totp_account_manager import TotpAccountManager
+    from src.core.utils.encryption_utils import encrypt_secret
+
+    monkeypatch.setenv("STORAGE_BACKEND", "vault")
+    reload_settings()
+    for name in ("github", "gitlab", "aws"):
+        assert TotpAccountManager.add_account(name, encrypt_secret(SECRET))
+    return TotpAccountManager
+
+
+def test_round_trip(store):
+    from src.core.data.vault_file import VaultFileStore
+
+    assert store.get("a") is None
+    first = store.add("b", SECRET, digits=8, period=60, algorithm="SHA256")
+    store.add("a", SECRET)
+    store.add("c", SECRET)
+    assert store.add("a", OTHER_SECRET) is None
+
+    # 新的存储对象从文件读取（相当于其他进程）
+    reopened = VaultFileStore(store.path)
+    record = reopened.get("b")
+    assert record.id == first.id and record.secret == SECRET
+    assert (record.digits, record.period, record.algorithm) == (8, 60, "SHA256")
+    assert list(reopened.names()) == ["a", "b", "c"]
+    assert list(reopened.names(after="a")) == ["b", "c"]
+    assert list(reopened.names(after="bb")) == ["c"]
+    assert reopened.get_by_id(first.id).account_name == "b"
+
+    assert store.update_secret("a", OTHER_SECRET)
+    assert not store.update_secret("missing", OTHER_SECRET)
+    assert store.delete("c")
+    assert not store.delete("c")
+    assert [(r.account_name, r.secret) for r in reopened.records()] == [
+        ("a", OTHER_SECRET),
+        ("b", SECRET),
+    ]
+
+
+def test_tampered_block_is_rejected(store):
+    from src.core.data.vault_file import VaultFileStore
+
+    store.add("a", SECRET)
+    data = bytearray(store.path.read_bytes())
+    data[-1] ^= 1
+    store.path.write_bytes(bytes(data))
+    with pytest.raises(ValueError):
+        VaultFileStore(store.path).get("a")
+
+
+def test_renamed_block_is_rejected(store):
+    from src.core.data.vault_file import VaultFile, VaultFileStore
+
+    # 账户名是附加数据的一部分，修改名称区中的账户名后无法解密
+    store.add("a", SECRET)
+    vault = VaultFile(store.path)
+    offset = vault._names_offset
+    vault.close()
+    data = bytearray(store.path.read_bytes())
+    assert data[offset : offset + 1] == b"a"
+    data[offset : offset + 1] = b"b"
+    store.path.write_bytes(bytes(data))
+    with pytest.raises(ValueError):
+        VaultFileStore(store.path).get("b")
+
+
+def test_lookup_by_id(store):
+    # 账户名顺序与ID顺序不同，按ID查找使用索引中的ID顺序表
+    ids = {name: store.add(name, SECRET).id for name in ("c", "a", "d", "b")}
+    for name, account_id in ids.items():
+        assert store.get_by_id(account_id).account_name == name
+    assert store.get_by_id(max(ids.values()) + 1) is None
+    assert store.get_by_id(0) is None
+
+
+def test_tampered_index_id_is_rejected(store):
+    from src.core.data.vault_file import VaultFile, VaultFileStore
+
+    store.add("a", SECRET)
+    vault = VaultFile(store.path)
+    offset = vault._index_offset
+    vault.close()
+    data = bytearray(store.path.read_bytes())
+    data[offset] ^= 1
+    store.path.write_bytes(bytes(data))
+    with pytest.raises(ValueError):
+        VaultFileStore(store.path).get("a")
+
+
+def test_lock_discards_cached_keys(store):
+    from src.core.utils.encryption_utils import CipherSession
+
+    store.add("a", SECRET)
+    assert store.get("a").secret == SECRET
+    CipherSession.lock()
+    try:
+        with pytest.raises(ValueError):
+            store.get("a")
+    finally:
+        CipherSession.unlock()
+    assert store.get("a").secret == SECRET
+
+
+def test_accounts_are_stored_in_vault(vault_backend):
+    from src.core.data.entity.totp_account import TotpAccount
+    from src.core.data.vault_file import get_vault_store
+
+    assert TotpAccount.select().count() == 0
+    assert list(get_vault_store().names()) == ["aws", "github", "gitlab"]
+    account = vault_backend.get_account("github")
+    assert vault_backend.get_account(account_id=account.id).account_name == "github"
+
+
+def test_reads_are_routed_to_vault(vault_backend):
+    from src.core.data.operation.sharded_reader import iter_decrypted_accounts
+    from src.core.utils.encryption_utils import decrypt_secret
+
+    accounts = list(vault_backend.iter_accounts())
+    assert [account[1] for account in accounts] == ["github", "gitlab", "aws"]
+    assert all(decrypt_secret(account[2]) == SECRET for account in accounts)
+    assert [account[1] for account in vault_backend.iter_accounts(["aws"])] == ["aws"]
+
+    # 明文接口直接返回保险库中的密钥
+    assert [
+        (account[1], account[2], error)
+        for account, error in vault_backend.iter_decrypted_accounts()
+    ] == [("github", SECRET, None), ("gitlab", SECRET, None), ("aws", SECRET, None)]
+    codes = list(vault_backend.iter_account_codes(for_time=0))
+    assert len(codes) == 3 and all(code is not None for _, code in codes)
+    assert [
+        (account[1], secret, code)
+        for account, secret, code in iter_decrypted_accounts(workers=2, for_time=0)
+    ] == [(account[1], SECRET.decode(), code) for account, code in codes]
+
+    results = vault_backend.search_accounts("git")
+    assert [a[1] for a in results] == ["github", "gitlab"]
+    assert all(a[2] is None for a in results)
+    assert [a[1] for a in vault_backend.search_accounts("LAB")] == ["gitlab"]
+    assert [a[1] for a in vault_backend.search_accounts("githab")] == ["github"]
+
+
+def test_bulk_add_writes_vault(vault_backend):
+    from src.core.data.entity.totp_account import TotpAccount
+
+    records = [
+        {"account_name": "github", "secret": OTHER_SECRET.decode()},
+        {"account_name": "new", "secret": SECRET.decode(), "digits": 8},
+    ]
+    assert vault_backend.bulk_add(records) == {
+        "added": 1,
+        "updated": 0,
+        "skipped": 1,
+        "failed": 0,
+    }
+    assert vault_backend.bulk_add(records, on_duplicate="update")["updated"] == 2
+    assert vault_backend.get_account("github").secret == OTHER_SECRET
+    assert vault_backend.get_account("new").digits == 8
+    assert TotpAccount.select().count() == 0
+
+
+def test_snapshot_reads_vault(vault_backend):
+    from src.core.data.operation.vault_snapshot import VaultSnapshot
+    from src.core.utils.encryption_utils import encrypt_secret
+
+    snapshot = VaultSnapshot()
+    snapshot.refresh()
+    assert [entry.name for entry in snapshot.entries()] == ["aws", "github", "gitlab"]
+    github = snapshot.by_name("github")
+
+    vault_backend.delete_account("aws")
+    vault_backend.update_account("gitlab", encrypt_secret(OTHER_SECRET))
+    snapshot.refresh()
+    assert [entry.name for entry in snapshot.entries()] == ["github", "gitlab"]
+    assert snapshot.by_name("github") is github
+    assert snapshot.by_name("gitlab").key != github.key